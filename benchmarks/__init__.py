@@ -0,0 +1,137 @@
+"""Standalone benchmarks for the shop.
+
+Each module is runnable with ``python -m benchmarks.<name>`` from the repo
+root. They build a throwaway SQLite database (or use DATABASE_URL when it is
+set) so they never touch the dev database.
+
+``micro`` and ``journeys`` can also write their numbers as JSON (``--json``);
+``suite`` runs both into one file and ``compare`` diffs two such files to
+flag regressions between commits.
+"""
+import json
+import os
+import platform
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def bootstrap(migrate=True):
+    """Configure Django against a scratch data dir and migrate it."""
+    if str(ROOT) not in sys.path:
+        sys.path.insert(0, str(ROOT))
+    data_dir = Path(tempfile.mkdtemp(prefix="bikeshop-bench-"))
+    os.environ["DATA_DIR"] = str(data_dir)
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "bikeshop.settings")
+    import django
+    django.setup()
+    if migrate:
+        from django.core.management import call_command
+        call_command("migrate", verbosity=0)
+    return data_dir
+
+
+def timed(fn, repeat=20):
+    """Median and p95 wall time of ``fn()`` in milliseconds."""
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * q))]
+
+
+class Results:
+    """Named measurements, written as JSON alongside where and on what they ran."""
+
+    def __init__(self, suite, **params):
+        self.suite, self.params, self.metrics = suite, params, {}
+
+    def add(self, name, value, unit="ms", better="lower"):
+        self.metrics[f"{self.suite}.{name}"] = {"value": round(value, 4), "unit": unit, "better": better}
+
+    def meta(self):
+        def git(*cmd):
+            try:
+                return subprocess.run(["git", *cmd], cwd=ROOT, capture_output=True, text=True).stdout.strip()
+            except OSError:
+                return ""
+        import django
+        return {
+            "commit": git("rev-parse", "--short", "HEAD"),
+            "dirty": bool(git("status", "--porcelain", "--untracked-files=no")),
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "database": os.environ.get("DATABASE_URL", "sqlite").split(":", 1)[0],
+            "time": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        }
+
+    def write(self, path):
+        if not path:
+            return
+        data = {"meta": self.meta(), "params": {self.suite: self.params}, "metrics": self.metrics}
+        Path(path).write_text(json.dumps(data, indent=2, sort_keys=True) + "\n")
+
+
+def table(headers, rows):
+    widths = [max(len(str(h)), *(len(str(r[i])) for r in rows)) for i, h in enumerate(headers)]
+    line = lambda cells: "  ".join(str(c).rjust(w) for c, w in zip(cells, widths))
+    print(line(headers))
+    for r in rows:
+        print(line(r))
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def worker_cpu(master_pid):
+    """Summed user+system seconds of the master's child processes."""
+    total = 0.0
+    tick = os.sysconf("SC_CLK_TCK")
+    try:
+        children = Path(f"/proc/{master_pid}/task/{master_pid}/children").read_text().split()
+    except OSError:
+        return 0.0
+    for pid in children:
+        try:
+            fields = Path(f"/proc/{pid}/stat").read_text().rsplit(")", 1)[1].split()
+        except OSError:
+            continue
+        total += (int(fields[11]) + int(fields[12])) / tick
+    return total
+
+
+def gunicorn(app, port, workers, env):
+    """Start gunicorn (sync workers) serving `app` and wait until it accepts connections."""
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", app,
+         "-b", f"127.0.0.1:{port}", "-w", str(workers), "--log-level", "warning"],
+        cwd=ROOT, env=env,
+    )
+    for _ in range(100):
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.1).close()
+            time.sleep(0.5)  # let every worker boot
+            return proc
+        except OSError:
+            time.sleep(0.1)
+    proc.kill()
+    raise SystemExit("gunicorn did not start")
@@ -0,0 +1,131 @@
+"""Product changelist and bulk actions: the stock ModelAdmin against shop/admin.py.
+
+    python -m benchmarks.admin [--products 20000] [--repeat 10] [--batch 1000]
+
+Renders the changelist in-process (RequestFactory, no HTTP) through both
+admins and reports median time and queries per page: the first page, a brand
+filter, a search, a search within a brand and a deep page. The stock admin
+is the previous configuration (list_filter on brand and category, icontains
+search on name, exact counts). Then it reprices, recategorizes and deletes
+--batch products, once per object (save()/delete() in a loop, which is what
+a stock action does) and once through shop/bulk.py.
+"""
+import argparse
+import statistics
+import time
+from decimal import Decimal
+
+from benchmarks import bootstrap, table
+
+
+def stock_site():
+    from django.contrib import admin
+    from shop.models import Product
+
+    class StockProductAdmin(admin.ModelAdmin):
+        list_display = ('name', 'brand', 'price', 'category')
+        list_filter = ('brand', 'category')
+        search_fields = ('name',)
+
+    site = admin.AdminSite(name="stock")
+    site.register(Product, StockProductAdmin)
+    return site._registry[Product]
+
+
+def changelist(model_admin, user, query, repeat):
+    from django.db import connection
+    from django.test import RequestFactory
+    from django.test.utils import CaptureQueriesContext
+
+    samples, queries = [], 0
+    for _ in range(repeat):
+        request = RequestFactory().get("/admin/shop/product/", query)
+        request.user = user
+        t0 = time.perf_counter()
+        with CaptureQueriesContext(connection) as captured:
+            model_admin.changelist_view(request).render()
+        samples.append((time.perf_counter() - t0) * 1000)
+        queries = len(captured)
+    return statistics.median(samples), queries
+
+
+def per_object(kind, ids, category):
+    from django.db import transaction
+    from shop.models import Product
+    with transaction.atomic():
+        for p in Product.objects.filter(id__in=ids).select_related("brand", "category"):
+            if kind == "reprice":
+                p.price = (p.price * Decimal("0.9")).quantize(Decimal("0.01"))
+                p.save()
+            elif kind == "recategorize":
+                p.category = category
+                p.save()
+            else:
+                p.delete()
+
+
+def set_based(kind, ids, category):
+    from shop.bulk import delete_products, recategorize, reprice
+    from shop.models import Product
+    qs = Product.objects.filter(id__in=ids)
+    if kind == "reprice":
+        reprice(qs, -10)
+    elif kind == "recategorize":
+        recategorize(qs, category.pk)
+    else:
+        delete_products(qs)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--products", type=int, default=20000)
+    ap.add_argument("--repeat", type=int, default=10)
+    ap.add_argument("--batch", type=int, default=1000, help="products per bulk action")
+    args = ap.parse_args(argv)
+
+    bootstrap()
+    from django.contrib import admin
+    from django.contrib.auth.models import User
+    from shop.models import Brand, Category, Product
+    from shop.synthetic import generate_catalog
+
+    generate_catalog(args.products, brands=200)
+    user = User.objects.create_superuser("bench", "bench@example.com", "bench")
+    brand = Brand.objects.order_by("id").values_list("id", flat=True).first()
+    pages = [
+        ("first page", {}),
+        ("brand filter", {"brand__id__exact": brand}),
+        ("search", {"q": "brake"}),
+        ("search + brand", {"q": "brake", "brand__id__exact": brand}),
+        ("page 50", {"p": 50}),
+    ]
+    admins = (("stock", stock_site()), ("shop", admin.site._registry[Product]))
+
+    rows = []
+    for label, query in pages:
+        row = [label]
+        for _, model_admin in admins:
+            changelist(model_admin, user, query, 1)  # warm caches and templates
+            ms, queries = changelist(model_admin, user, query, args.repeat)
+            row += [f"{ms:.1f}", queries]
+        rows.append(row)
+    print(f"{args.products} products, median of {args.repeat}\n")
+    table(("changelist", "stock ms", "stock queries", "shop ms", "shop queries"), rows)
+
+    target = Category.objects.get_or_create(name="Bench moved")[0]
+    ids = iter(Product.objects.order_by("id").values_list("id", flat=True))
+    rows = []
+    for kind in ("reprice", "recategorize", "delete"):
+        row = [kind]
+        for run in (per_object, set_based):
+            batch = [next(ids) for _ in range(args.batch)]
+            t0 = time.perf_counter()
+            run(kind, batch, target)
+            row.append(f"{(time.perf_counter() - t0) * 1000:.0f}")
+        rows.append(row)
+    print(f"\n{args.batch} products per action\n")
+    table(("action", "per object ms", "set-based ms"), rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""JSON catalog API: page latency, payload size and export memory.
+
+    python -m benchmarks.api [--sizes 5000,50000] [--repeat 30]
+
+For each catalog size, times one API page through the full request stack,
+reports its size with and without gzip, and measures the peak Python memory
+of the NDJSON export against a json.dumps of the whole catalog built from
+model instances.
+"""
+import argparse
+import json
+import random
+import tracemalloc
+
+from benchmarks import bootstrap, table, timed
+from benchmarks.search import grow
+
+
+def peak_kib(fn):
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1] // 1024
+    finally:
+        tracemalloc.stop()
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", default="5000,50000")
+    ap.add_argument("--repeat", type=int, default=30)
+    args = ap.parse_args(argv)
+    bootstrap()
+    from django.core.serializers.json import DjangoJSONEncoder
+    from django.test import Client
+    from django.test.utils import setup_test_environment
+    from shop.api import DEFAULT_FIELDS, _image_url
+    from shop.models import Product
+
+    setup_test_environment()
+    client = Client()
+    rng = random.Random(7)
+
+    def api_page():
+        return client.get("/api/products/").content
+
+    def export():
+        r = client.get("/api/products.ndjson")
+        return sum(len(chunk) for chunk in r.streaming_content)
+
+    def dump_all():
+        rows = list(Product.objects.select_related("brand", "category").order_by("id"))
+        return len(json.dumps([{"id": p.id, "name": p.name, "brand": p.brand.name if p.brand else None,
+                                "category": p.category.name, "price": p.price, "image": _image_url(
+                                    {"image": p.image.name, "image_url": p.image_url,
+                                     "mirrored_image": p.mirrored_image.name})} for p in rows],
+                              cls=DjangoJSONEncoder))
+
+    out = []
+    for size in [int(s) for s in args.sizes.split(",")]:
+        grow(size, rng)
+        api = timed(api_page, args.repeat)
+        body = api_page()
+        gz = len(client.get("/api/products/", HTTP_ACCEPT_ENCODING="gzip").content)
+        out.append((size, f"{api[0]:.2f}", f"{api[1]:.2f}", len(body), gz,
+                    peak_kib(dump_all), peak_kib(export)))
+    print(f"fields: {','.join(DEFAULT_FIELDS)}")
+    table(("products", "page p50 ms", "page p95 ms", "page bytes", "gzip bytes",
+           "list dump KiB", "ndjson KiB"), out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""WSGI (sync gunicorn workers) vs ASGI (uvicorn workers + shop/async_views.py).
+
+    python -m benchmarks.asgi [--workers 2] [--connections 16,64,256] [--seconds 5]
+
+Each virtual user loops: four catalog page views, then an add-to-cart XHR,
+opening a new connection per request (sync workers don't keep connections
+alive). Reports sustained throughput, p50/p99 latency and errors per
+concurrency level. The client is asyncio so it can hold hundreds of
+connections from one thread.
+"""
+import argparse
+import asyncio
+import os
+import signal
+import subprocess
+import sys
+import time
+from http.cookies import SimpleCookie
+
+from benchmarks import ROOT, bootstrap, free_port, gunicorn, table
+
+
+class User:
+    def __init__(self, port):
+        self.port = port
+        self.cookies = {}
+
+    async def request(self, method, path, body=b"", headers=None):
+        reader, writer = await asyncio.open_connection("127.0.0.1", self.port)
+        head = {"Host": f"127.0.0.1:{self.port}", "Connection": "close", "Content-Length": str(len(body))}
+        head.update(headers or {})
+        if self.cookies:
+            head["Cookie"] = "; ".join(f"{k}={v}" for k, v in self.cookies.items())
+        writer.write(f"{method} {path} HTTP/1.1\r\n".encode()
+                     + "".join(f"{k}: {v}\r\n" for k, v in head.items()).encode() + b"\r\n" + body)
+        await writer.drain()
+        raw = await reader.read()
+        writer.close()
+        header, _, _ = raw.partition(b"\r\n\r\n")
+        lines = header.decode("latin-1").split("\r\n")
+        status = int(lines[0].split()[1])
+        for line in lines[1:]:
+            if line.lower().startswith("set-cookie:"):
+                for name, morsel in SimpleCookie(line.split(":", 1)[1].strip()).items():
+                    self.cookies[name] = morsel.value
+        return status
+
+    async def add(self, pid):
+        return await self.request("POST", f"/cart/add/{pid}/", b"qty=1", {
+            "Content-Type": "application/x-www-form-urlencoded", "X-Requested-With": "XMLHttpRequest",
+            "X-CSRFToken": self.cookies.get("csrftoken", ""), "Referer": f"http://127.0.0.1:{self.port}/",
+        })
+
+
+async def load(port, connections, seconds, product_ids):
+    latencies, errors = [], 0
+    stop = time.monotonic() + seconds
+
+    async def user(n):
+        nonlocal errors
+        u = User(port)
+        await u.request("GET", "/")
+        i = n
+        while time.monotonic() < stop:
+            i += 1
+            t0 = time.perf_counter()
+            try:
+                status = await (u.add(product_ids[i % len(product_ids)]) if i % 5 == 0 else u.request("GET", "/"))
+            except OSError:
+                status = 0
+            latencies.append((time.perf_counter() - t0) * 1000)
+            errors += status != 200
+
+    await asyncio.gather(*(user(n) for n in range(connections)))
+    latencies.sort()
+    return latencies, errors
+
+
+def serve(mode, port, workers, env):
+    if mode == "wsgi":
+        return gunicorn("bikeshop.wsgi", port, workers, env)
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "bikeshop.asgi", "-k", "uvicorn.workers.UvicornWorker",
+         "-b", f"127.0.0.1:{port}", "-w", str(workers), "--log-level", "warning"],
+        cwd=ROOT, env=dict(env, ASYNC_VIEWS="True"),
+    )
+    time.sleep(3)
+    return proc
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--workers", type=int, default=2)
+    ap.add_argument("--connections", default="16,64,256")
+    ap.add_argument("--seconds", type=float, default=5)
+    args = ap.parse_args()
+
+    data_dir = bootstrap()
+    from shop.cards import rebuild_cards
+    from shop.models import Brand, Category, Product
+    brand = Brand.objects.create(name="Bench")
+    category = Category.objects.get_or_create(name="Brakes")[0]
+    Product.objects.bulk_create(Product(name=f"ASGI bench {i}", brand=brand, category=category, price="19.99")
+                                for i in range(2000))
+    rebuild_cards()
+    product_ids = list(Product.objects.values_list("id", flat=True)[:200])
+    env = dict(os.environ, DATA_DIR=str(data_dir))
+
+    rows = []
+    for mode in ("wsgi", "asgi"):
+        port = free_port()
+        proc = serve(mode, port, args.workers, env)
+        try:
+            asyncio.run(load(port, 4, 1, product_ids))  # warm caches
+            for c in map(int, args.connections.split(",")):
+                latencies, errors = asyncio.run(load(port, c, args.seconds, product_ids))
+                n = len(latencies)
+                rows.append([mode, c, n, errors, f"{n / args.seconds:.0f}",
+                             f"{latencies[n // 2]:.0f}", f"{latencies[min(n - 1, int(n * 0.99))]:.0f}"])
+        finally:
+            proc.send_signal(signal.SIGTERM)
+            proc.wait()
+
+    print(f"{args.workers} workers each, {args.seconds:.0f}s per level, 4 catalog views : 1 add-to-cart\n")
+    table(["server", "connections", "requests", "errors", "req/s", "p50 ms", "p99 ms"], rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""Query budgets: SQL queries per view over the main shopper and staff journeys.
+
+    python -m benchmarks.budgets [--products 200] [--warm]
+
+Walks the catalog, cart, checkout, uploader and API views in-process with
+the test client, emptying the caches before every request (unless --warm),
+and reads each response's query count from its Server-Timing header. Prints
+the worst count per view next to settings.QUERY_BUDGETS and exits with
+status 1 if any view is over budget, so CI can run it.
+"""
+import argparse
+import io
+import re
+import sys
+
+from benchmarks import bootstrap, table
+
+QUERIES_RE = re.compile(r'db;dur=[\d.]+;desc="(\d+) queries"')
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--products", type=int, default=200)
+    ap.add_argument("--warm", action="store_true", help="keep caches between requests")
+    args = ap.parse_args(argv)
+
+    bootstrap()
+    from django.conf import settings
+    from django.contrib.auth.models import User
+    from django.core.cache import cache
+    from django.test import Client
+    from django.test.utils import setup_test_environment
+    from PIL import Image
+    from shop.cards import rebuild_cards
+    from shop.models import Brand, Category, Product
+    from shop.recommend import build_recommendations
+
+    setup_test_environment()
+    settings.SERVER_TIMING = True
+    brands = [Brand.objects.create(name=n) for n in ("Shimano", "SRAM", "Hope")]
+    cats = [Category.objects.get_or_create(name=n)[0] for n in ("Brakes", "Tires", "Wheels")]
+    Product.objects.bulk_create(
+        Product(name=f"Budget part {i}", brand=brands[i % 3], category=cats[i % 3], price="19.99",
+                search_document=f"Budget part {i} {brands[i % 3].name} {cats[i % 3].name}")
+        for i in range(args.products))
+    rebuild_cards()
+    build_recommendations()
+    ids = list(Product.objects.order_by("-id").values_list("id", flat=True)[:15])
+    User.objects.create_user("staff", password="pw", is_staff=True)
+
+    worst = {}
+
+    def hit(client, method, url, **kw):
+        if not args.warm:
+            cache.clear()
+        r = getattr(client, method)(url, **kw)
+        m = QUERIES_RE.search(r.get("Server-Timing", ""))
+        view = r.resolver_match.view_name if r.resolver_match else url
+        worst[view] = max(worst.get(view, 0), int(m.group(1)) if m else -1)
+        return r
+
+    xhr = {"HTTP_X_REQUESTED_WITH": "XMLHttpRequest"}
+    for who in ("anonymous", "staff"):
+        c = Client()
+        if who == "staff":
+            c.post("/login/", {"username": "staff", "password": "pw"})
+        for url in ("/", "/?cat=Brakes", "/?brand=SRAM", "/?q=budget+part", "/?cat=Tires&brand=Hope"):
+            r = hit(c, "get", url)
+        nxt = re.search(r'href="(\?after=[^"]+)"', r.content.decode()) or re.search(r'href="(\?[^"]*after=[^"]+)"', hit(c, "get", "/").content.decode())
+        if nxt:
+            hit(c, "get", "/" + nxt.group(1).replace("&amp;", "&"))
+        for pid in ids[:5]:
+            hit(c, "post", f"/cart/add/{pid}/", data={"qty": 1}, **xhr)
+        hit(c, "post", f"/cart/update/{ids[0]}/", data={"qty": 3}, **xhr)
+        hit(c, "post", f"/cart/remove/{ids[1]}/", **xhr)
+        hit(c, "get", "/cart/")
+        r = hit(c, "get", "/checkout/")
+        key = re.search(r'name="idempotency_key" value="([^"]+)"', r.content.decode()).group(1)
+        hit(c, "post", "/checkout/", data={"idempotency_key": key, "full_name": "A", "address": "1 Road",
+                                           "phone": "123", "email": "a@example.com"})
+        hit(c, "get", "/success/")
+        for url in ("/api/products/", "/api/products/?q=budget", f"/api/products/{ids[0]}/",
+                    f"/api/products/{ids[0]}/related/", "/api/categories/", "/api/brands/?cat=Brakes"):
+            hit(c, "get", url)
+        if who == "staff":
+            hit(c, "get", "/uploader/")
+            buf = io.BytesIO()
+            Image.new("RGB", (64, 64), "red").save(buf, "JPEG")
+            buf.seek(0)
+            buf.name = "budget.jpg"
+            r = hit(c, "post", "/uploader/api/batch/", data={"image": buf, "name": "Budget upload", "category": "Brakes"})
+            hit(c, "get", "/uploader/api/jobs/?ids=" + ",".join(str(j["id"]) for j in r.json()["jobs"]))
+            hit(c, "post", f"/products/{ids[4]}/delete/", **xhr)
+            hit(c, "post", "/products/delete/", data={"ids": ",".join(map(str, ids[5:15]))})
+            hit(c, "get", "/cache/stats/")
+            hit(c, "get", "/metrics")
+
+    budgets = settings.QUERY_BUDGETS
+    rows, over = [], []
+    for view, n in sorted(worst.items()):
+        budget = budgets.get(view)
+        flag = "OVER" if budget is not None and n > budget else ""
+        if flag:
+            over.append(view)
+        rows.append((view, n, "-" if budget is None else budget, flag))
+    table(("view", "max queries", "budget", ""), rows)
+    if over:
+        print(f"\n{len(over)} view(s) over budget: {', '.join(over)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""Concurrent cart mutations under gunicorn, per cart storage backend.
+
+    python -m benchmarks.cart [--workers 4] [--clients 16] [--seconds 5]
+
+Each simulated shopper keeps its own cookies and loops add / update / remove
+against /cart/... as XHR POSTs, the same calls the catalog page's JS makes.
+The session backend writes django_session on every call, which SQLite
+serializes; the cookie and cache backends don't touch the database for
+mutations (the JSON replies still read product prices).
+"""
+import argparse
+import http.client
+import os
+import signal
+import threading
+import time
+from http.cookies import SimpleCookie
+
+from benchmarks import bootstrap, free_port, gunicorn, table, worker_cpu
+
+BACKENDS = ("session", "cache", "cookie")
+
+
+class Shopper:
+    def __init__(self, port):
+        self.port = port
+        self.cookies = {}
+
+    def request(self, method, path, body=None, headers=None):
+        headers = dict(headers or {})
+        if self.cookies:
+            headers["Cookie"] = "; ".join(f"{k}={v}" for k, v in self.cookies.items())
+        conn = http.client.HTTPConnection("127.0.0.1", self.port, timeout=30)
+        conn.request(method, path, body=body, headers=headers)
+        resp = conn.getresponse()
+        data = resp.read()
+        conn.close()
+        for header in resp.headers.get_all("Set-Cookie") or []:
+            for name, morsel in SimpleCookie(header).items():
+                if morsel["max-age"] == "0":
+                    self.cookies.pop(name, None)
+                else:
+                    self.cookies[name] = morsel.value
+        return resp.status, data
+
+    def post(self, path, data=""):
+        return self.request("POST", path, data, {
+            "Content-Type": "application/x-www-form-urlencoded",
+            "X-Requested-With": "XMLHttpRequest",
+            "X-CSRFToken": self.cookies.get("csrftoken", ""),
+            "Referer": f"http://127.0.0.1:{self.port}/",
+        })
+
+
+def shop(port, product_ids, seconds, n):
+    s = Shopper(port)
+    s.request("GET", "/")
+    if "csrftoken" not in s.cookies:
+        raise SystemExit("catalog page did not set a CSRF cookie")
+    latencies, errors, i = [], 0, n
+    stop = time.monotonic() + seconds
+    while time.monotonic() < stop:
+        pid = product_ids[i % len(product_ids)]
+        i += 1
+        for path, data in ((f"/cart/add/{pid}/", "qty=1"), (f"/cart/update/{pid}/", "qty=3"),
+                           (f"/cart/remove/{pid}/", "")):
+            t0 = time.perf_counter()
+            status, _ = s.post(path, data)
+            latencies.append((time.perf_counter() - t0) * 1000)
+            errors += status != 200
+    return latencies, errors
+
+
+def run(backend, port, master, product_ids, args):
+    results = []
+    threads = [threading.Thread(target=lambda n=n: results.append(shop(port, product_ids, args.seconds, n)))
+               for n in range(args.clients)]
+    cpu0 = worker_cpu(master)
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    cpu = worker_cpu(master) - cpu0
+    latencies = sorted(l for r, _ in results for l in r)
+    errors = sum(e for _, e in results)
+    n = len(latencies)
+    return [backend, n, errors, f"{n / args.seconds:.0f}", f"{latencies[n // 2]:.1f}",
+            f"{latencies[int(n * 0.95)]:.1f}", f"{cpu * 1000 / n:.2f}"]
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--workers", type=int, default=4)
+    ap.add_argument("--clients", type=int, default=16)
+    ap.add_argument("--seconds", type=float, default=5)
+    args = ap.parse_args()
+
+    data_dir = bootstrap()
+    from shop.models import Brand, Category, Product
+    brand = Brand.objects.create(name="Bench")
+    category = Category.objects.get_or_create(name="Brakes")[0]
+    Product.objects.bulk_create(Product(name=f"Cart bench {i}", brand=brand, category=category, price="9.99")
+                                for i in range(50))
+    product_ids = list(Product.objects.values_list("id", flat=True))
+
+    rows = []
+    for backend in BACKENDS:
+        port = free_port()
+        # the file cache is shared by all workers; locmem would give each worker its own carts
+        env = dict(os.environ, DATA_DIR=str(data_dir), CART_STORAGE=backend, CART_CACHE="catalog")
+        proc = gunicorn("bikeshop.wsgi", port, args.workers, env)
+        try:
+            rows.append(run(backend, port, proc.pid, product_ids, args))
+        finally:
+            proc.send_signal(signal.SIGTERM)
+            proc.wait()
+
+    print(f"{args.workers} sync workers, {args.clients} shoppers, {args.seconds:.0f}s per backend, SQLite\n")
+    table(["backend", "requests", "errors", "req/s", "p50 ms", "p95 ms", "worker CPU ms/req"], rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Cart AJAX mutation cost: the old three-pass path vs CartSummary.
+
+    python -m benchmarks.cart_summary [--repeat 200]
+
+For carts of 1 to 200 lines, times what update_qty does to build its JSON
+reply: previously set_quantity + cart_items (Product fetch with
+select_related) + cart_total_qty + a scan for the line subtotal; now one
+CartSummary with prices from the per-catalog-version cache.
+"""
+import argparse
+from types import SimpleNamespace
+
+from benchmarks import bootstrap, table, timed
+
+SIZES = (1, 10, 50, 200)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--repeat", type=int, default=200)
+    args = ap.parse_args()
+
+    bootstrap()
+    from django.contrib.sessions.backends.signed_cookies import SessionStore
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+    from shop.cart import CartSummary, cart_items, cart_total_qty, set_quantity
+    from shop.cart_storage import SessionCart
+    from shop.models import Brand, Category, Product
+
+    brand = Brand.objects.create(name="Bench")
+    category = Category.objects.get_or_create(name="Brakes")[0]
+    Product.objects.bulk_create(Product(name=f"Summary bench {i}", brand=brand, category=category, price="12.50")
+                                for i in range(max(SIZES)))
+    ids = list(Product.objects.values_list("id", flat=True))
+
+    def legacy(store, pid):
+        set_quantity(store, pid, 3)
+        items, total = cart_items(store)
+        sub = next((it["subtotal"] for it in items if it["product"].id == pid), 0)
+        return total, sub, cart_total_qty(store)
+
+    def summary(store, pid):
+        cart = CartSummary(store)
+        cart.set(pid, 3)
+        return cart.total, cart.subtotal(pid), cart.count
+
+    rows = []
+    for n in SIZES:
+        store = SessionCart(SimpleNamespace(session=SessionStore()))
+        store.save({str(pid): 1 for pid in ids[:n]})
+        pid = ids[n - 1]
+        assert legacy(store, pid) == summary(store, pid)
+        row = [n]
+        for fn in (legacy, summary):
+            with CaptureQueriesContext(connection) as q:
+                fn(store, pid)
+            p50, p95 = timed(lambda: fn(store, pid), args.repeat)
+            row += [len(q), f"{p50:.3f}", f"{p95:.3f}"]
+        rows.append(row)
+
+    table(["lines", "old queries", "old p50 ms", "old p95 ms", "new queries", "new p50 ms", "new p95 ms"], rows)
+
+
+if __name__ == "__main__":
+    main()
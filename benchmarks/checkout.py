@@ -0,0 +1,118 @@
+"""Parallel checkouts under gunicorn, with duplicate submissions.
+
+    python -m benchmarks.checkout [--workers 4] [--shoppers 16] [--orders 5] [--dupes 3]
+    DATABASE_URL=postgres://... python -m benchmarks.checkout   # against Postgres
+
+Every shopper fills a 3-line cart, renders the checkout form and then fires
+--dupes identical POSTs at once (a double-clicked "Confirm & Pay"). Afterwards
+the database must hold exactly one order per rendered form, each with the
+right lines and total; the script exits non-zero if not.
+"""
+import argparse
+import os
+import re
+import signal
+import threading
+import time
+from decimal import Decimal
+
+from benchmarks import bootstrap, free_port, gunicorn, table
+from benchmarks.cart import Shopper
+
+KEY_RE = re.compile(r'name="idempotency_key" value="([^"]+)"')
+
+
+def checkout_round(port, product_ids, dupes):
+    s = Shopper(port)
+    s.request("GET", "/")
+    for pid in product_ids:
+        s.post(f"/cart/add/{pid}/", "qty=2")
+    _, html = s.request("GET", "/checkout/")
+    key = KEY_RE.search(html.decode()).group(1)
+    body = f"address=1+Main+St&phone=5550100&idempotency_key={key}"
+    statuses = []
+
+    def submit():
+        twin = Shopper(port)
+        twin.cookies = dict(s.cookies)
+        statuses.append(twin.post("/checkout/", body)[0])
+
+    threads = [threading.Thread(target=submit) for _ in range(dupes)]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return key, statuses, (time.perf_counter() - t0) * 1000
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--workers", type=int, default=4)
+    ap.add_argument("--shoppers", type=int, default=16)
+    ap.add_argument("--orders", type=int, default=5, help="checkouts per shopper")
+    ap.add_argument("--dupes", type=int, default=3, help="identical POSTs per checkout")
+    args = ap.parse_args()
+
+    data_dir = bootstrap()
+    from django.db import connection
+    from shop.models import Brand, Category, Order, Product
+    brand = Brand.objects.create(name="Bench")
+    category = Category.objects.get_or_create(name="Brakes")[0]
+    Product.objects.bulk_create(Product(name=f"Checkout bench {i}", brand=brand, category=category,
+                                        price=Decimal("4.25") * (i + 1)) for i in range(30))
+    ids = list(Product.objects.order_by("id").values_list("id", flat=True))
+    prices = dict(Product.objects.values_list("id", "price"))
+
+    port = free_port()
+    proc = gunicorn("bikeshop.wsgi", port, args.workers, dict(os.environ, DATA_DIR=str(data_dir)))
+    results, lock = [], threading.Lock()
+
+    def shopper(n):
+        for i in range(args.orders):
+            picked = [ids[(n * 7 + i * 3 + j) % len(ids)] for j in range(3)]
+            r = checkout_round(port, picked, args.dupes)
+            with lock:
+                results.append((picked, *r))
+
+    try:
+        t0 = time.perf_counter()
+        threads = [threading.Thread(target=shopper, args=(n,)) for n in range(args.shoppers)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - t0
+    finally:
+        proc.send_signal(signal.SIGTERM)
+        proc.wait()
+
+    problems = []
+    orders = {o.idempotency_key: o for o in Order.objects.prefetch_related("lines")}
+    for picked, key, statuses, _ in results:
+        o = orders.get(key)
+        if o is None:
+            problems.append(f"{key}: no order ({statuses})")
+            continue
+        expected = sum(prices[p] * 2 for p in picked)
+        if sorted(l.product_id for l in o.lines.all()) != sorted(picked) or o.total != expected:
+            problems.append(f"{key}: wrong lines/total {o.total} != {expected}")
+        if any(s != 302 for s in statuses):
+            problems.append(f"{key}: statuses {statuses}")
+    extra = len(orders) - len(results)
+
+    latencies = sorted(ms for *_, ms in results)
+    n = len(results)
+    print(f"{connection.vendor}, {args.workers} sync workers, {args.shoppers} shoppers x {args.orders} checkouts, "
+          f"{args.dupes} concurrent POSTs each\n")
+    table(["checkouts", "POSTs", "orders", "duplicates", "checkouts/s", "p50 ms", "p95 ms"],
+          [[n, n * args.dupes, len(orders), max(extra, 0), f"{n / elapsed:.1f}",
+            f"{latencies[n // 2]:.1f}", f"{latencies[int(n * 0.95)]:.1f}"]])
+    for p in problems[:10]:
+        print("PROBLEM", p)
+    if problems or extra:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
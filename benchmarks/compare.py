@@ -0,0 +1,74 @@
+"""Compare two benchmark result files and flag regressions.
+
+    python -m benchmarks.compare base.json head.json [--threshold 0.15] [--all]
+
+Metrics present in both files are compared in the direction each one
+declares ("lower" or "higher" is better). A change worse than --threshold
+(relative) is a regression and makes the exit status 1, unless a timing
+moved by less than --floor milliseconds. Counters (errors) regress on any
+increase. Timings are noisy: compare runs made on the same
+machine with the same parameters, and prefer medians over tails.
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+
+from benchmarks import table
+
+
+def load(path):
+    return json.loads(Path(path).read_text())
+
+
+def verdict(metric, base, head, threshold, floor):
+    if metric["unit"] == "count":
+        return "REGRESSION" if head > base else ("improved" if head < base else "")
+    if not base or (metric["unit"] == "ms" and abs(head - base) < floor):
+        return ""
+    change = (head - base) / base
+    if metric["better"] == "higher":
+        change = -change
+    if change > threshold:
+        return "REGRESSION"
+    if change < -threshold:
+        return "improved"
+    return ""
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser()
+    ap.add_argument("base")
+    ap.add_argument("head")
+    ap.add_argument("--threshold", type=float, default=0.15, help="relative change that counts (0.15 = 15%%)")
+    ap.add_argument("--floor", type=float, default=0.1, help="ignore timing changes below this many ms")
+    ap.add_argument("--all", action="store_true", help="also list unchanged metrics")
+    args = ap.parse_args(argv)
+
+    base, head = load(args.base), load(args.head)
+    print(f"base {base['meta']['commit']}{'+' if base['meta']['dirty'] else ''} ({base['meta']['time']})  "
+          f"head {head['meta']['commit']}{'+' if head['meta']['dirty'] else ''} ({head['meta']['time']})")
+    if base.get("params") != head.get("params"):
+        print("warning: the runs used different parameters")
+    rows, regressions = [], 0
+    for name in sorted(set(base["metrics"]) & set(head["metrics"])):
+        b, h = base["metrics"][name], head["metrics"][name]
+        v = verdict(h, b["value"], h["value"], args.threshold, args.floor)
+        regressions += v == "REGRESSION"
+        if v or args.all:
+            delta = f"{(h['value'] - b['value']) / b['value']:+.0%}" if b["value"] else "n/a"
+            rows.append((name, f"{b['value']:g}", f"{h['value']:g}", h["unit"], delta, v))
+    only = sorted(set(base["metrics"]) ^ set(head["metrics"]))
+    if rows:
+        table(("metric", "base", "head", "unit", "change", ""), rows)
+    else:
+        print(f"no changes beyond {args.threshold:.0%}")
+    if only:
+        print(f"\n{len(only)} metric(s) in only one file, e.g. {only[0]}")
+    if regressions:
+        print(f"\n{regressions} regression(s)")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
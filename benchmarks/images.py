@@ -0,0 +1,60 @@
+"""Catalog grid image weight: originals vs. generated derivatives.
+
+    python -m benchmarks.images [--workers 4]
+
+Copies media/products/ into a scratch dir, builds the derivatives and reports
+the bytes a 12-card grid page downloads at 1x (300w) and 2x (600w) density.
+"""
+import argparse
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from benchmarks import ROOT, table
+from shop.images import generate_derivatives
+
+PER_PAGE = 12
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--workers", type=int, default=4)
+    args = ap.parse_args(argv)
+
+    work = Path(tempfile.mkdtemp(prefix="bikeshop-img-"))
+    originals = sorted((ROOT / "media" / "products").glob("*.jpg"))
+    for f in originals:
+        shutil.copy(f, work / f.name)
+    copies = [work / f.name for f in originals]
+
+    t0 = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        results = list(pool.map(generate_derivatives, copies))
+    elapsed = time.perf_counter() - t0
+
+    def size(p):
+        return p.stat().st_size if p.exists() else 0
+
+    def pick(f, widths, w, fmt):
+        # what the browser downloads: the derivative if it exists, else the original
+        return size(f.with_name(f"{f.stem}.{w}w.{fmt}")) if w in widths else size(f)
+
+    rows = []
+    for label, fn in (
+        ("original", lambda f, ws: size(f)),
+        ("300w webp", lambda f, ws: pick(f, ws, 300, "webp")),
+        ("300w jpg", lambda f, ws: pick(f, ws, 300, "jpg")),
+        ("600w webp", lambda f, ws: pick(f, ws, 600, "webp")),
+    ):
+        total = sum(fn(f, ws) for f, ws in zip(copies, results))
+        per_page = total / len(copies) * PER_PAGE
+        rows.append((label, f"{total / 1024:.0f}", f"{per_page / 1024:.0f}"))
+    table(("variant", "all images KiB", "12-card page KiB"), rows)
+    print(f"\n{len(copies)} images resized in {elapsed:.2f}s with {args.workers} workers")
+    shutil.rmtree(work)
+
+
+if __name__ == "__main__":
+    main()
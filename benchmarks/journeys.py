@@ -0,0 +1,143 @@
+"""Scripted shopper journeys against gunicorn.
+
+    python -m benchmarks.journeys [--products 5000] [--workers 2] [--clients 8] [--seconds 20] [--json out.json]
+
+Generates a synthetic catalog (shop/synthetic.py), starts gunicorn on it and
+runs --clients concurrent shoppers, each looping the journey
+
+    browse -> category -> next page -> search -> add x2 -> cart -> checkout form -> place order -> success
+
+with its own cookies, parsing links, product ids and the idempotency key out
+of the pages like a browser would. Reports per-step latency percentiles,
+completed journeys/s and worker CPU per journey.
+"""
+import argparse
+import os
+import random
+import re
+import signal
+import threading
+import time
+from collections import defaultdict
+from urllib.parse import urlencode
+
+from benchmarks import Results, bootstrap, free_port, gunicorn, percentile, table, worker_cpu
+from benchmarks.cart import Shopper
+
+STEPS = ("browse", "category", "next_page", "search", "add", "cart", "checkout_form", "place_order", "success")
+SEARCHES = ["carbon", "disc brake", "tubeless rim", "hydr", "race pro", "gravel tire"]
+ADD_RE = re.compile(r'action="/cart/add/(\d+)/"')
+NEXT_RE = re.compile(r'href="(\?[^"]*after=[^"]+)"')
+KEY_RE = re.compile(r'name="idempotency_key" value="([^"]+)"')
+
+
+class Journey:
+    def __init__(self, port, categories, seed):
+        self.shopper = Shopper(port)
+        self.categories = categories
+        self.rng = random.Random(seed)
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.completed = 0
+
+    def step(self, name, method, path, body=None, expect=200):
+        t0 = time.perf_counter()
+        if method == "GET":
+            status, data = self.shopper.request("GET", path)
+        else:
+            status, data = self.shopper.post(path, body)
+        self.latencies[name].append((time.perf_counter() - t0) * 1000)
+        if status != expect:
+            self.errors[name] += 1
+            raise LookupError(f"{name}: {path} returned {status}")
+        return data.decode()
+
+    def run_once(self):
+        self.step("browse", "GET", "/")
+        cat = self.rng.choice(self.categories)
+        html = self.step("category", "GET", "/?" + urlencode({"cat": cat}))
+        nxt = NEXT_RE.search(html)
+        if nxt:
+            html = self.step("next_page", "GET", "/" + nxt.group(1).replace("&amp;", "&"))
+        found = self.step("search", "GET", "/?" + urlencode({"q": self.rng.choice(SEARCHES)}))
+        ids = ADD_RE.findall(found) or ADD_RE.findall(html)
+        for pid in self.rng.sample(ids, min(2, len(ids))):
+            self.step("add", "POST", f"/cart/add/{pid}/", "qty=1")
+        self.step("cart", "GET", "/cart/")
+        key = KEY_RE.search(self.step("checkout_form", "GET", "/checkout/")).group(1)
+        self.step("place_order", "POST", "/checkout/",
+                  f"full_name=Load+Test&address=1+Bench+Rd&phone=5550100&idempotency_key={key}", expect=302)
+        self.step("success", "GET", "/success/")
+        self.completed += 1
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--products", type=int, default=5000)
+    ap.add_argument("--images", type=int, default=8)
+    ap.add_argument("--workers", type=int, default=2)
+    ap.add_argument("--clients", type=int, default=8)
+    ap.add_argument("--seconds", type=float, default=20)
+    ap.add_argument("--json", help="write results to this file")
+    args = ap.parse_args(argv)
+
+    data_dir = bootstrap()
+    from shop.models import Category
+    from shop.synthetic import generate_catalog
+    generate_catalog(args.products, brands=25, images=args.images)
+    categories = list(Category.objects.filter(product__isnull=False).distinct().values_list("name", flat=True))
+
+    port = free_port()
+    proc = gunicorn("bikeshop.wsgi", port, args.workers, dict(os.environ, DATA_DIR=str(data_dir)))
+    journeys = [Journey(port, categories, seed) for seed in range(args.clients)]
+    stop = time.monotonic() + args.seconds
+
+    def loop(j):
+        while time.monotonic() < stop:
+            j.shopper.cookies.clear()  # a new visitor each time round
+            try:
+                j.run_once()
+            except (LookupError, AttributeError, OSError):
+                pass
+
+    try:
+        cpu0 = worker_cpu(proc.pid)
+        t0 = time.perf_counter()
+        threads = [threading.Thread(target=loop, args=(j,)) for j in journeys]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - t0
+        cpu = worker_cpu(proc.pid) - cpu0
+    finally:
+        proc.send_signal(signal.SIGTERM)
+        proc.wait()
+
+    results = Results("journeys", products=args.products, workers=args.workers, clients=args.clients,
+                      seconds=args.seconds)
+    rows, requests = [], 0
+    for step in STEPS:
+        samples = sorted(l for j in journeys for l in j.latencies[step])
+        errors = sum(j.errors[step] for j in journeys)
+        requests += len(samples)
+        if not samples:
+            continue
+        p50, p95, p99 = (percentile(samples, q) for q in (0.5, 0.95, 0.99))
+        rows.append((step, len(samples), errors, f"{p50:.1f}", f"{p95:.1f}", f"{p99:.1f}"))
+        results.add(f"{step}.p50_ms", p50)
+        results.add(f"{step}.p95_ms", p95)
+        results.add(f"{step}.errors", errors, unit="count")
+    done = sum(j.completed for j in journeys)
+    print(f"{args.products} products, {args.workers} sync workers, {args.clients} shoppers, {args.seconds:.0f}s\n")
+    table(("step", "requests", "errors", "p50 ms", "p95 ms", "p99 ms"), rows)
+    print(f"\n{done} journeys ({done / elapsed:.1f}/s), {requests / elapsed:.0f} req/s, "
+          f"{cpu * 1000 / max(done, 1):.0f} ms worker CPU per journey")
+    results.add("journeys_per_s", done / elapsed, unit="1/s", better="higher")
+    results.add("requests_per_s", requests / elapsed, unit="1/s", better="higher")
+    results.add("cpu_ms_per_journey", cpu * 1000 / max(done, 1))
+    results.write(args.json)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""Media serving under gunicorn: django.views.static.serve vs shop.media.serve.
+
+    python -m benchmarks.media [--workers 2] [--clients 8] [--seconds 5] [--size-kb 200]
+
+Starts gunicorn (sync workers) on a scratch MEDIA_ROOT and hammers one file
+through each route. Reports requests/sec, client-side latency and worker CPU
+per 1000 requests (read from /proc for the worker processes), which is the
+cost a worker is occupied for that a CDN/browser cache or nginx would take
+off our hands.
+"""
+import argparse
+import http.client
+import os
+import signal
+import threading
+import time
+
+from benchmarks import bootstrap, free_port, gunicorn, table, worker_cpu
+
+
+def get(port, path, headers):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+    conn.request("GET", path, headers=headers)
+    resp = conn.getresponse()
+    body = resp.read()
+    conn.close()
+    return resp, body
+
+
+def hammer(port, path, headers, clients, seconds):
+    latencies, statuses = [], {}
+    lock = threading.Lock()
+    stop = time.monotonic() + seconds
+
+    def loop():
+        mine = []
+        while time.monotonic() < stop:
+            t0 = time.perf_counter()
+            resp, _ = get(port, path, headers)
+            mine.append((time.perf_counter() - t0) * 1000)
+            with lock:
+                statuses[resp.status] = statuses.get(resp.status, 0) + 1
+        with lock:
+            latencies.extend(mine)
+
+    threads = [threading.Thread(target=loop) for _ in range(clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    latencies.sort()
+    return latencies, statuses
+
+
+def run(label, port, master, path, headers, args):
+    cpu0 = worker_cpu(master)
+    latencies, statuses = hammer(port, path, headers, args.clients, args.seconds)
+    cpu = worker_cpu(master) - cpu0
+    n = len(latencies)
+    return [label, "/".join(map(str, sorted(statuses))), f"{n / args.seconds:.0f}",
+            f"{latencies[n // 2]:.1f}", f"{latencies[int(n * 0.95)]:.1f}", f"{cpu * 1000 / n * 1000:.0f}"]
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--workers", type=int, default=2)
+    ap.add_argument("--clients", type=int, default=8)
+    ap.add_argument("--seconds", type=float, default=5)
+    ap.add_argument("--size-kb", type=int, default=200)
+    args = ap.parse_args()
+
+    data_dir = bootstrap(migrate=False)
+    from django.core.files.storage import default_storage
+    media = data_dir / "media" / "products"
+    media.mkdir(parents=True, exist_ok=True)
+    (media / "bench.jpg").write_bytes(os.urandom(args.size_kb * 1024))
+    versioned = default_storage.url("products/bench.jpg")
+
+    env = dict(os.environ, DATA_DIR=str(data_dir), DJANGO_SETTINGS_MODULE="bikeshop.settings")
+    rows = []
+    for accel in ("", "/protected-media/"):
+        port = free_port()
+        proc = gunicorn("benchmarks.media_site:application", port, args.workers, dict(env, MEDIA_ACCEL_REDIRECT=accel))
+        try:
+            resp, _ = get(port, versioned, {})
+            etag = resp.getheader("ETag")
+            if not accel:
+                rows.append(run("static.serve", port, proc.pid, "/legacy-media/products/bench.jpg", {}, args))
+                rows.append(run("media.serve", port, proc.pid, versioned, {}, args))
+                rows.append(run("media.serve 304", port, proc.pid, versioned, {"If-None-Match": etag}, args))
+                rows.append(run("media.serve range 64K", port, proc.pid, versioned, {"Range": "bytes=0-65535"}, args))
+            else:
+                rows.append(run("X-Accel-Redirect", port, proc.pid, versioned, {}, args))
+        finally:
+            proc.send_signal(signal.SIGTERM)
+            proc.wait()
+
+    print(f"{args.size_kb} KiB file, {args.workers} sync workers, {args.clients} clients, {args.seconds:.0f}s each")
+    print(f"versioned URL: {versioned}  (Cache-Control: immutable, so repeat views never reach us)\n")
+    table(["route", "status", "req/s", "p50 ms", "p95 ms", "worker CPU ms/1k req"], rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,19 @@
+"""WSGI app for benchmarks.media: the normal site plus the old
+django.views.static.serve route mounted at /legacy-media/ for comparison."""
+import os
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "bikeshop.settings")
+
+from django.conf import settings  # noqa: E402
+from django.core.wsgi import get_wsgi_application  # noqa: E402
+
+application = get_wsgi_application()
+settings.ROOT_URLCONF = __name__
+
+from django.urls import include, re_path  # noqa: E402
+from django.views.static import serve  # noqa: E402
+
+urlpatterns = [
+    re_path(r"^legacy-media/(?P<path>.*)$", serve, {"document_root": settings.MEDIA_ROOT}),
+    re_path(r"", include("bikeshop.urls")),
+]
@@ -0,0 +1,101 @@
+"""In-process micro-benchmarks: cart helpers, the catalog page and import_products.
+
+    python -m benchmarks.micro [--products 5000] [--repeat 50] [--rows 20000] [--json out.json]
+
+Cart functions run against a cookie-backed cart store (no HTTP), the catalog
+page through the test client with cold and warm caches, and the importer
+over a generated CSV: a full import, then an --incremental re-run of the same
+feed with 1% of the rows changed.
+"""
+import argparse
+import csv
+import io
+import random
+from types import SimpleNamespace
+
+from benchmarks import Results, bootstrap, table, timed
+
+
+def feed(rows, seed, changed=0.0):
+    rng = random.Random(seed)
+    change = random.Random(seed + 1)
+    out = io.StringIO()
+    w = csv.writer(out)
+    w.writerow(["name", "brand", "category", "price", "image_url"])
+    for i in range(rows):
+        price = rng.randint(500, 90000) / 100
+        if changed and change.random() < changed:
+            price += 1
+        w.writerow([f"Feed part {i}", f"Feed brand {rng.randint(1, 40)}", rng.choice(["Brakes", "Tires", "Wheels"]),
+                    f"{price:.2f}", f"https://img.example.com/{i}.jpg"])
+    out.seek(0)
+    return out
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--products", type=int, default=5000)
+    ap.add_argument("--repeat", type=int, default=50)
+    ap.add_argument("--rows", type=int, default=20000, help="CSV rows for the importer runs")
+    ap.add_argument("--json", help="write results to this file")
+    args = ap.parse_args(argv)
+
+    bootstrap()
+    from django.core.cache import cache
+    from django.test import Client
+    from django.test.utils import setup_test_environment
+    from shop.cart import CartSummary, add_to_cart, cart_items, cart_total_qty, set_quantity
+    from shop.cart_storage import CookieCart
+    from shop.importer import ProductImporter
+    from shop.models import Product
+    from shop.synthetic import generate_catalog
+
+    setup_test_environment()
+    generate_catalog(args.products, brands=25)
+    ids = list(Product.objects.order_by("-id").values_list("id", flat=True)[:100])
+    results = Results("micro", products=args.products, repeat=args.repeat, rows=args.rows)
+    rows = []
+
+    def measure(name, fn, repeat=args.repeat):
+        p50, p95 = timed(fn, repeat)
+        rows.append((name, f"{p50:.3f}", f"{p95:.3f}"))
+        results.add(f"{name}.p50_ms", p50)
+        results.add(f"{name}.p95_ms", p95)
+
+    def store(lines):
+        s = CookieCart(SimpleNamespace(COOKIES={}))
+        s.save({str(pid): 1 for pid in ids[:lines]})
+        return s
+
+    for lines in (1, 20, 100):
+        s = store(lines)
+        measure(f"cart.add_to_cart.{lines}", lambda: add_to_cart(s, ids[0], 1))
+        measure(f"cart.set_quantity.{lines}", lambda: set_quantity(s, ids[0], 2))
+        measure(f"cart.cart_total_qty.{lines}", lambda: cart_total_qty(s))
+        measure(f"cart.cart_items.{lines}", lambda: cart_items(s))
+        measure(f"cart.summary_set.{lines}", lambda: CartSummary(s).set(ids[0], 3))
+
+    client = Client()
+
+    def cold():
+        cache.clear()
+        client.get("/?cat=Brakes")
+
+    measure("catalog.page_cold", cold, max(5, args.repeat // 5))
+    measure("catalog.page_warm", lambda: client.get("/?cat=Brakes"))
+
+    imports = []
+    for label, incremental, changed in (("import.full", False, 0.0), ("import.incremental_1pct", True, 0.01)):
+        # the delta run loads the stored hashes, so it is built after the full import
+        stats = ProductImporter(batch_size=1000, incremental=incremental).run(feed(args.rows, 7, changed))
+        imports.append((label, stats.rows, stats.written, f"{stats.elapsed:.2f}", f"{stats.rows_per_sec:,.0f}"))
+        results.add(f"{label}.rows_per_s", stats.rows_per_sec, unit="1/s", better="higher")
+
+    table(("benchmark", "p50 ms", "p95 ms"), rows)
+    print()
+    table(("import", "rows", "written", "seconds", "rows/s"), imports)
+    results.write(args.json)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""Image mirror against a local stand-in HTTP server (no network needed).
+
+    python -m benchmarks.mirror [--products 200] [--latency-ms 50]
+
+Serves generated JPEGs plus a few misbehaving URLs (404, HTML, oversized,
+flaky 503) from 127.0.0.1, mirrors them with 1 and 8 workers, then checks
+that a second pass revalidates with 304s instead of re-downloading.
+"""
+import argparse
+import io
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from benchmarks import bootstrap, table
+
+
+def make_jpeg():
+    from PIL import Image
+    buf = io.BytesIO()
+    Image.new("RGB", (800, 600), (200, 60, 30)).save(buf, "JPEG", quality=85)
+    return buf.getvalue()
+
+
+def serve(latency):
+    body = make_jpeg()
+    flaky = {}
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *a):
+            pass
+
+        def do_GET(self):
+            time.sleep(latency)
+            path = self.path
+            if path.startswith("/missing"):
+                return self.send_error(404)
+            if path.startswith("/flaky") and flaky.setdefault(path, 0) < 1:
+                flaky[path] += 1
+                return self.send_error(503)
+            if path.startswith("/html"):
+                data, ctype = b"<html></html>", "text/html"
+            elif path.startswith("/huge"):
+                data, ctype = b"\xff" * (6 * 1024 * 1024), "image/jpeg"
+            else:
+                data, ctype = body, "image/jpeg"
+            etag = f'"{len(data)}"'
+            if self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", ctype)
+            self.send_header("Content-Length", str(len(data)))
+            self.send_header("ETag", etag)
+            self.end_headers()
+            try:
+                self.wfile.write(data)
+            except ConnectionError:
+                pass  # the mirror hangs up on oversized bodies
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--products", type=int, default=200)
+    ap.add_argument("--latency-ms", type=int, default=50)
+    args = ap.parse_args(argv)
+    bootstrap()
+    from django.conf import settings
+    from django.core.management import call_command
+    from shop.models import Brand, Category, Product
+
+    settings.IMAGE_MIRROR_ALLOW_PRIVATE = True
+    settings.IMAGE_MIRROR_RETRIES = 1
+    server = serve(args.latency_ms / 1000)
+    base = f"http://127.0.0.1:{server.server_port}"
+    brand = Brand.objects.create(name="Bench")
+    category = Category.objects.get_or_create(name="Rims")[0]
+    kinds = ["ok"] * 16 + ["missing", "html", "huge", "flaky"]
+
+    rows = []
+    for workers in (1, 8):
+        Product.objects.all().delete()
+        Product.objects.bulk_create([
+            Product(name=f"p{i}", brand=brand, category=category, price=1,
+                    image_url=f"{base}/{kinds[i % len(kinds)]}/{workers}/{i}.jpg")
+            for i in range(args.products)
+        ])
+        for label in ("cold", "revalidate"):
+            if label == "revalidate":
+                # pretend every copy went stale; a revalidation must not re-download
+                Product.objects.update(mirrored_at=None)
+            t0 = time.perf_counter()
+            out = io.StringIO()
+            call_command("mirror_images", workers=workers, stdout=out)
+            elapsed = time.perf_counter() - t0
+            rows.append((workers, label, f"{elapsed:.2f}", f"{args.products / elapsed:.0f}", out.getvalue().strip()))
+    table(("workers", "pass", "seconds", "products/s", "result"), rows)
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""Bytes on the wire and a simulated time-to-render for the catalog page.
+
+    python -m benchmarks.page_weight [--rtt 150] [--kbps 1600] [--cdn-css-kb 26]
+
+Collects the static files twice into scratch STATIC_ROOTs and fetches the
+catalog page plus every local asset it references through the test client
+(WhiteNoise included) with `Accept-Encoding: br, gzip`:
+
+    plain      StaticFilesStorage, full stylesheet in <head>, no Link header
+    pipeline   shop/staticfiles.py (minified, hashed, .br/.gz), critical CSS
+               inlined, first grid images preloaded from the Link header
+
+There is no browser here, so time-to-render comes from a small network model
+in the spirit of Lighthouse's simulated throttling (defaults: its slow-4G
+profile): a new origin costs 3 RTTs of setup (DNS, TCP, TLS), each request one
+RTT, and the bytes share one link. First render waits for the HTML and every
+render-blocking stylesheet; the first product image is fetched either from the
+preload header as soon as the response starts or, lazily, once the page has
+rendered. The bootstrap stylesheet on the CDN can't be measured offline; its
+transfer size is --cdn-css-kb. Django itself doesn't compress HTML (BREACH:
+the page carries CSRF tokens), so the page is counted Brotli-compressed as a
+compressing reverse proxy would send it, or raw with --no-html-br.
+"""
+import argparse
+import statistics
+import tempfile
+import time
+from html.parser import HTMLParser
+
+import brotli
+
+from benchmarks import bootstrap, table
+
+CONFIGS = {
+    "plain": {"storage": "django.contrib.staticfiles.storage.StaticFilesStorage", "critical": False, "link": False},
+    "pipeline": {"storage": "shop.staticfiles.PipelineStorage", "critical": True, "link": True},
+}
+
+
+class Resources(HTMLParser):
+    """Stylesheets, scripts and the first grid image, with their offset in the page."""
+
+    def __init__(self):
+        super().__init__()
+        self.found, self.image, self.noscript, self.inline_css = [], None, False, 0
+        self._style = False
+
+    def handle_starttag(self, tag, attrs):
+        a = dict(attrs)
+        offset = self.position()
+        if tag == "noscript":
+            self.noscript = True
+        elif tag == "style":
+            self._style = True
+        elif self.noscript:
+            pass  # only fetched with scripting off
+        elif tag == "link" and a.get("rel") in ("stylesheet", "preload") and a.get("as", "style") == "style":
+            self.found.append((a["href"], "css", a["rel"] == "stylesheet", offset))
+        elif tag == "script" and a.get("src"):
+            self.found.append((a["src"], "js", "defer" not in a and "async" not in a, offset))
+        elif tag == "source" and self.image is None and a.get("type") == "image/webp":
+            self.image = a["srcset"].split(",")[0].split()[0]
+
+    def handle_endtag(self, tag):
+        if tag == "noscript":
+            self.noscript = False
+        elif tag == "style":
+            self._style = False
+
+    def handle_data(self, data):
+        if self._style:
+            self.inline_css += len(data.encode())
+
+    def position(self):
+        line, col = self.getpos()
+        return self._lines[line - 1] + col
+
+    def feed_page(self, html):
+        self._lines = [0]
+        for line in html.splitlines(keepends=True):
+            self._lines.append(self._lines[-1] + len(line.encode()))
+        self.feed(html)
+        return self
+
+
+def fetch(client, url, encoding="br, gzip"):
+    r = client.get(url, HTTP_ACCEPT_ENCODING=encoding)
+    body = b"".join(r.streaming_content) if r.streaming else r.content
+    return r, len(body)
+
+
+def measure(config, products_page, html_br):
+    from django.core.management import call_command
+    from django.test import Client, override_settings
+    from shop.assets import critical_css
+
+    static_root = tempfile.mkdtemp(prefix=f"static-{config}-")
+    spec = CONFIGS[config]
+    storages = {"default": {"BACKEND": "shop.media.VersionedMediaStorage"},
+                "staticfiles": {"BACKEND": spec["storage"]}}
+    with override_settings(STATIC_ROOT=static_root, STORAGES=storages, CRITICAL_CSS=spec["critical"],
+                           ALLOWED_HOSTS=["*"]):
+        call_command("collectstatic", interactive=False, verbosity=0)
+        critical_css.cache_clear()
+        client = Client()
+        server = []
+        for _ in range(5):
+            t0 = time.perf_counter()
+            page = client.get(products_page)
+            server.append((time.perf_counter() - t0) * 1000)
+        html = page.content.decode()
+        parsed = Resources().feed_page(html)
+        raw = len(page.content)
+        sent, enc = (len(brotli.compress(page.content)), "br (proxy)") if html_br else (raw, "-")
+        rows = [("page", "html", True, 0, raw, sent, enc)]
+        for url, kind, blocking, offset in parsed.found:
+            if url.startswith("http"):
+                rows.append((url.rsplit("/", 1)[-1], kind, blocking, offset, None, None, "cdn"))
+                continue
+            r, size = fetch(client, url)
+            raw = fetch(client, url, "identity")[1]
+            rows.append((url, kind, blocking, offset, raw, size, r.get("Content-Encoding", "-")))
+        image = fetch(client, parsed.image)[1] if parsed.image else 0
+    preload = spec["link"] and "rel=preload" in page.get("Link", "")
+    return {"rows": rows, "server_ms": statistics.median(server[1:]), "image": image, "preload": preload,
+            "inline_css": parsed.inline_css, "preconnect": spec["link"] and "rel=preconnect" in page.get("Link", "")}
+
+
+def simulate(m, rtt, kbps, cdn_css):
+    """(first render ms, first image ms) under the network model in the module docstring."""
+    per_ms = kbps / 8  # bytes per ms
+    setup = 3 * rtt
+    first_byte = setup + rtt + m["server_ms"]
+    link_free = first_byte + m["rows"][0][5] / per_ms
+    cdn_ready = first_byte + setup if m["preconnect"] else None
+    render = link_free
+    for url, kind, blocking, offset, raw, size, enc in m["rows"][1:]:
+        if not blocking:
+            continue
+        found = first_byte + offset / per_ms
+        if enc == "cdn":
+            size = cdn_css if kind == "css" else 0
+            start = max(found, cdn_ready) if cdn_ready is not None else found + setup
+        else:
+            start = found
+        link_free = max(start + rtt, link_free) + size / per_ms
+        render = max(render, link_free)
+    image = (first_byte if m["preload"] else render) + rtt + m["image"] / per_ms
+    return render, max(render, image)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--products", type=int, default=200)
+    ap.add_argument("--rtt", type=float, default=150, help="round trip, ms")
+    ap.add_argument("--kbps", type=float, default=1600, help="downlink, kbit/s")
+    ap.add_argument("--cdn-css-kb", type=float, default=26, help="assumed transfer size of bootstrap.min.css")
+    ap.add_argument("--no-html-br", dest="html_br", action="store_false",
+                    help="send the page uncompressed (by default a compressing proxy is assumed in front)")
+    args = ap.parse_args(argv)
+
+    bootstrap()
+    from shop.cards import rebuild_cards
+    from shop.synthetic import generate_catalog
+    generate_catalog(args.products, brands=10, images=12)
+    rebuild_cards()
+
+    summary = []
+    for config in CONFIGS:
+        m = measure(config, "/", args.html_br)
+        print(f"\n{config}:")
+        table(("resource", "type", "blocks render", "raw B", "sent B", "encoding"),
+              [(url, kind, "yes" if blocking else "no", "?" if raw is None else raw, "?" if size is None else size, enc)
+               for url, kind, blocking, _, raw, size, enc in m["rows"]])
+        sent = sum(r[5] or 0 for r in m["rows"])
+        blocking = sum(r[5] or 0 for r in m["rows"][1:] if r[2])
+        render, image = simulate(m, args.rtt, args.kbps, args.cdn_css_kb * 1024)
+        summary.append((config, sent, blocking, m["inline_css"], "yes" if m["preload"] else "no",
+                        f"{m['server_ms']:.1f}", f"{render:.0f}", f"{image:.0f}"))
+
+    print(f"\nsimulated: {args.rtt:.0f} ms RTT, {args.kbps:.0f} kbit/s, bootstrap.min.css assumed {args.cdn_css_kb:.0f} KB\n")
+    table(("config", "local bytes sent", "local render-blocking B", "inline CSS B", "image preload",
+           "server ms", "first render ms", "first image ms"), summary)
+
+
+if __name__ == "__main__":
+    main()
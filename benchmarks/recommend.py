@@ -0,0 +1,96 @@
+"""Recommendation precomputation and lookup at 10k and 100k products.
+
+    python -m benchmarks.recommend [--sizes 10000,100000] [--orders-per-product 0.5] [--repeat 50]
+
+Grows one synthetic catalog to each size, adds orders (2-4 lines around an
+anchor skewed towards a popular few; half the baskets pair the anchor with a
+fixed companion, so there is something to find), then times
+`build_recommendations` step by step. Reads are timed for a 3-item cart: the
+precomputed lookup (shop/recommend.py) against computing the same thing per
+request with the ORM, i.e. the nearest-priced products of each item's
+category plus a co-purchase aggregate over the order lines.
+"""
+import argparse
+import random
+
+from benchmarks import bootstrap, table, timed
+
+
+def add_orders(count, seed):
+    from django.db import transaction
+    from shop.models import Order, OrderLine, Product
+
+    rng = random.Random(seed)
+    products = list(Product.objects.order_by("id").values_list("id", "name", "price"))
+    start = Order.objects.count()
+    with transaction.atomic():
+        orders = Order.objects.bulk_create(
+            Order(idempotency_key=f"bench-{start + i}", address="1 Bench St", phone="0") for i in range(count))
+        lines = []
+        for order in orders:
+            anchor = int(len(products) * rng.random() ** 3)
+            basket = {anchor, (anchor + 1) % len(products)} if rng.random() < 0.5 else {anchor}
+            while len(basket) < rng.randint(2, 4):
+                basket.add(rng.randrange(len(products)))
+            for i in basket:
+                pid, name, price = products[i]
+                lines.append(OrderLine(order=order, product_id=pid, name=name, price=price, qty=1))
+        OrderLine.objects.bulk_create(lines, batch_size=5000)
+
+
+def per_request(ids, k=4):
+    """What the cart would run without the precomputed table."""
+    from django.db.models import Count, F, Func
+    from shop.models import OrderLine, Product
+
+    picked = []
+    bought = (OrderLine.objects.filter(order__lines__product_id__in=ids).exclude(product_id__in=ids)
+              .exclude(product=None).values("product_id").annotate(n=Count("order_id", distinct=True))
+              .filter(n__gte=2).order_by("-n")[:k])
+    picked += [row["product_id"] for row in bought]
+    for p in Product.objects.filter(id__in=ids).values("category_id", "price"):
+        near = (Product.objects.filter(category_id=p["category_id"]).exclude(id__in=ids)
+                .annotate(d=Func(F("price") - p["price"], function="ABS"))
+                .order_by("d").values_list("id", flat=True)[:k])
+        picked += list(near)
+    return list(dict.fromkeys(picked))[:k]
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", default="10000,100000")
+    ap.add_argument("--orders-per-product", type=float, default=0.5)
+    ap.add_argument("--repeat", type=int, default=50)
+    args = ap.parse_args(argv)
+
+    bootstrap()
+    from shop.models import Category, OrderLine, Product, ProductRecommendation
+    from shop.recommend import build_recommendations, recommended_for
+    from shop.synthetic import generate_catalog
+
+    for name in ("Brakes", "Tires", "Wheels", "Drivetrain", "Cockpit", "Saddles", "Pedals", "Lights"):
+        Category.objects.get_or_create(name=name)
+    rng = random.Random(2)
+    builds, reads = [], []
+    for size in (int(s) for s in args.sizes.split(",")):
+        generate_catalog(size - Product.objects.count(), brands=200)
+        add_orders(int(size * args.orders_per_product) - OrderLine.objects.values("order_id").distinct().count(), size)
+        rows, steps = build_recommendations()
+        paired = ProductRecommendation.objects.exclude(bought_with=[]).count()
+        builds.append([size, OrderLine.objects.count(), rows, paired, *(f"{s * 1000:.0f}" for s in steps.values()),
+                       f"{sum(steps.values()) * 1000:.0f}"])
+        ids = list(Product.objects.values_list("id", flat=True))
+        carts = [rng.sample(ids, 3) for _ in range(args.repeat)]
+        fast = timed(lambda: recommended_for(rng.choice(carts)), args.repeat)
+        slow = timed(lambda: per_request(rng.choice(carts)), max(3, args.repeat // 10))
+        reads.append([size, f"{fast[0]:.2f}", f"{fast[1]:.2f}", f"{slow[0]:.1f}", f"{slow[1]:.1f}"])
+
+    print()
+    table(("products", "order lines", "rows written", "with bought together", "load ms", "similar ms",
+           "bought together ms", "write ms", "total ms"), builds)
+    print("\n3-item cart, median / p95\n")
+    table(("products", "precomputed ms", "p95", "per request ms", "p95"), reads)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""Catalog search latency as the product table grows.
+
+    python -m benchmarks.search [--sizes 500,5000,50000,300000]
+
+Compares the indexed search (shop.search) with the old ``name__icontains``
+scan at each catalog size.
+"""
+import argparse
+import random
+
+from benchmarks import bootstrap, timed, table
+
+WORDS = [
+    "carbon", "alloy", "disc", "rim", "tubeless", "road", "gravel", "trail", "enduro", "aero",
+    "boost", "ceramic", "titanium", "wireless", "hydraulic", "sealed", "race", "pro", "comp", "elite",
+]
+CATEGORIES = ["Brakes", "Cockpit", "Drivetrain", "Forks", "Frames", "Pedals", "Rims", "Saddles", "Tires", "Wheels"]
+QUERIES = ["shimano", "hydr brak", "carbon rim", "zzzz", "model 4242"]
+
+
+def grow(target, rng):
+    from shop.models import Brand, Category, Product
+    from shop.search import document_for
+    brands = [Brand.objects.get_or_create(name=n)[0] for n in
+              ("Shimano", "SRAM", "Campagnolo", "DT Swiss", "Magura", "FOX", "RockShox", "Hope", "Zipp", "Continental")]
+    categories = {n: Category.objects.get_or_create(name=n)[0] for n in CATEGORIES}
+    have = Product.objects.count()
+    batch = []
+    for i in range(have, target):
+        b = rng.choice(brands)
+        cat = rng.choice(CATEGORIES)
+        name = f"{' '.join(rng.sample(WORDS, 3)).title()} {cat[:-1]} model {i}"
+        batch.append(Product(name=name, brand=b, category=categories[cat], price=rng.randint(5, 900),
+                             search_document=document_for(name, b.name, cat)))
+        if len(batch) == 5000:
+            Product.objects.bulk_create(batch)
+            batch = []
+    Product.objects.bulk_create(batch)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", default="500,5000,50000,300000")
+    ap.add_argument("--repeat", type=int, default=15)
+    args = ap.parse_args(argv)
+    bootstrap()
+    from shop.models import Product
+    from shop.search import search_products
+
+    rng = random.Random(7)
+    rows = []
+    for size in [int(s) for s in args.sizes.split(",")]:
+        grow(size, rng)
+        for q in QUERIES:
+            base = Product.objects.select_related("brand").order_by("-id")
+            fts = timed(lambda: list(search_products(base, q)[:12]), args.repeat)
+            scan = timed(lambda: list(base.filter(name__icontains=q)[:12]), args.repeat)
+            rows.append((size, q, f"{fts[0]:.2f}", f"{fts[1]:.2f}", f"{scan[0]:.2f}", f"{scan[1]:.2f}"))
+    table(("products", "query", "fts p50 ms", "fts p95 ms", "icontains p50", "icontains p95"), rows)
+
+
+if __name__ == "__main__":
+    main()
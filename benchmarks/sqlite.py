@@ -0,0 +1,103 @@
+"""Write throughput on SQLite with and without the connection tuning.
+
+    python -m benchmarks.sqlite [--workers 4] [--writers 12] [--readers 4] [--seconds 5]
+
+Runs gunicorn twice on the same database: once with SQLITE_TUNING=False
+(rollback journal, SQLite's default locking) and once with the profile from
+shop/db.py (WAL, busy_timeout, synchronous=NORMAL, BEGIN IMMEDIATE). The
+writers are shoppers on the session cart backend, so every add / update /
+remove writes django_session; the readers page through /api/products/ at
+the same time. "database is locked" shows up as 500s in the errors column.
+"""
+import argparse
+import os
+import signal
+import sqlite3
+import threading
+import time
+from urllib.parse import urlencode
+
+from benchmarks import bootstrap, free_port, gunicorn, percentile, table, worker_cpu
+from benchmarks.cart import Shopper, shop
+
+PROFILES = (("default", "False"), ("tuned", "True"))
+
+
+def read(port, seconds, categories, n):
+    s = Shopper(port)
+    latencies, errors, i = [], 0, n
+    stop = time.monotonic() + seconds
+    while time.monotonic() < stop:
+        t0 = time.perf_counter()
+        status, _ = s.request("GET", "/api/products/?" + urlencode({"cat": categories[i % len(categories)]}))
+        latencies.append((time.perf_counter() - t0) * 1000)
+        errors += status != 200
+        i += 1
+    return latencies, errors
+
+
+def run(port, product_ids, categories, args):
+    writes, reads = [], []
+    threads = [threading.Thread(target=lambda n=n: writes.append(shop(port, product_ids, args.seconds, n)))
+               for n in range(args.writers)]
+    threads += [threading.Thread(target=lambda n=n: reads.append(read(port, args.seconds, categories, n)))
+                for n in range(args.readers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    out = []
+    for results in (writes, reads):
+        latencies = sorted(l for r, _ in results for l in r)
+        out.append((latencies, sum(e for _, e in results)))
+    return out
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--workers", type=int, default=4)
+    ap.add_argument("--writers", type=int, default=12)
+    ap.add_argument("--readers", type=int, default=4)
+    ap.add_argument("--seconds", type=float, default=5)
+    args = ap.parse_args(argv)
+
+    data_dir = bootstrap()
+    from django.conf import settings
+    from django.db import connections
+    from shop.models import Brand, Category, Product
+    brand = Brand.objects.create(name="Bench")
+    categories = [Category.objects.get_or_create(name=n)[0] for n in ("Brakes", "Tires", "Wheels")]
+    Product.objects.bulk_create(Product(name=f"SQLite bench {i}", brand=brand, category=categories[i % 3],
+                                        price="9.99") for i in range(300))
+    product_ids = list(Product.objects.values_list("id", flat=True))
+    db_path = settings.DATABASES["default"]["NAME"]
+    connections.close_all()
+
+    rows = []
+    for label, tuning in PROFILES:
+        if tuning == "False":
+            # WAL is stored in the file; undo it so the untuned run really is SQLite's default
+            with sqlite3.connect(db_path) as conn:
+                conn.execute("PRAGMA journal_mode = DELETE")
+        port = free_port()
+        env = dict(os.environ, DATA_DIR=str(data_dir), CART_STORAGE="session", SQLITE_TUNING=tuning)
+        proc = gunicorn("bikeshop.wsgi", port, args.workers, env)
+        try:
+            cpu0 = worker_cpu(proc.pid)
+            (w, w_err), (r, r_err) = run(port, product_ids, [c.name for c in categories], args)
+            cpu = worker_cpu(proc.pid) - cpu0
+        finally:
+            proc.send_signal(signal.SIGTERM)
+            proc.wait()
+        rows.append((label, f"{len(w) / args.seconds:.0f}", w_err, f"{percentile(w, 0.5):.1f}",
+                     f"{percentile(w, 0.95):.1f}", f"{len(r) / args.seconds:.0f}", r_err,
+                     f"{percentile(r, 0.95):.1f}", f"{cpu * 1000 / max(len(w) + len(r), 1):.2f}"))
+
+    print(f"{args.workers} sync workers, {args.writers} cart writers + {args.readers} API readers, "
+          f"{args.seconds:.0f}s per profile\n")
+    table(("profile", "writes/s", "errors", "write p50", "write p95", "reads/s", "errors", "read p95",
+           "CPU ms/req"), rows)
+
+
+if __name__ == "__main__":
+    main()
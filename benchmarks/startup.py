@@ -0,0 +1,148 @@
+"""Time to first request and worker memory, with and without preload + warm-up.
+
+    python -m benchmarks.startup [--workers 4] [--products 2000] [--rounds 3]
+
+Starts gunicorn three ways:
+
+    plain     gunicorn bikeshop.wsgi -w N
+    preload   gunicorn bikeshop.wsgi -w N --preload
+    warm      gunicorn bikeshop.wsgi -w N -c python:bikeshop.gunicorn_conf   (preload + warm-up + gc.freeze)
+
+and measures the time from spawning the master until it accepts
+connections, the latency of N concurrent first requests (one per worker,
+each worker's first), and, after some traffic, each worker's RSS and PSS.
+PSS splits shared pages between the processes sharing them, so the total PSS
+is what the whole server really costs in memory.
+"""
+import argparse
+import http.client
+import os
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+from benchmarks import ROOT, bootstrap, free_port, table
+
+CONFIGS = {
+    "plain": [],
+    "preload": ["--preload"],
+    "warm": ["-c", "python:bikeshop.gunicorn_conf"],
+}
+
+
+def get(port, path="/"):
+    t0 = time.perf_counter()
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    conn.request("GET", path)
+    status = conn.getresponse().status
+    conn.close()
+    return status, (time.perf_counter() - t0) * 1000
+
+
+def memory(pid):
+    """(RSS, PSS) of a process in MiB."""
+    out = {}
+    for line in Path(f"/proc/{pid}/smaps_rollup").read_text().splitlines():
+        key, _, value = line.partition(":")
+        if key in ("Rss", "Pss"):
+            out[key] = int(value.split()[0]) / 1024
+    return out.get("Rss", 0.0), out.get("Pss", 0.0)
+
+
+def children(pid):
+    return [int(p) for p in Path(f"/proc/{pid}/task/{pid}/children").read_text().split()]
+
+
+def boot(config, workers, env):
+    port = free_port()
+    t0 = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, "-m", "gunicorn", "bikeshop.wsgi", "-b", f"127.0.0.1:{port}",
+                             "-w", str(workers), "--log-level", "warning", *CONFIGS[config]], cwd=ROOT, env=env)
+    while True:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.05).close()
+            break
+        except OSError:
+            if proc.poll() is not None or time.perf_counter() - t0 > 30:
+                raise SystemExit(f"gunicorn ({config}) did not start")
+            time.sleep(0.005)
+    listening = (time.perf_counter() - t0) * 1000
+    while len(children(proc.pid)) < workers:
+        time.sleep(0.005)
+    return proc, port, t0, listening
+
+
+def run(config, args, env):
+    proc, port, t0, listening = boot(config, args.workers, env)
+    try:
+        firsts = []
+        done = []
+
+        def first():
+            status, ms = get(port)
+            firsts.append(ms)
+            done.append(time.perf_counter())
+
+        threads = [threading.Thread(target=first) for _ in range(args.workers)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        served = (min(done) - t0) * 1000
+
+        def traffic():
+            for _ in range(20):
+                for path in ("/", "/?cat=Brakes", "/cart/", "/api/products/", "/login/"):
+                    get(port, path)
+
+        threads = [threading.Thread(target=traffic) for _ in range(args.workers)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        master = memory(proc.pid)
+        mem = [memory(pid) for pid in children(proc.pid)]
+    finally:
+        proc.send_signal(signal.SIGTERM)
+        proc.wait()
+    return {
+        "listening": listening, "first_served": served,
+        "first_p50": statistics.median(firsts), "first_max": max(firsts),
+        "worker_rss": statistics.mean(r for r, _ in mem), "worker_pss": statistics.mean(p for _, p in mem),
+        "total_pss": master[1] + sum(p for _, p in mem),
+    }
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--workers", type=int, default=4)
+    ap.add_argument("--products", type=int, default=2000)
+    ap.add_argument("--rounds", type=int, default=3, help="boots per configuration; medians are reported")
+    args = ap.parse_args(argv)
+
+    data_dir = bootstrap()
+    from django.db import connections
+    from shop.synthetic import generate_catalog
+    generate_catalog(args.products, brands=20)
+    connections.close_all()
+    env = dict(os.environ, DATA_DIR=str(data_dir))
+
+    rows = []
+    for config in CONFIGS:
+        runs = [run(config, args, env) for _ in range(args.rounds)]
+        m = {k: statistics.median(r[k] for r in runs) for k in runs[0]}
+        rows.append((config, f"{m['listening']:.0f}", f"{m['first_served']:.0f}", f"{m['first_p50']:.1f}",
+                     f"{m['first_max']:.1f}", f"{m['worker_rss']:.1f}", f"{m['worker_pss']:.1f}",
+                     f"{m['total_pss']:.1f}"))
+    print(f"{args.workers} sync workers, {args.products} products, median of {args.rounds} boots\n")
+    table(("config", "listen ms", "1st response ms", "1st req p50", "1st req max", "worker RSS MiB",
+           "worker PSS MiB", "total PSS MiB"), rows)
+
+
+if __name__ == "__main__":
+    main()
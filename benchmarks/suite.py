@@ -0,0 +1,53 @@
+"""Run the micro-benchmarks and the journeys into one results file.
+
+    python -m benchmarks.suite --out results/$(git rev-parse --short HEAD).json [--quick]
+    python -m benchmarks.compare results/<base>.json results/<head>.json
+
+Each part runs in its own process (and scratch database). --quick shrinks
+the catalog and the journey duration for a smoke run; compare only runs
+made with the same flags.
+"""
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+from benchmarks import ROOT
+
+PARTS = {
+    "micro": (["--products", "5000", "--repeat", "50", "--rows", "20000"],
+              ["--products", "1000", "--repeat", "10", "--rows", "2000"]),
+    "journeys": (["--products", "5000", "--seconds", "20"],
+                 ["--products", "1000", "--seconds", "5"]),
+}
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--out", required=True)
+    ap.add_argument("--quick", action="store_true")
+    ap.add_argument("--only", choices=sorted(PARTS), action="append")
+    args = ap.parse_args(argv)
+
+    merged = {"meta": None, "params": {}, "metrics": {}}
+    with tempfile.TemporaryDirectory() as tmp:
+        for name in args.only or PARTS:
+            out = Path(tmp) / f"{name}.json"
+            flags = PARTS[name][args.quick]
+            print(f"== {name}", flush=True)
+            subprocess.run([sys.executable, "-m", f"benchmarks.{name}", *flags, "--json", str(out)],
+                           cwd=ROOT, check=True)
+            part = json.loads(out.read_text())
+            merged["meta"] = merged["meta"] or part["meta"]
+            merged["params"].update(part["params"])
+            merged["metrics"].update(part["metrics"])
+    merged["params"]["suite"] = {"quick": args.quick}
+    Path(args.out).parent.mkdir(parents=True, exist_ok=True)
+    Path(args.out).write_text(json.dumps(merged, indent=2, sort_keys=True) + "\n")
+    print(f"\n{len(merged['metrics'])} metrics written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""A 100-image uploader drop under gunicorn, with shoppers browsing meanwhile.
+
+    python -m benchmarks.uploads [--images 100] [--workers 4] [--shoppers 8]
+
+"sync" posts every image to /uploader/api/create/ (4 at a time), so workers
+resize inside the request. "batch" posts 10 images per request to
+/uploader/api/batch/ and polls /uploader/api/jobs/ until every job is done.
+Reports the drop's wall time and images/s, and catalog page latency for the
+shoppers (idle baseline first).
+"""
+import argparse
+import io
+import os
+import signal
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks import bootstrap, free_port, gunicorn, table
+from benchmarks.cart import Shopper
+
+
+def make_images(n, size):
+    from PIL import Image
+    out = []
+    for i in range(n):
+        buf = io.BytesIO()
+        Image.effect_noise(size, 40 + i % 30).convert("RGB").save(buf, "JPEG", quality=90)
+        out.append(buf.getvalue())
+    return out
+
+
+def multipart(fields, files):
+    boundary = uuid.uuid4().hex
+    parts = []
+    for name, value in fields:
+        parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode())
+    for name, filename, data in files:
+        parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+                     f'Content-Type: image/jpeg\r\n\r\n'.encode() + data + b"\r\n")
+    parts.append(f"--{boundary}--\r\n".encode())
+    return b"".join(parts), f"multipart/form-data; boundary={boundary}"
+
+
+class Staff(Shopper):
+    def login(self, username, password):
+        self.request("GET", "/login/")
+        self.post("/login/", f"username={username}&password={password}")
+
+    def upload(self, path, fields, files):
+        body, ctype = multipart(fields, files)
+        return self.request("POST", path, body, {
+            "Content-Type": ctype, "X-CSRFToken": self.cookies.get("csrftoken", ""),
+            "Referer": f"http://127.0.0.1:{self.port}/",
+        })
+
+
+def browse(port, stop, latencies):
+    s = Shopper(port)
+    while not stop.is_set():
+        t0 = time.perf_counter()
+        s.request("GET", "/")
+        latencies.append((time.perf_counter() - t0) * 1000)
+
+
+def drop_sync(staff, images, tag):
+    def one(i):
+        fields = [("name", f"{tag} {i}"), ("category", "Frames"), ("price", "99.00")]
+        return staff.upload("/uploader/api/create/", fields, [("image", f"{tag}-{i}.jpg", images[i])])[0]
+    with ThreadPoolExecutor(4) as pool:
+        return list(pool.map(one, range(len(images))))
+
+
+def drop_batch(staff, images, tag, batch=10):
+    import json
+    ids = []
+    for start in range(0, len(images), batch):
+        idx = range(start, min(start + batch, len(images)))
+        fields = [(k, v) for i in idx for k, v in (("name", f"{tag} {i}"), ("category", "Frames"), ("price", "99.00"))]
+        _, body = staff.upload("/uploader/api/batch/", fields, [("image", f"{tag}-{i}.jpg", images[i]) for i in idx])
+        ids += [j["id"] for j in json.loads(body)["jobs"]]
+    while True:
+        _, body = staff.request("GET", "/uploader/api/jobs/?ids=" + ",".join(map(str, ids)))
+        jobs = json.loads(body)["jobs"]
+        if all(j["status"] in ("done", "failed") for j in jobs):
+            return [200 if j["status"] == "done" else 500 for j in jobs]
+        time.sleep(0.25)
+
+
+def measure(port, shoppers, fn=None, seconds=3.0):
+    stop, latencies = threading.Event(), []
+    threads = [threading.Thread(target=browse, args=(port, stop, latencies)) for _ in range(shoppers)]
+    for t in threads:
+        t.start()
+    t0 = time.perf_counter()
+    statuses = fn() if fn else time.sleep(seconds)
+    elapsed = time.perf_counter() - t0
+    stop.set()
+    for t in threads:
+        t.join()
+    latencies.sort()
+    n = len(latencies)
+    return statuses, elapsed, [f"{latencies[n // 2]:.0f}", f"{latencies[min(n - 1, int(n * 0.99))]:.0f}"]
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--images", type=int, default=100)
+    ap.add_argument("--workers", type=int, default=4)
+    ap.add_argument("--shoppers", type=int, default=8)
+    ap.add_argument("--size", default="1600x1200")
+    args = ap.parse_args()
+
+    data_dir = bootstrap()
+    from django.contrib.auth.models import User
+    from shop.models import Brand, Category, Product
+    User.objects.create_user("bench", password="bench-pass-1", is_staff=True)
+    brand = Brand.objects.create(name="Bench")
+    category = Category.objects.get_or_create(name="Frames")[0]
+    Product.objects.bulk_create(Product(name=f"Existing {i}", brand=brand, category=category, price="10.00")
+                                for i in range(500))
+    w, h = map(int, args.size.split("x"))
+    images = make_images(args.images, (w, h))
+    mb = sum(map(len, images)) / 1e6
+
+    port = free_port()
+    proc = gunicorn("bikeshop.wsgi", port, args.workers, dict(os.environ, DATA_DIR=str(data_dir)))
+    rows = []
+    try:
+        staff = Staff(port)
+        staff.login("bench", "bench-pass-1")
+        _, _, lat = measure(port, args.shoppers)
+        rows.append(["idle", "-", "-", "-", *lat])
+        for mode, fn in (("sync", drop_sync), ("batch", drop_batch)):
+            statuses, elapsed, lat = measure(port, args.shoppers, lambda: fn(staff, images, mode))
+            ok = sum(s == 200 for s in statuses)
+            rows.append([mode, f"{ok}/{len(images)}", f"{elapsed:.1f}", f"{ok / elapsed:.1f}", *lat])
+    finally:
+        proc.send_signal(signal.SIGTERM)
+        proc.wait()
+
+    print(f"{args.images} images ({mb:.0f} MB), {args.workers} sync workers, {args.shoppers} shoppers on the catalog\n")
+    table(["drop", "created", "seconds", "images/s", "shopper p50 ms", "shopper p99 ms"], rows)
+
+
+if __name__ == "__main__":
+    main()
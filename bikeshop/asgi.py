@@ -1,5 +1,8 @@
 import os
 from django.core.asgi import get_asgi_application
 
+# ASGI profile: async views for the catalog, cart and uploader endpoints.
+#   gunicorn bikeshop.asgi -k uvicorn.workers.UvicornWorker -w 2
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'bikeshop.settings')
+os.environ.setdefault('ASYNC_VIEWS', 'True')
 application = get_asgi_application()
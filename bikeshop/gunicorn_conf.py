@@ -0,0 +1,16 @@
+# gunicorn settings for the Procfile:  gunicorn bikeshop.wsgi -c python:bikeshop.gunicorn_conf
+#
+# The app is loaded once in the master (preload) and warmed up there before
+# any worker is forked (shop/startup.py), so workers start serving at once
+# and share the imported code and compiled templates copy-on-write.
+import gc
+
+preload_app = True  # workers: WEB_CONCURRENCY, as before
+
+
+def when_ready(server):
+    from shop.startup import warm_up
+    timings = warm_up()
+    server.log.info("warm-up: %s", ", ".join(f"{k} {v * 1000:.0f} ms" for k, v in timings.items()))
+    # keep the collector from touching (and so copying) the pages of everything loaded so far
+    gc.freeze()
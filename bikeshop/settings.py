@@ -11,7 +11,7 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 DATA_DIR = Path(os.getenv("DATA_DIR", "/opt/render/project/src/data"))
 if not DATA_DIR.exists():
     DATA_DIR = BASE_DIR / "data"
-DATA_DIR.mkdir(parents=True, exist_ok=True)  # make sure it exists at runtime
+# (created by ShopConfig.ready(), not here: importing settings has no side effects)
 
 # ---- Security / env ----
 SECRET_KEY = os.getenv("SECRET_KEY", "dev-only-change-me")
@@ -36,9 +36,14 @@ INSTALLED_APPS = [
 
 # ---- Middleware (WhiteNoise right after Security) ----
 MIDDLEWARE = [
+    # outermost, so its timings include every other layer (shop/metrics.py)
+    "shop.metrics.RequestMetricsMiddleware",
+    # one catalog version read per request (shop/caching.py)
+    "shop.caching.CatalogVersionMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
+    "shop.cart_storage.CartMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
@@ -50,7 +55,8 @@ ROOT_URLCONF = "bikeshop.urls"
 
 TEMPLATES = [
     {
-        "BACKEND": "django.template.backends.django.DjangoTemplates",
+        # DjangoTemplates plus render timing for the request metrics
+        "BACKEND": "shop.metrics.TimedDjangoTemplates",
         "DIRS": [],
         "APP_DIRS": True,
         "OPTIONS": {
@@ -74,8 +80,53 @@ DATABASES = {
     "default": dj_database_url.config(
         default=default_sqlite_url,
         conn_max_age=600,
+        # a persistent connection the server dropped is replaced, not reused
+        conn_health_checks=True,
     )
 }
+# Optional read replica for catalog reads (shop/db.py: CatalogReplicaRouter).
+# On SQLite it can simply be the same file: a second, query_only connection.
+if os.getenv("DATABASE_REPLICA_URL"):
+    DATABASES["replica"] = dj_database_url.parse(
+        os.environ["DATABASE_REPLICA_URL"], conn_max_age=600, conn_health_checks=True,
+    )
+    DATABASES["replica"]["TEST"] = {"MIRROR": "default"}
+    DATABASE_ROUTERS = ["shop.db.CatalogReplicaRouter"]
+
+# Concurrent-write tuning for SQLite (shop/db.py), applied to every new
+# connection. SQLITE_TUNING=False restores SQLite's defaults.
+SQLITE_TUNING = os.getenv("SQLITE_TUNING", "True") == "True"
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "busy_timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT", "5000")),  # ms
+    "cache_size": -16000,  # KiB
+    "temp_store": "MEMORY",
+}
+if SQLITE_TUNING and DATABASES["default"]["ENGINE"] == "django.db.backends.sqlite3":
+    DATABASES["default"].setdefault("OPTIONS", {})["transaction_mode"] = "IMMEDIATE"
+
+# ---- Cache ----
+# Rendered catalog fragments live in per-process memory; the catalog version
+# counter that invalidates them must be shared by all gunicorn workers, so it
+# sits in a small file-based cache on the data disk (see shop/caching.py).
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "bikeshop-default",
+        "OPTIONS": {"MAX_ENTRIES": 5000},
+    },
+    "catalog": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": str(DATA_DIR / "cache" / "catalog"),
+    },
+}
+
+# Cart backend: "auto" (cookie while anonymous, session once signed in), "cookie"
+# (signed cookie, no DB write), "cache" (caches[CART_CACHE], must be shared by
+# all workers) or "session" (see shop/cart_storage.py).
+CART_STORAGE = os.getenv("CART_STORAGE", "auto")
+CART_CACHE = os.getenv("CART_CACHE", "default")
 
 # ---- Passwords / i18n ----
 AUTH_PASSWORD_VALIDATORS = [
@@ -93,12 +144,69 @@ USE_TZ = True
 STATIC_URL = "/static/"
 STATIC_ROOT = BASE_DIR / "staticfiles"
 STATICFILES_DIRS = [BASE_DIR / "shop" / "static"]
-STATICFILES_STORAGE = "whitenoise.storage.CompressedManifestStaticFilesStorage"
 
 # Put uploads on the same single disk, under a "media" subfolder.
 MEDIA_URL = "/media/"
-MEDIA_ROOT = DATA_DIR / "media"
-MEDIA_ROOT.mkdir(parents=True, exist_ok=True)
+MEDIA_ROOT = DATA_DIR / "media"  # storage creates it on the first upload
+
+STORAGES = {
+    # URLs carry a content version so they can be cached as immutable (shop/media.py)
+    "default": {"BACKEND": "shop.media.VersionedMediaStorage"},
+    # collectstatic minifies, hashes and pre-compresses (gzip + Brotli) the assets and
+    # writes the catalog's critical CSS (shop/staticfiles.py); before the first run
+    # {% static %} falls back to the unhashed source files.
+    "staticfiles": {"BACKEND": "shop.staticfiles.PipelineStorage"},
+}
+# Inline the catalog's critical CSS and load the full stylesheet without blocking (shop/assets.py)
+CRITICAL_CSS = os.getenv("CRITICAL_CSS", "True") == "True"
+# Set to an nginx `internal` location (e.g. /protected-media/) to let the
+# proxy send media bodies via X-Accel-Redirect.
+MEDIA_ACCEL_REDIRECT = os.getenv("MEDIA_ACCEL_REDIRECT", "")
+
+# Opt-in local mirror of remote product image_url assets (shop/mirror.py)
+IMAGE_MIRROR = os.getenv("IMAGE_MIRROR", "False") == "True"
+IMAGE_MIRROR_WORKERS = int(os.getenv("IMAGE_MIRROR_WORKERS", "4"))
+IMAGE_MIRROR_MAX_AGE = int(os.getenv("IMAGE_MIRROR_MAX_AGE", str(7 * 24 * 3600)))  # then revalidate
+IMAGE_MIRROR_MAX_BYTES = 5 * 1024 * 1024
+
+# Route the catalog, cart and uploader endpoints to shop/async_views.py.
+# bikeshop/asgi.py turns this on; keep it off under gunicorn's sync workers.
+ASYNC_VIEWS = os.getenv("ASYNC_VIEWS", "False") == "True"
+
+# Background threads per process for the batch uploader (shop/uploads.py)
+UPLOAD_WORKERS = int(os.getenv("UPLOAD_WORKERS", "2"))
+
+# Most product ids one bulk delete request may carry (shop/views.py)
+BULK_DELETE_MAX = int(os.getenv("BULK_DELETE_MAX", "500"))
+
+# ---- Request metrics (shop/metrics.py) ----
+# Server-Timing response header with app/db/template time
+SERVER_TIMING = os.getenv("SERVER_TIMING", str(DEBUG)) == "True"
+# /metrics is staff-only; a scraper can send "Authorization: Bearer <token>" instead
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+# Most SQL queries a request to each view may run (cold caches, signed-in staff).
+# Over budget is logged, or raises with QUERY_BUDGET_STRICT (python -m benchmarks.budgets).
+QUERY_BUDGETS = {
+    "shop:product_list": 9,
+    # a signed-in cart is in the session: one read and one write on top
+    "shop:add_item": 3,
+    "shop:update_qty": 4,
+    "shop:remove_item": 4,
+    "shop:view_cart": 5,
+    "shop:checkout": 10,
+    "shop:success": 3,
+    "shop:uploader": 4,
+    "shop:uploader_api_batch": 3,
+    "shop:uploader_api_jobs": 3,
+    "shop:product_delete": 9,
+    "shop:product_bulk_delete": 10,
+    "shop:api_products": 3,
+    "shop:api_product": 1,
+    "shop:api_product_related": 2,
+    "shop:api_categories": 3,
+    "shop:api_brands": 3,
+}
+QUERY_BUDGET_STRICT = os.getenv("QUERY_BUDGET_STRICT", "False") == "True"
 
 # ---- Security behind proxy ----
 SECURE_PROXY_SSL_HEADER = ("HTTP_X_FORWARDED_PROTO", "https")
@@ -1,18 +1,14 @@
-# bikeshop/urls.py
 from django.contrib import admin
 from django.urls import path, include, re_path
-from django.conf import settings
-from django.views.static import serve as media_serve
+from shop.media import serve as media_serve
 
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("", include(("shop.urls", "shop"), namespace="shop")),
 ]
 
-# Serve uploaded files from MEDIA_ROOT at /media/ even when DEBUG=False
+# Serve uploaded files from MEDIA_ROOT at /media/ even when DEBUG=False.
+# /media/_v/<token>/... URLs come from VersionedMediaStorage and are cached forever.
 urlpatterns += [
-    re_path(r"^media/(?P<path>.*)$", media_serve, {
-        "document_root": settings.MEDIA_ROOT,
-        "show_indexes": False,
-    }),
+    re_path(r"^media/(?:_v/(?P<version>[0-9a-f]{12})/)?(?P<path>.*)$", media_serve),
 ]
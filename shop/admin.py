@@ -1,12 +1,109 @@
-from django.contrib import admin
-from .models import Brand, Product
+from django import forms
+from django.contrib import admin, messages
+from django.contrib.admin.helpers import ActionForm
+from .bulk import delete_products, recategorize, reprice
+from .facets import names
+from .models import Brand, Category, Product, Order, OrderLine
+from .pagination import EstimatedCountPaginator
+from .search import matching, tokenize
+
+# The product changelist has to stay usable with a large catalog: brand and
+# category filter choices come from the cached name maps (shop/facets.py), the
+# count from the catalog count cache or the planner's estimate, search from
+# the full-text index, and the bulk actions run set-based (shop/bulk.py).
 
 @admin.register(Brand)
 class BrandAdmin(admin.ModelAdmin):
     list_display = ('name',)
+    search_fields = ('name',)  # product form autocomplete
+    ordering = ('name',)
+
+@admin.register(Category)
+class CategoryAdmin(admin.ModelAdmin):
+    list_display = ('name',)
+    search_fields = ('name',)
+    ordering = ('name',)
+
+
+class CachedChoicesFilter(admin.RelatedFieldListFilter):
+    """Brand/category filter whose choices come from the cached name maps, not a query."""
+    kinds = {"brand": "brands", "category": "categories"}
+
+    def field_choices(self, field, request, model_admin):
+        by_name = names()[self.kinds[field.name]]
+        return [(pk, name) for name, pk in sorted(by_name.items(), key=lambda kv: kv[0].lower())]
+
+
+def category_choices():
+    return [("", "---------")] + [(pk, name) for name, pk in sorted(names()["categories"].items())]
+
+
+class ProductActionForm(ActionForm):
+    percent = forms.DecimalField(required=False, label="Price change %", max_digits=5, decimal_places=2,
+                                 min_value=-99, max_value=1000)
+    category = forms.TypedChoiceField(required=False, label="Move to", choices=category_choices, coerce=int,
+                                      empty_value=None)
+
 
 @admin.register(Product)
 class ProductAdmin(admin.ModelAdmin):
     list_display = ('name','brand','price','category')
-    list_filter = ('brand','category')
+    list_filter = (('brand', CachedChoicesFilter), ('category', CachedChoicesFilter))
+    list_select_related = ('brand', 'category')
     search_fields = ('name',)
+    autocomplete_fields = ('brand', 'category')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    show_facets = admin.ShowFacets.NEVER
+    action_form = ProductActionForm
+    actions = ('change_price', 'move_to_category')
+
+    def get_search_results(self, request, queryset, search_term):
+        if not tokenize(search_term):
+            return queryset, False
+        ids = matching(search_term)
+        if ids is None:  # no full-text index on this database
+            return super().get_search_results(request, queryset, search_term)
+        return queryset.filter(pk__in=ids), False
+
+    def _action_value(self, request, field):
+        form = self.action_form(request.POST)
+        form.fields["action"].choices = self.get_action_choices(request)
+        if form.is_valid() and form.cleaned_data[field] is not None:
+            return form.cleaned_data[field]
+        self.message_user(request, f"Enter a valid “{form.fields[field].label}” first.", messages.ERROR)
+        return None
+
+    @admin.action(description="Change price of selected %(verbose_name_plural)s by the given percentage")
+    def change_price(self, request, queryset):
+        percent = self._action_value(request, "percent")
+        if percent is not None:
+            n = reprice(queryset, percent)
+            self.message_user(request, f"Repriced {n} products by {percent}%.", messages.SUCCESS)
+
+    @admin.action(description="Move selected %(verbose_name_plural)s to the chosen category")
+    def move_to_category(self, request, queryset):
+        category_id = self._action_value(request, "category")
+        if category_id is not None:
+            n = recategorize(queryset, category_id)
+            self.message_user(request, f"Moved {n} products.", messages.SUCCESS)
+
+    # the stock "Delete selected" action and the delete page both end here
+    def delete_queryset(self, request, queryset):
+        delete_products(queryset)
+
+    def delete_model(self, request, obj):
+        delete_products(Product.objects.filter(pk=obj.pk))
+
+class OrderLineInline(admin.TabularInline):
+    model = OrderLine
+    extra = 0
+    raw_id_fields = ('product',)
+
+@admin.register(Order)
+class OrderAdmin(admin.ModelAdmin):
+    list_display = ('id','created_at','full_name','total','item_count')
+    date_hierarchy = 'created_at'
+    search_fields = ('idempotency_key','full_name','email','phone')
+    raw_id_fields = ('user',)
+    inlines = (OrderLineInline,)
@@ -0,0 +1,196 @@
+import hashlib
+import json
+
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils.cache import patch_cache_control
+from django.views.decorators.gzip import gzip_page
+from django.views.decorators.http import condition, require_safe
+
+from .caching import catalog_version
+from .facets import facets, filter_products, selected_ids
+from .mirror import mirror_stem
+from .models import Product, ProductRecommendation
+from .pagination import KeysetPage, CachedCountPaginator, page_links
+from .search import search_products
+
+# Read-only JSON catalog API (/api/...).
+#
+# Rows are fetched with .values() over only the requested columns, never as
+# model instances. Lists page by opaque `-id` cursors like the HTML grid
+# (ranked search results page by number); the NDJSON export streams the whole
+# catalog through .iterator() in constant memory. Every response carries an
+# ETag derived from the catalog version, so clients revalidate with a 304.
+
+# public field -> .values() lookups it needs
+FIELDS = {
+    "id": ("id",),
+    "name": ("name",),
+    "brand": ("brand__name",),
+    "category": ("category__name",),
+    "price": ("price",),
+    "image": ("image", "image_url", "mirrored_image"),
+}
+DEFAULT_FIELDS = ("id", "name", "brand", "category", "price", "image")
+DEFAULT_LIMIT = 24
+MAX_LIMIT = 100
+EXPORT_CHUNK = 2000
+MAX_AGE = 60
+
+
+def requested_fields(request):
+    wanted = [f for f in request.GET.get("fields", "").split(",") if f in FIELDS]
+    return tuple(dict.fromkeys(wanted)) or DEFAULT_FIELDS
+
+
+def lookups(fields):
+    # "id" is always selected: cursors and search results are keyed on it
+    return list(dict.fromkeys(("id",) + tuple(l for f in fields for l in FIELDS[f])))
+
+
+def _image_url(row):
+    if row["image"]:
+        return default_storage.url(row["image"])
+    mirror, url = row["mirrored_image"], row["image_url"]
+    if mirror and url and mirror.startswith(mirror_stem(url) + "."):
+        return default_storage.url(mirror)
+    return url or None
+
+
+def serialize(row, fields):
+    out = {}
+    for f in fields:
+        if f == "image":
+            out[f] = _image_url(row)
+        elif f in ("brand", "category"):
+            out[f] = row[f"{f}__name"]
+        else:
+            out[f] = row[f]
+    return out
+
+
+def filtered(request):
+    return filter_products(Product.objects.all(), request.GET.get("cat"), request.GET.get("brand"))
+
+
+def _limit(request):
+    try:
+        return max(1, min(MAX_LIMIT, int(request.GET.get("limit", DEFAULT_LIMIT))))
+    except ValueError:
+        return DEFAULT_LIMIT
+
+
+def api_etag(request, *args, **kwargs):
+    # public data: depends only on the catalog and the query string
+    raw = f"{catalog_version()}|{request.get_full_path()}"
+    return hashlib.md5(raw.encode()).hexdigest()
+
+
+def _public(response):
+    patch_cache_control(response, public=True, max_age=MAX_AGE)
+    return response
+
+
+def _json(data, status=200):
+    return JsonResponse(data, status=status, json_dumps_params={"separators": (",", ":")})
+
+
+@require_safe
+@gzip_page
+@condition(etag_func=api_etag)
+def product_list(request):
+    """?cat=&brand=&q=&fields=id,name,...&limit=&after=&before= (or &page= with q)."""
+    g, fields = request.GET, requested_fields(request)
+    qs = filtered(request).values(*lookups(fields))
+    limit = _limit(request)
+    if g.get("q"):
+        qs = qs.order_by("-id")
+        hits = search_products(qs, g["q"], **(selected_ids(g.get("cat"), g.get("brand")) or {}))
+        page = CachedCountPaginator(hits, limit,
+                                    count_key=("api-q", g.get("cat"), g.get("brand"), g["q"])).get_page(g.get("page"))
+        count = page.paginator.count
+    else:
+        page = KeysetPage(qs, limit, after=g.get("after"), before=g.get("before"),
+                          count_key=("api", g.get("cat"), g.get("brand")))
+        count = page.count
+    prev_url, next_url = page_links(request, page, keep=("cat", "brand", "q", "fields", "limit"))
+    return _public(_json({
+        "count": count,
+        "next": request.build_absolute_uri(request.path + next_url) if next_url else None,
+        "previous": request.build_absolute_uri(request.path + prev_url) if prev_url else None,
+        "results": [serialize(row, fields) for row in page],
+    }))
+
+
+@require_safe
+@gzip_page
+@condition(etag_func=api_etag)
+def product_detail(request, pk):
+    fields = requested_fields(request)
+    row = Product.objects.filter(pk=pk).values(*lookups(fields)).first()
+    if row is None:
+        return _json({"error": "not_found"}, status=404)
+    return _public(_json(serialize(row, fields)))
+
+
+@require_safe
+@gzip_page
+@condition(etag_func=api_etag)
+def product_related(request, pk):
+    """Precomputed "similar" and "bought together" products (shop/recommend.py), best first."""
+    fields = requested_fields(request)
+    lists = ProductRecommendation.objects.filter(pk=pk).values_list("similar", "bought_with").first()
+    if lists is None:
+        if not Product.objects.filter(pk=pk).exists():
+            return _json({"error": "not_found"}, status=404)
+        lists = ([], [])
+    rows = {row["id"]: row for row in Product.objects.filter(pk__in={*lists[0], *lists[1]}).values(*lookups(fields))}
+    similar, bought_with = ([serialize(rows[i], fields) for i in ids if i in rows] for ids in lists)
+    return _public(_json({"similar": similar, "bought_with": bought_with}))
+
+
+def _facets(request, kind, key):
+    g = request.GET
+    found = facets(g.get("cat"), g.get("brand"), g.get("q"))[kind]
+    return _public(_json({"results": [{key: f["name"], "count": f["count"]} for f in found]}))
+
+
+@require_safe
+@gzip_page
+@condition(etag_func=api_etag)
+def categories(request):
+    """Product counts per category, within ?brand= and ?q=."""
+    return _facets(request, "categories", "category")
+
+
+@require_safe
+@gzip_page
+@condition(etag_func=api_etag)
+def brands(request):
+    """Product counts per brand, within ?cat= and ?q=."""
+    return _facets(request, "brands", "brand")
+
+
+def _ndjson(qs, fields):
+    # one string per chunk, not per row, so gzip compresses sizeable blocks
+    buf = []
+    for row in qs.iterator(chunk_size=EXPORT_CHUNK):
+        buf.append(json.dumps(serialize(row, fields), cls=DjangoJSONEncoder, separators=(",", ":")))
+        if len(buf) == EXPORT_CHUNK:
+            yield "\n".join(buf) + "\n"
+            buf = []
+    if buf:
+        yield "\n".join(buf) + "\n"
+
+
+@require_safe
+@gzip_page
+@condition(etag_func=api_etag)
+def product_export(request):
+    """The whole (filtered) catalog as newline-delimited JSON, one product per line."""
+    fields = requested_fields(request)
+    qs = filtered(request).values(*lookups(fields)).order_by("id")
+    response = StreamingHttpResponse(_ndjson(qs, fields), content_type="application/x-ndjson")
+    response["Content-Disposition"] = 'attachment; filename="products.ndjson"'
+    return _public(response)
@@ -0,0 +1,11 @@
+from django.apps import AppConfig
+
+
+class ShopConfig(AppConfig):
+    default_auto_field = "django.db.models.BigAutoField"
+    name = "shop"
+
+    def ready(self):
+        from django.conf import settings
+        from . import db, signals  # noqa: F401
+        settings.DATA_DIR.mkdir(parents=True, exist_ok=True)  # the SQLite file and file caches live here
@@ -0,0 +1,106 @@
+import re
+from functools import lru_cache
+
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.template.loader import get_template
+
+# Front-end asset build.
+#
+# `collectstatic` runs the shop's CSS and JS through minify() before
+# WhiteNoise's manifest storage hashes them and writes .gz/.br copies
+# (shop/staticfiles.py). The same step writes CRITICAL_CSS: the rules of
+# styles.css that the catalog page's templates can match, which base.html
+# inlines so the first render doesn't wait for a stylesheet (the full file is
+# then loaded without blocking). Without collectstatic (runserver) the
+# critical CSS is computed from the sources on first use.
+
+STYLES = "shop/css/styles.css"
+CRITICAL_CSS = "shop/css/critical.css"
+CRITICAL_TEMPLATES = ("base.html", "shop/product_list.html", "shop/_product_card.html")
+
+_CLASS_RE = re.compile(r"\.(-?[_a-zA-Z][\w-]*)")
+_ID_RE = re.compile(r"#(-?[_a-zA-Z][\w-]*)")
+_ATTR_RE = re.compile(r"""(?:class|id)\s*=\s*["']([^"']*)["']""")
+_PSEUDO_RE = re.compile(r"::?[\w-]+(\([^)]*\))?")
+# states a page can't be in before it has rendered
+_INTERACTIVE_RE = re.compile(r":(hover|focus|focus-visible|focus-within|active)\b")
+_KEYFRAMES_RE = re.compile(r"@(?:-webkit-)?keyframes\s+([\w-]+)")
+
+
+def minify(path, text):
+    """`text` minified according to the extension of `path` (unknown types unchanged)."""
+    if path.endswith(".js"):
+        import rjsmin
+        return rjsmin.jsmin(text)
+    if path.endswith(".css"):
+        import rcssmin
+        return rcssmin.cssmin(text)
+    return text
+
+
+def _blocks(css):
+    """Top-level (prelude, body) pairs of a stylesheet; comments dropped."""
+    css = re.sub(r"/\*.*?\*/", "", css, flags=re.S)
+    out, i, n = [], 0, len(css)
+    while i < n:
+        start = css.find("{", i)
+        if start < 0:
+            break
+        depth, j = 1, start + 1
+        while j < n and depth:
+            depth += {"{": 1, "}": -1}.get(css[j], 0)
+            j += 1
+        out.append((css[i:start].strip(), css[start + 1:j - 1]))
+        i = j
+    return out
+
+
+def _matches(selector, names):
+    if _INTERACTIVE_RE.search(selector):
+        return False
+    selector = _PSEUDO_RE.sub("", selector)
+    return (all(c in names for c in _CLASS_RE.findall(selector))
+            and all(i in names for i in _ID_RE.findall(selector)))
+
+
+def critical_rules(css, names):
+    """The rules of `css` whose selectors only need class/id `names`, plus the keyframes they animate."""
+    kept, frames = [], {}
+    for prelude, body in _blocks(css):
+        if prelude.startswith(("@media", "@supports")):
+            inner = critical_rules(body, names)
+            if inner:
+                kept.append(f"{prelude}{{{inner}}}")
+        elif _KEYFRAMES_RE.match(prelude):
+            frames[_KEYFRAMES_RE.match(prelude).group(1)] = f"{prelude}{{{body}}}"
+        elif prelude.startswith("@"):
+            kept.append(f"{prelude}{{{body}}}")
+        elif any(_matches(s, names) for s in prelude.split(",")):
+            kept.append(f"{prelude}{{{body}}}")
+    text = "".join(kept)
+    return text + "".join(rule for name, rule in frames.items() if re.search(rf"\b{re.escape(name)}\b", text))
+
+
+def template_names(templates=CRITICAL_TEMPLATES):
+    """Every class and id used in `templates` (their source, not rendered output)."""
+    names = set()
+    for name in templates:
+        for value in _ATTR_RE.findall(get_template(name).template.source):
+            names.update(re.sub(r"\{[{%].*?[%}]\}", " ", value).split())
+    return names
+
+
+def build_critical_css(css):
+    return minify(".css", critical_rules(css, template_names()))
+
+
+@lru_cache(maxsize=None)
+def critical_css():
+    """The catalog's critical CSS: the collected file, else computed from the source."""
+    try:
+        with staticfiles_storage.open(staticfiles_storage.stored_name(CRITICAL_CSS)) as f:
+            return f.read().decode()
+    except (OSError, ValueError):
+        with open(finders.find(STYLES), encoding="utf-8") as f:
+            return build_critical_css(f.read())
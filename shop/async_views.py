@@ -0,0 +1,123 @@
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+from django.shortcuts import redirect, render
+from django.urls import reverse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+from django.views.decorators.http import require_GET, require_POST, require_http_methods
+
+from . import views
+from .cart import CartFull, CartSummary
+from .catalog import agrid_page, arender_cards, catalog_etag, catalog_last_modified, link_header
+from .facets import afacets, with_links
+from .bulk import delete_products
+from .models import Product, UploadJob
+from .uploads import asubmit as submit_uploads
+
+# Async twins of the hot endpoints, routed instead of shop.views when
+# ASYNC_VIEWS is on (bikeshop/asgi.py turns it on for uvicorn). Anything a
+# template or helper might touch lazily is resolved up front: request.user
+# and the session would otherwise run a sync query from the event loop.
+
+
+async def _user(request):
+    request.user = await request.auser()
+    return request.user
+
+
+async def product_list(request):
+    await _user(request)
+    etag = f'"{catalog_etag(request)}"'
+    last_modified = catalog_last_modified(request)
+    response = get_conditional_response(request, etag=etag, last_modified=int(last_modified.timestamp()))
+    if response is None:
+        g = request.GET
+        grid, products = await agrid_page(request)
+        response = render(request, "shop/product_list.html", {
+            "cards": await arender_cards(request, grid["ids"], products, eager=grid.get("eager", ())), "facets": with_links(request, await afacets(g.get("cat"), g.get("brand"), g.get("q"))),
+            "prev_url": grid["prev_url"], "next_url": grid["next_url"], "page_label": grid["label"],
+        })
+        response["Link"] = link_header(grid)
+    response.headers.setdefault("ETag", etag)
+    response.headers.setdefault("Last-Modified", http_date(last_modified.timestamp()))
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def _xhr(request):
+    return request.headers.get("X-Requested-With") == "XMLHttpRequest"
+
+
+@require_POST
+async def add_item(request, product_id):
+    cart = await CartSummary.aload(request.cart)
+    try:
+        await cart.aadd(product_id, int(request.POST.get("qty", 1)))
+    except CartFull:
+        return views.cart_full(request)
+    if _xhr(request):
+        return JsonResponse({"ok": True, "count": cart.count})
+    return redirect("shop:view_cart")
+
+
+@require_POST
+async def update_qty(request, product_id):
+    cart = await CartSummary.aload(request.cart)
+    try:
+        await cart.aset(product_id, int(request.POST.get("qty", 1)))
+    except CartFull:
+        return views.cart_full(request)
+    if _xhr(request):
+        return JsonResponse({"ok": True, "total": f"{cart.total:.2f}", "item_subtotal": f"{cart.subtotal(product_id):.2f}", "count": cart.count})
+    return redirect("shop:view_cart")
+
+
+@require_POST
+async def remove_item(request, product_id):
+    cart = await CartSummary.aload(request.cart)
+    await cart.aremove(product_id)
+    if _xhr(request):
+        return JsonResponse({"ok": True, "total": f"{cart.total:.2f}", "count": cart.count})
+    return redirect("shop:view_cart")
+
+
+# ---- Uploader ----
+def _auth_error(request):
+    return JsonResponse({"ok": False, "error": "auth", "login_url": reverse("shop:login")}, status=401)
+
+
+@require_POST
+async def uploader_api_create(request):
+    # file storage and resizing are blocking by nature; the batch API is the
+    # one that keeps them off the request
+    await _user(request)
+    return await sync_to_async(views.uploader_api_create)(request)
+
+
+@require_POST
+async def uploader_api_batch(request):
+    if not (await _user(request)).is_authenticated:
+        return _auth_error(request)
+    entries, errors = views.batch_entries(request)
+    if entries is None:
+        return JsonResponse({"ok": False, "error": "validation", "message": "Missing image"}, status=400)
+    jobs = await submit_uploads(request.user, entries)
+    return JsonResponse({"ok": True, "jobs": [{"id": j.pk, "name": j.name} for j in jobs], "errors": errors}, status=202)
+
+
+@require_GET
+async def uploader_api_jobs(request):
+    if not (await _user(request)).is_authenticated:
+        return JsonResponse({"ok": False, "error": "auth"}, status=401)
+    ids = views.job_ids(request)
+    jobs = [j async for j in UploadJob.objects.filter(pk__in=ids, user=request.user).values("id", "status", "product_id", "error")]
+    return JsonResponse({"ok": True, "jobs": jobs})
+
+
+@require_http_methods(["POST"])
+async def uploader_api_delete(request, pk):
+    if not (await _user(request)).is_authenticated:
+        return JsonResponse({"ok": False, "error": "auth"}, status=401)
+    if not await sync_to_async(delete_products)(Product.objects.filter(pk=pk)):
+        return JsonResponse({"ok": False, "error": "not_found"}, status=404)
+    return JsonResponse({"ok": True})
@@ -0,0 +1,92 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Round
+
+from .caching import bump_on_commit
+from .cards import BATCH, refresh_cards
+from .cleanup import schedule as schedule_cleanup
+from .models import Product, ProductCard
+from .search import refresh_documents
+
+# Set-based catalog edits: the admin's bulk actions and the delete endpoints.
+#
+# Each operation is one UPDATE or DELETE per batch of products rather than a
+# save() per product, followed by the derived data for the whole batch: the
+# grid cards, the search documents in one UPDATE, and a single catalog
+# version bump at the end. content_hash is cleared on the rows touched, so
+# the next delta import compares them as changed, as it would after an edit
+# in the form.
+# Deleting still goes through Django's collector (order lines and upload jobs
+# keep their rows, SET_NULL), but inside bulk() the per-product signal
+# handlers stand aside; image files are left to the cleanup worker
+# (shop/cleanup.py), which runs after the transaction commits.
+
+
+_bulk = ContextVar("bulk_catalog_write", default=False)
+
+
+@contextmanager
+def bulk():
+    token = _bulk.set(True)
+    try:
+        yield
+    finally:
+        _bulk.reset(token)
+
+
+def in_bulk():
+    """True while a bulk operation is running; per-row signal handlers skip their work."""
+    return _bulk.get()
+
+
+def _chunks(qs):
+    """The ids of `qs`, fixed up front (the edit may move rows out of it), in batches."""
+    ids = list(qs.order_by().values_list("id", flat=True))
+    for i in range(0, len(ids), BATCH):
+        yield ids[i:i + BATCH]
+
+
+def reprice(qs, percent):
+    """Change the price of every product in `qs` by `percent` (e.g. -10). Returns the count."""
+    factor = 1 + Decimal(percent) / 100
+    n = 0
+    with transaction.atomic():
+        for ids in _chunks(qs):
+            n += Product.objects.filter(id__in=ids).update(price=Round(F("price") * factor, 2), content_hash="")
+            refresh_cards(ids)
+        bump_on_commit()
+    return n
+
+
+def recategorize(qs, category_id):
+    """Move every product in `qs` to a category. Returns the count."""
+    n = 0
+    with transaction.atomic():
+        for ids in _chunks(qs):
+            moved = Product.objects.filter(id__in=ids)
+            n += moved.update(category_id=category_id, content_hash="")
+            refresh_documents(moved)
+            refresh_cards(ids)
+        bump_on_commit()
+    return n
+
+
+def delete_products(qs):
+    """Delete the products in `qs` with their cards, image files and derivatives. Returns the count."""
+    n, files = 0, []
+    with transaction.atomic(), bulk():
+        rows = list(qs.order_by().values_list("id", "image", "mirrored_image"))
+        for i in range(0, len(rows), BATCH):
+            batch = rows[i:i + BATCH]
+            ids = [pk for pk, *_ in batch]
+            files.extend(name for _, *pair in batch for name in pair if name)
+            Product.objects.filter(id__in=ids).delete()
+            ProductCard.objects.filter(id__in=ids).delete()
+            n += len(ids)
+        bump_on_commit()
+        schedule_cleanup(files)
+    return n
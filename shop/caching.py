@@ -0,0 +1,152 @@
+import hashlib
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+from datetime import datetime, timezone
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.core.cache import cache, caches
+from django.db import transaction
+
+# Catalog-wide version counter. Anything derived from Product/Brand rows is
+# cached under a key that embeds the current version, so bumping it on write
+# invalidates every entry at once without having to track individual keys.
+# The counter lives in the "catalog" cache (file-based, shared by all gunicorn
+# workers); the derived entries can sit in the faster per-process default cache.
+# CatalogVersionMiddleware reads the counter once per request: a page builds a
+# key per card, facet and count, and each read is a file open. A bump made by
+# the request itself drops the snapshot.
+
+VERSION_KEY = "catalog:version"
+MODIFIED_KEY = "catalog:modified"
+COUNT_TTL = 60 * 60 * 24
+
+# {"version": .., "modified": ..} for the current request, filled on first use
+_pinned = ContextVar("catalog_pinned", default=None)
+
+
+def _version_cache():
+    return caches["catalog"]
+
+
+def _snapshot(name, read):
+    pinned = _pinned.get()
+    if pinned is None:
+        return read()
+    if name not in pinned:
+        pinned[name] = read()
+    return pinned[name]
+
+
+def catalog_version():
+    return _snapshot("version", _read_version)
+
+
+def _read_version():
+    vc = _version_cache()
+    v = vc.get(VERSION_KEY)
+    if v is None:
+        # seed from the clock so a cold cache never resurrects old keys
+        seed = int(time.time())
+        if vc.add(VERSION_KEY, seed, None):
+            vc.set(MODIFIED_KEY, time.time(), None)
+        v = vc.get(VERSION_KEY) or seed
+    return v
+
+
+def bump_catalog_version():
+    vc = _version_cache()
+    try:
+        vc.incr(VERSION_KEY)
+    except ValueError:
+        _read_version()
+    vc.set(MODIFIED_KEY, time.time(), None)
+    pinned = _pinned.get()
+    if pinned is not None:
+        pinned.clear()
+
+
+def catalog_modified():
+    """When the catalog last changed, as an aware datetime."""
+    return _snapshot("modified", _read_modified)
+
+
+def _read_modified():
+    ts = _version_cache().get(MODIFIED_KEY)
+    if ts is None:
+        _read_version()
+        ts = _version_cache().get(MODIFIED_KEY) or time.time()
+    return datetime.fromtimestamp(int(ts), tz=timezone.utc)
+
+
+def bump_on_commit():
+    transaction.on_commit(bump_catalog_version)
+
+
+def catalog_key(prefix, *parts):
+    digest = hashlib.md5(repr(parts).encode()).hexdigest()
+    return f"catalog:{prefix}:{catalog_version()}:{digest}"
+
+
+def cached_count(qs, *key):
+    """qs.count(), remembered until the next catalog write."""
+    k = catalog_key("count", *key)
+    n = cache.get(k)
+    hit_counter.record("count", n is not None)
+    if n is None:
+        n = qs.count()
+        cache.set(k, n, COUNT_TTL)
+    return n
+
+
+class CatalogVersionMiddleware:
+    """Pins catalog_version()/catalog_modified() for the length of a request."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = _pinned.set({})
+        try:
+            return self.get_response(request)
+        finally:
+            _pinned.reset(token)
+
+    async def __acall__(self, request):
+        token = _pinned.set({})
+        try:
+            return await self.get_response(request)
+        finally:
+            _pinned.reset(token)
+
+
+class HitCounter:
+    """Per-process hit/miss tallies for the catalog caches."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits, self.misses = Counter(), Counter()
+
+    def record(self, name, hit, n=1):
+        with self._lock:
+            (self.hits if hit else self.misses)[name] += n
+
+    def ratio(self, name=None):
+        h = self.hits[name] if name else sum(self.hits.values())
+        m = self.misses[name] if name else sum(self.misses.values())
+        return h / (h + m) if h + m else 0.0
+
+    def snapshot(self):
+        names = sorted(set(self.hits) | set(self.misses))
+        return {n: {"hits": self.hits[n], "misses": self.misses[n], "ratio": round(self.ratio(n), 4)} for n in names}
+
+
+hit_counter = HitCounter()
@@ -0,0 +1,70 @@
+from decimal import Decimal
+
+from django.db import connection
+
+from .models import Product, ProductCard
+from .templatetags.shop_images import product_img, product_preload
+
+# Denormalised read model for the catalog grid.
+#
+# A ProductCard row holds exactly what shop/_product_card.html prints: name,
+# brand and category names, the formatted price and the finished image
+# markup (upload > mirrored copy > image_url, with srcsets). Its id is the
+# product's, so a grid page is one narrow index range scan over
+# shop_productcard with no joins and no per-row image resolution.
+#
+# Cards are written wherever products change: Product save/delete and
+# brand/category renames (shop/signals.py), the CSV importer, the synthetic
+# generator, derivative builds and the image mirror. `manage.py
+# rebuild_product_cards` (or any migrate that finds the table out of step)
+# rebuilds them all.
+
+BATCH = 2000
+# what card_for() reads
+SOURCE_FIELDS = ["name", "price", "brand__name", "category__name", "image", "image_variants", "image_url",
+                 "mirrored_image", "mirror_variants"]
+FIELDS = ["category_id", "brand_id", "name", "brand_name", "category_name", "price", "image_html", "preload",
+          "mirrorable"]
+
+
+def card_for(p):
+    """The ProductCard for `p` (brand and category should be loaded)."""
+    return ProductCard(
+        id=p.pk, category_id=p.category_id, brand_id=p.brand_id, name=p.name,
+        brand_name=p.brand.name if p.brand_id else "", category_name=p.category.name,
+        price=f"{Decimal(str(p.price)):.2f}", image_html=str(product_img(p)), preload=product_preload(p),
+        mirrorable=bool(p.image_url and not p.image),
+    )
+
+
+def save_cards(cards):
+    ProductCard.objects.bulk_create(cards, update_conflicts=True, unique_fields=["id"], update_fields=FIELDS)
+
+
+def refresh_cards(ids):
+    """Rewrite the cards of products `ids`, dropping cards whose product is gone."""
+    ids = list(ids)
+    for i in range(0, len(ids), BATCH):
+        chunk = ids[i:i + BATCH]
+        products = Product.objects.filter(id__in=chunk).select_related("brand", "category").only(*SOURCE_FIELDS)
+        cards = [card_for(p) for p in products]
+        save_cards(cards)
+        gone = set(chunk) - {c.id for c in cards}
+        if gone:
+            ProductCard.objects.filter(id__in=gone).delete()
+    return len(ids)
+
+
+def rebuild_cards():
+    ProductCard.objects.all().delete()
+    return refresh_cards(Product.objects.order_by("id").values_list("id", flat=True).iterator(chunk_size=BATCH))
+
+
+def ensure_cards():
+    """Rebuild the cards if their number doesn't match the products'. Returns True if it did."""
+    if ProductCard._meta.db_table not in connection.introspection.table_names():
+        return False  # migrated back past 0012
+    if ProductCard.objects.count() == Product.objects.count():
+        return False
+    rebuild_cards()
+    return True
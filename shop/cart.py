@@ -1,46 +1,66 @@
 from decimal import Decimal
+from types import SimpleNamespace
+from django.core.cache import cache
+from .caching import catalog_version, hit_counter
 from .models import Product
+from .cart_storage import CartStore, SessionCart
 
-CART_KEY = "cart_v1"
+MAX_LINES = 100  # keeps the signed cookie well under the 4 KB limit
 
-def _get(session):
-    cart = session.get(CART_KEY, {})
-    if not isinstance(cart, dict):
-        cart = {}
-    return cart
+class CartFull(Exception):
+    """Adding a line would take the cart past MAX_LINES."""
 
-def _save(session, cart):
-    session[CART_KEY] = cart
-    session.modified = True
+def _store(store):
+    # request.cart, or a bare session object from older callers
+    if isinstance(store, CartStore):
+        return store
+    return SessionCart(SimpleNamespace(session=store))
 
-def add_to_cart(session, product_id, qty=1):
-    cart = _get(session)
+def _get(store):
+    return _store(store).load()
+
+def _save(store, cart):
+    _store(store).save(cart)
+
+def add_to_cart(store, product_id, qty=1):
+    store = _store(store)
+    cart = _get(store)
+    if str(product_id) not in cart and len(cart) >= MAX_LINES:
+        raise CartFull
     cart[str(product_id)] = cart.get(str(product_id), 0) + int(qty)
-    _save(session, cart)
+    _save(store, cart)
 
-def set_quantity(session, product_id, qty):
-    cart = _get(session)
+def set_quantity(store, product_id, qty):
+    store = _store(store)
+    cart = _get(store)
     if int(qty) <= 0:
         cart.pop(str(product_id), None)
+    elif str(product_id) not in cart and len(cart) >= MAX_LINES:
+        raise CartFull
     else:
         cart[str(product_id)] = int(qty)
-    _save(session, cart)
+    _save(store, cart)
 
-def remove_from_cart(session, product_id):
-    cart = _get(session)
+def remove_from_cart(store, product_id):
+    store = _store(store)
+    cart = _get(store)
     cart.pop(str(product_id), None)
-    _save(session, cart)
+    _save(store, cart)
+
+def clear_cart(store):
+    _save(store, {})
 
-def cart_total_qty(session):
-    return sum(_get(session).values())
+def cart_total_qty(store):
+    return sum(_get(store).values())
 
-def cart_items(session):
-    cart = _get(session)
+def cart_items(store):
+    cart = _get(store)
     ids = [int(i) for i in cart.keys()]
     products = Product.objects.filter(id__in=ids).select_related("brand")
     items = []
     total = Decimal("0.00")
     by_id = {p.id: p for p in products}
+    remember_prices(by_id.values())
     for sid, qty in cart.items():
         pid = int(sid)
         p = by_id.get(pid)
@@ -50,3 +70,113 @@ def cart_items(session):
         total += sub
         items.append({"product": p, "qty": qty, "subtotal": sub})
     return items, total
+
+# ---- Cart summary ----
+# Prices are cached per catalog version (any product write bumps it), so the
+# AJAX endpoints answer total / line subtotal / count from the cart plus one
+# cache lookup, and hit the database only for prices not seen since the last
+# catalog change.
+PRICE_TTL = 60 * 60
+
+def _price_key(version, pid):
+    return f"catalog:price:{version}:{pid}"
+
+def remember_prices(products):
+    version = catalog_version()
+    cache.set_many({_price_key(version, p.id): str(p.price) for p in products}, PRICE_TTL)
+
+def _price_keys(ids):
+    version = catalog_version()
+    return version, {_price_key(version, pid): pid for pid in ids}
+
+def _missing_prices(keys, found):
+    hit_counter.record("price", True, len(found))
+    missing = [pid for k, pid in keys.items() if k not in found]
+    if missing:
+        hit_counter.record("price", False, len(missing))
+    return missing
+
+def _fill_prices(version, keys, found, missing, fresh):
+    # "" marks a product that no longer exists
+    new = {_price_key(version, pid): str(fresh.get(pid, "")) for pid in missing}
+    cache.set_many(new, PRICE_TTL)
+    found.update(new)
+    return {keys[k]: Decimal(v) for k, v in found.items() if v}
+
+def cached_prices(ids):
+    """{id: Decimal} for the products in `ids` that exist; at most one query."""
+    version, keys = _price_keys(ids)
+    found = cache.get_many(keys)
+    missing = _missing_prices(keys, found)
+    fresh = dict(Product.objects.filter(id__in=missing).values_list("id", "price")) if missing else {}
+    return _fill_prices(version, keys, found, missing, fresh)
+
+async def acached_prices(ids):
+    # The default cache is process memory, so it is called directly: Django's
+    # a*() cache methods would hop to a thread for every key.
+    version, keys = _price_keys(ids)
+    found = cache.get_many(keys)
+    missing = _missing_prices(keys, found)
+    fresh = {}
+    if missing:
+        fresh = {pid: price async for pid, price in Product.objects.filter(id__in=missing).values_list("id", "price")}
+    return _fill_prices(version, keys, found, missing, fresh)
+
+class CartSummary:
+    def __init__(self, store, cart=None, prices=None):
+        self.store = _store(store)
+        self.cart = self.store.load() if cart is None else cart
+        self.prices = cached_prices([int(pid) for pid in self.cart]) if prices is None else prices
+        self.count = sum(self.cart.values())
+        self.total = sum((self.subtotal(pid) for pid in self.cart), Decimal("0.00"))
+
+    @classmethod
+    async def aload(cls, store):
+        store = _store(store)
+        cart = await store.aload()
+        return cls(store, cart, await acached_prices([int(pid) for pid in cart]))
+
+    def subtotal(self, product_id):
+        price = self.prices.get(int(product_id))
+        qty = self.cart.get(str(product_id), 0)
+        return price * qty if price is not None else Decimal("0.00")
+
+    def _needs_price(self, sid, qty):
+        return qty and sid not in self.cart and len(self.cart) < MAX_LINES
+
+    def _apply(self, sid, qty):
+        if qty and sid not in self.cart and len(self.cart) >= MAX_LINES:
+            raise CartFull
+        self.count -= self.cart.get(sid, 0)
+        self.total -= self.subtotal(sid)
+        if qty:
+            self.cart[sid] = qty
+        else:
+            self.cart.pop(sid, None)
+        self.count += qty
+        self.total += self.subtotal(sid)
+        self.store.save(self.cart)
+
+    def set(self, product_id, qty):
+        sid, qty = str(product_id), max(0, int(qty))
+        if self._needs_price(sid, qty):
+            self.prices.update(cached_prices([int(product_id)]))
+        self._apply(sid, qty)
+
+    async def aset(self, product_id, qty):
+        sid, qty = str(product_id), max(0, int(qty))
+        if self._needs_price(sid, qty):
+            self.prices.update(await acached_prices([int(product_id)]))
+        self._apply(sid, qty)
+
+    def add(self, product_id, qty=1):
+        self.set(product_id, self.cart.get(str(product_id), 0) + int(qty))
+
+    async def aadd(self, product_id, qty=1):
+        await self.aset(product_id, self.cart.get(str(product_id), 0) + int(qty))
+
+    def remove(self, product_id):
+        self.set(product_id, 0)
+
+    async def aremove(self, product_id):
+        await self.aset(product_id, 0)
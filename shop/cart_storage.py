@@ -0,0 +1,236 @@
+import secrets
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.contrib.auth import SESSION_KEY
+from django.core import signing
+from django.core.cache import caches
+
+# Where the cart lives. The views talk to `request.cart` (set by
+# CartMiddleware) through the functions in shop/cart.py, so the backend is a
+# setting (CART_STORAGE):
+#   "auto"    - the cookie backend for anonymous visitors, the session one once
+#               they sign in (moved over at login, see shop/signals.py)
+#   "cookie"  - compact signed cookie "12-3.45-1"; no server-side write at all
+#   "cache"   - random id cookie + dict in caches[CART_CACHE]; needs a cache
+#               shared by all workers (Redis/memcached or the file cache)
+#   "session" - the old behaviour, dict under cart_v1 in the DB session
+
+CART_KEY = "cart_v1"
+COOKIE_NAME = "cart"
+COOKIE_SALT = "shop.cart"
+ID_COOKIE_NAME = "cart_id"
+
+
+def _cookie_kwargs():
+    return {
+        "max_age": settings.SESSION_COOKIE_AGE,
+        "secure": settings.SESSION_COOKIE_SECURE,
+        "httponly": True,
+        "samesite": "Lax",
+    }
+
+
+def encode(cart):
+    return ".".join(f"{int(pid)}-{int(qty)}" for pid, qty in cart.items())
+
+
+def decode(value):
+    cart = {}
+    for part in (value or "").split("."):
+        pid, _, qty = part.partition("-")
+        if pid.isdigit() and qty.isdigit() and int(qty) > 0:
+            cart[pid] = int(qty)
+    return cart
+
+
+class CartStore:
+    """load() -> {str(product_id): qty}; save(cart); commit(response) after the view."""
+
+    def __init__(self, request):
+        self.request = request
+        self._cart = None
+        self.dirty = False
+
+    def load(self):
+        if self._cart is None:
+            self._cart = self.read()
+        return dict(self._cart)
+
+    async def aload(self):
+        # for async views; backends that read the database override aread()
+        if self._cart is None:
+            self._cart = await self.aread()
+        return dict(self._cart)
+
+    async def aread(self):
+        return self.read()
+
+    def save(self, cart):
+        self._cart = dict(cart)
+        self.dirty = True
+
+    def clear(self):
+        self.save({})
+
+    def read(self):
+        raise NotImplementedError
+
+    def commit(self, response):
+        pass
+
+    async def acommit(self, response):
+        self.commit(response)
+
+
+class SessionCart(CartStore):
+    def read(self):
+        cart = self.request.session.get(CART_KEY, {})
+        return cart if isinstance(cart, dict) else {}
+
+    async def aread(self):
+        cart = await self.request.session.aget(CART_KEY, {})
+        return cart if isinstance(cart, dict) else {}
+
+    def save(self, cart):
+        super().save(cart)
+        self.request.session[CART_KEY] = self._cart
+        self.request.session.modified = True
+
+
+class CookieCart(CartStore):
+    def read(self):
+        try:
+            value = signing.Signer(salt=COOKIE_SALT).unsign(self.request.COOKIES.get(COOKIE_NAME, ""))
+        except signing.BadSignature:
+            return {}
+        return decode(value)
+
+    def commit(self, response):
+        if not self.dirty:
+            return
+        if self._cart:
+            value = signing.Signer(salt=COOKIE_SALT).sign(encode(self._cart))
+            response.set_cookie(COOKIE_NAME, value, **_cookie_kwargs())
+        else:
+            response.delete_cookie(COOKIE_NAME, samesite="Lax")
+
+
+class CacheCart(CartStore):
+    def __init__(self, request):
+        super().__init__(request)
+        self.cache = caches[getattr(settings, "CART_CACHE", "default")]
+        cart_id = request.COOKIES.get(ID_COOKIE_NAME, "")
+        self.cart_id = cart_id if cart_id.isalnum() and len(cart_id) == 32 else ""
+
+    def key(self):
+        return f"cart:{self.cart_id}"
+
+    def read(self):
+        cart = self.cache.get(self.key()) if self.cart_id else None
+        return cart if isinstance(cart, dict) else {}
+
+    async def aread(self):
+        cart = await self.cache.aget(self.key()) if self.cart_id else None
+        return cart if isinstance(cart, dict) else {}
+
+    def _assign_id(self, response):
+        if not self.cart_id:
+            self.cart_id = secrets.token_hex(16)
+            response.set_cookie(ID_COOKIE_NAME, self.cart_id, **_cookie_kwargs())
+
+    def commit(self, response):
+        if not self.dirty or not (self.cart_id or self._cart):
+            return
+        self._assign_id(response)
+        if self._cart:
+            self.cache.set(self.key(), self._cart, settings.SESSION_COOKIE_AGE)
+        else:
+            self.cache.delete(self.key())
+
+    async def acommit(self, response):
+        if not self.dirty or not (self.cart_id or self._cart):
+            return
+        self._assign_id(response)
+        if self._cart:
+            await self.cache.aset(self.key(), self._cart, settings.SESSION_COOKIE_AGE)
+        else:
+            await self.cache.adelete(self.key())
+
+
+class AccountCart(CartStore):
+    """CookieCart while the visitor is anonymous, SessionCart when signed in.
+    The session is only consulted when the cart is first touched."""
+
+    def __init__(self, request):
+        super().__init__(request)
+        self.backend = None
+        self.dropped = None  # the cookie cart emptied at login
+
+    def _pick(self, signed_in):
+        if self.backend is None:
+            self.backend = (SessionCart if signed_in else CookieCart)(self.request)
+        return self.backend
+
+    def read(self):
+        return self._pick(SESSION_KEY in self.request.session).read()
+
+    async def aread(self):
+        return await self._pick(await self.request.session.ahas_key(SESSION_KEY)).aread()
+
+    def save(self, cart):
+        super().save(cart)
+        self._pick(SESSION_KEY in self.request.session).save(cart)
+
+    def signed_in(self):
+        """Move the anonymous cookie cart into the session at login."""
+        cookie = CookieCart(self.request)
+        cart = cookie.read()
+        self.backend, self._cart = SessionCart(self.request), None
+        if cart:
+            self.save({**self.load(), **cart})
+            cookie.clear()
+            self.dropped = cookie
+
+    def commit(self, response):
+        for store in (self.backend, self.dropped):
+            if store is not None:
+                store.commit(response)
+
+    async def acommit(self, response):
+        for store in (self.backend, self.dropped):
+            if store is not None:
+                await store.acommit(response)
+
+
+BACKENDS = {"auto": AccountCart, "cookie": CookieCart, "cache": CacheCart, "session": SessionCart}
+
+
+def cart_store(request):
+    return BACKENDS[getattr(settings, "CART_STORAGE", "session")](request)
+
+
+class CartMiddleware:
+    """Attach request.cart and persist it on the way out. Goes after SessionMiddleware."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        request.cart = cart_store(request)
+        response = self.get_response(request)
+        request.cart.commit(response)
+        return response
+
+    async def __acall__(self, request):
+        request.cart = cart_store(request)
+        response = await self.get_response(request)
+        await request.cart.acommit(response)
+        return response
@@ -0,0 +1,147 @@
+import hashlib
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.middleware.csrf import get_token
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from .caching import catalog_key, catalog_version, catalog_modified, hit_counter
+from .mirror import schedule as schedule_mirror
+from .models import ProductCard
+from .facets import filter_products, selected_ids
+from .pagination import KeysetPage, CachedCountPaginator, page_links
+from .search import search_products
+from .templatetags.shop_images import eager as eager_img
+
+# Cached catalog grid. A page is stored as a list of product ids plus its nav
+# links, and each product card as rendered HTML; both are keyed by the catalog
+# version so any write makes them unreachable. A warm page needs no query and
+# no template work beyond the outer layout; a cold one reads the precomputed
+# ProductCard rows (shop/cards.py) rather than joining Product to its brand.
+
+PER_PAGE = 12
+# the first row of the grid on desktop: their images are preloaded from the
+# response's Link header, before the browser has parsed any of the page, and
+# their <img> tags drop loading="lazy" for fetchpriority="high"
+PRELOAD_IMAGES = 3
+# bootstrap's CSS and JS come from here
+CDN_ORIGIN = "https://cdn.jsdelivr.net"
+GRID_TTL = 60 * 60
+CSRF_PLACEHOLDER = "__csrf_token__"
+
+
+def grid_key(request):
+    g = request.GET
+    return catalog_key("page", g.get("cat"), g.get("brand"), g.get("q"), g.get("page"), g.get("after"), g.get("before"))
+
+
+def grid_page(request):
+    """({"ids", "prev_url", "next_url", "label"}, {id: ProductCard} or None on a hit)."""
+    key = grid_key(request)
+    grid = cache.get(key)
+    hit_counter.record("page", grid is not None)
+    if grid is not None:
+        return grid, None
+    return build_grid(request, key)
+
+
+async def agrid_page(request):
+    # a warm page is pure cache work; only a miss needs the (sync) paginators
+    key = grid_key(request)
+    grid = cache.get(key)
+    hit_counter.record("page", grid is not None)
+    if grid is not None:
+        return grid, None
+    return await sync_to_async(build_grid)(request, key)
+
+
+def build_grid(request, key):
+    g = request.GET
+    cat, brand, q = g.get("cat"), g.get("brand"), g.get("q")
+    qs = filter_products(ProductCard.objects.all(), cat, brand).order_by("-id")
+    if q:
+        # ranked results page by number; the filters are applied inside the index query
+        hits = search_products(qs, q, **(selected_ids(cat, brand) or {}))
+        page = CachedCountPaginator(hits, PER_PAGE, count_key=("q", cat, brand, q)).get_page(g.get("page"))
+        label = f"Page {page.number} of {page.paginator.num_pages}"
+    else:
+        page = KeysetPage(qs, PER_PAGE, after=g.get("after"), before=g.get("before"), count_key=("cat", cat, brand))
+        label = f"{page.count} part{'' if page.count == 1 else 's'}"
+    prev_url, next_url = page_links(request, page)
+    products = list(page)
+    preloaded = [p for p in products if p.preload][:PRELOAD_IMAGES]
+    grid = {"ids": [p.id for p in products], "prev_url": prev_url, "next_url": next_url, "label": label,
+            "preload": [p.preload for p in preloaded], "eager": [p.id for p in preloaded]}
+    cache.set(key, grid, GRID_TTL)
+    return grid, {p.id: p for p in products}
+
+
+def link_header(grid):
+    """Link header for a grid page: preconnect to the CDN, preload the first images."""
+    return ", ".join([f"<{CDN_ORIGIN}>; rel=preconnect; crossorigin", *grid.get("preload", ())])
+
+
+def _cached_cards(ids, staff):
+    keys = {pid: catalog_key("card", pid, staff) for pid in ids}
+    cached = cache.get_many(keys.values())
+    hit_counter.record("card", True, len(cached))
+    missing = [pid for pid in ids if keys[pid] not in cached]
+    if missing:
+        hit_counter.record("card", False, len(missing))
+    return keys, cached, missing
+
+
+def _fill_cards(request, ids, keys, cached, missing, products, staff, eager):
+    if missing:
+        schedule_mirror([pid for pid in missing if pid in products and products[pid].mirrorable])
+        fresh = {
+            keys[pid]: render_to_string("shop/_product_card.html",
+                                        {"p": products[pid], "staff": staff, "csrf_token": CSRF_PLACEHOLDER})
+            for pid in missing if pid in products
+        }
+        cache.set_many(fresh, GRID_TTL)
+        cached.update(fresh)
+    token = get_token(request)
+    cards = []
+    for pid in ids:
+        if keys[pid] in cached:
+            html = cached[keys[pid]].replace(CSRF_PLACEHOLDER, token)
+            cards.append(mark_safe(eager_img(html) if pid in eager else html))
+    return cards
+
+
+def render_cards(request, ids, products=None, controls=True, eager=()):
+    """Rendered product cards for `ids`, in order, rendering only cache misses.
+    Ids without a card are left out; `controls=False` drops the staff buttons,
+    and the images of the `eager` ids load at high priority."""
+    staff = controls and request.user.is_staff
+    keys, cached, missing = _cached_cards(ids, staff)
+    if missing and (products is None or any(pid not in products for pid in missing)):
+        products = ProductCard.objects.in_bulk(missing)
+    return _fill_cards(request, ids, keys, cached, missing, products, staff, eager)
+
+
+async def arender_cards(request, ids, products=None, controls=True, eager=()):
+    staff = controls and request.user.is_staff
+    keys, cached, missing = _cached_cards(ids, staff)
+    if missing and (products is None or any(pid not in products for pid in missing)):
+        products = await ProductCard.objects.ain_bulk(missing)
+    return _fill_cards(request, ids, keys, cached, missing, products, staff, eager)
+
+
+# ---- Conditional GET ----
+# The page also depends on who is looking (staff delete buttons, nav links)
+# and on the CSRF cookie embedded in the forms.
+def catalog_etag(request, *args, **kwargs):
+    raw = "|".join(str(x) for x in (
+        catalog_version(), request.get_full_path(), request.user.pk, request.user.is_staff,
+        request.COOKIES.get(settings.CSRF_COOKIE_NAME, ""),
+    ))
+    return hashlib.md5(raw.encode()).hexdigest()
+
+
+def catalog_last_modified(request, *args, **kwargs):
+    modified = catalog_modified()
+    last_login = getattr(request.user, "last_login", None)
+    return max(modified, last_login) if last_login else modified
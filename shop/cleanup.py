@@ -0,0 +1,142 @@
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import PurePosixPath
+
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from django.db.models import Q
+
+from .images import delete_derivatives
+from .models import Product, UploadJob
+
+# Media cleanup.
+#
+# Deleting products never touches the disk inside the request or the
+# transaction: the image names are handed to schedule(), which queues them
+# once the transaction commits (a rollback keeps every file) on a single
+# background thread. The worker checks each name against the database again
+# and removes the file and its derivatives only if nothing points at it any
+# more: no product (upload or mirrored copy) and no upload job still waiting
+# to be processed. `manage.py cleanup_media` reconciles the whole
+# MEDIA_ROOT/products tree the same way, e.g. after a crash lost the queue.
+
+MEDIA_DIR = "products"
+BATCH = 1000
+# e.g. products/foo.300w.webp, written by shop/images.py next to products/foo.jpg
+_DERIVATIVE_RE = re.compile(r"^(?P<stem>.+)\.\d+w\.(?:webp|jpg)$")
+
+
+def referenced(names):
+    """The subset of storage `names` that a product or a pending upload still uses."""
+    names, used = list(names), set()
+    for i in range(0, len(names), BATCH):
+        chunk = names[i:i + BATCH]
+        for pair in Product.objects.filter(Q(image__in=chunk) | Q(mirrored_image__in=chunk)).values_list(
+                "image", "mirrored_image"):
+            used.update(pair)
+        used.update(UploadJob.objects.filter(file__in=chunk, status__in=(UploadJob.QUEUED, UploadJob.RUNNING))
+                    .values_list("file", flat=True))
+    return used
+
+
+def delete_unreferenced(names, storage=None):
+    """Delete the files in `names` (and their derivatives) that nothing uses. Returns how many."""
+    storage = storage or default_storage
+    names = list(dict.fromkeys(n for n in names if n))
+    used = referenced(names)
+    gone = 0
+    for name in names:
+        if name in used:
+            continue
+        delete_derivatives(name, storage)
+        storage.delete(name)
+        gone += 1
+    return gone
+
+
+class CleanupQueue:
+    """One background thread per process deleting media after commit."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pool = None
+
+    def enqueue(self, names):
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="media-cleanup")
+        return self._pool.submit(self._run, list(names))
+
+    def _run(self, names):
+        try:
+            close_old_connections()
+            return delete_unreferenced(names)
+        except Exception:
+            return 0  # whatever is left is picked up by cleanup_media
+        finally:
+            close_old_connections()
+
+
+queue = CleanupQueue()
+
+
+def schedule(names):
+    """Queue `names` for deletion once the current transaction commits."""
+    names = [n for n in names if n]
+    if names:
+        transaction.on_commit(lambda: queue.enqueue(names))
+
+
+def original_of(name):
+    """The image a derivative was made from, as a name without extension, or None."""
+    m = _DERIVATIVE_RE.match(name)
+    return m.group("stem") if m else None
+
+
+def walk(root, rel=MEDIA_DIR):
+    """(storage name, mtime) of the files under `root`/`rel`, one directory at a time."""
+    with os.scandir(os.path.join(root, rel)) as entries:
+        for entry in entries:
+            name = f"{rel}/{entry.name}"
+            if entry.is_dir(follow_symlinks=False):
+                yield from walk(root, name)
+            elif entry.is_file(follow_symlinks=False):
+                yield name, entry.stat(follow_symlinks=False).st_mtime
+
+
+def orphans(root, min_age=3600):
+    """Storage names under `root`/products that nothing references, streamed in batches.
+    A derivative is an orphan when no referenced original shares its stem; files
+    younger than `min_age` seconds are left alone (an upload may not have its row yet)."""
+    cutoff = time.time() - min_age
+    if not os.path.isdir(os.path.join(root, MEDIA_DIR)):
+        return
+    batch = []
+    for name, mtime in walk(root):
+        if mtime <= cutoff:
+            batch.append(name)
+        if len(batch) >= BATCH:
+            yield from _orphans_in(batch)
+            batch = []
+    if batch:
+        yield from _orphans_in(batch)
+
+
+def _orphans_in(names):
+    used = referenced(names)
+    # a derivative belongs to whichever original shares its stem, whatever that one's extension
+    stems = sorted({original_of(n) for n in names} - {None})
+    used_stems = set()
+    for i in range(0, len(stems), 100):
+        q = Q()
+        for stem in stems[i:i + 100]:
+            q |= Q(image__startswith=f"{stem}.") | Q(mirrored_image__startswith=f"{stem}.")
+        for pair in Product.objects.filter(q).values_list("image", "mirrored_image"):
+            used_stems.update(str(PurePosixPath(n).with_suffix("")) for n in pair if n)
+    for name in names:
+        stem = original_of(name)
+        if name not in used and (stem is None or stem not in used_stems):
+            yield name
@@ -0,0 +1,55 @@
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+# Database profile.
+#
+# SQLite connections get SQLITE_PRAGMAS as soon as they are opened: WAL lets
+# readers run alongside the single writer instead of waiting on it,
+# busy_timeout makes a writer queue for the lock instead of failing straight
+# away with "database is locked", and synchronous=NORMAL (safe under WAL)
+# skips the fsync on every commit. Settings also opens transactions with
+# BEGIN IMMEDIATE: a deferred transaction that reads first and then writes
+# can't wait for the lock when it upgrades, it just fails.
+#
+# With a "replica" database configured, CatalogReplicaRouter sends catalog
+# reads (products, their grid cards, brands, categories) there. Everything
+# else, every write and any read made inside a transaction on the primary
+# stays on "default".
+
+REPLICA = "replica"
+CATALOG_MODELS = {"product", "productcard", "brand", "category"}
+
+
+@receiver(connection_created)
+def _apply_pragmas(sender, connection, **kwargs):
+    if connection.vendor != "sqlite" or not settings.SQLITE_TUNING:
+        return
+    pragmas = dict(settings.SQLITE_PRAGMAS)
+    if connection.alias == REPLICA:
+        pragmas["query_only"] = "ON"
+    # on the driver connection: setup isn't one of the request's queries (shop/metrics.py)
+    for name, value in pragmas.items():
+        connection.connection.execute(f"PRAGMA {name} = {value}")
+
+
+class CatalogReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label != "shop" or model._meta.model_name not in CATALOG_MODELS:
+            return None
+        instance = hints.get("instance")
+        if instance is not None and instance._state.db:
+            return instance._state.db
+        if connections["default"].in_atomic_block:
+            return "default"  # read what this transaction is about to write against
+        return REPLICA
+
+    def db_for_write(self, model, **hints):
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True  # both aliases hold the same data
+
+    def allow_migrate(self, db, app_label, **hints):
+        return db != REPLICA
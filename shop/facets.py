@@ -0,0 +1,127 @@
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.db.models import Count
+from django.utils.http import urlencode
+
+from .caching import catalog_key, hit_counter
+from .models import Brand, Category, Product
+from .search import matching, tokenize
+
+# Sidebar facets: product counts per category and per brand under the current
+# filter. One GROUP BY (category_id, brand_id) over the products matching `q`
+# is cached per catalog version; the counts for any cat/brand selection are
+# summed from those cells in Python, so clicking through the sidebar never
+# runs another aggregate. Category/brand names resolve to ids through a
+# cached map, so grid filters hit the (category_id, id) / (brand_id, id)
+# indexes without a join.
+
+FACETS_TTL = 60 * 60
+
+
+def _names_key():
+    return catalog_key("names")
+
+
+def _cells_key(q):
+    return catalog_key("facets", " ".join(tokenize(q)))
+
+
+def build_names():
+    names = {"categories": dict(Category.objects.values_list("name", "id")),
+             "brands": dict(Brand.objects.values_list("name", "id"))}
+    cache.set(_names_key(), names, FACETS_TTL)
+    return names
+
+
+def names():
+    """{"categories": {name: id}, "brands": {name: id}}."""
+    found = cache.get(_names_key())
+    hit_counter.record("names", found is not None)
+    return found if found is not None else build_names()
+
+
+def selected_ids(cat=None, brand=None):
+    """{"category_id": .., "brand_id": ..} for the names given, or None if one is unknown."""
+    selected = {}
+    if cat or brand:
+        ids = names()
+        for value, field, kind in ((cat, "category_id", "categories"), (brand, "brand_id", "brands")):
+            if value:
+                selected[field] = ids[kind].get(value)
+                if selected[field] is None:
+                    return None
+    return selected
+
+
+def filter_products(qs, cat=None, brand=None):
+    """Narrow a Product queryset to a category/brand given by name; unknown names match nothing."""
+    selected = selected_ids(cat, brand)
+    return qs.filter(**selected) if selected is not None else qs.none()
+
+
+def build_cells(q):
+    qs = Product.objects.all()
+    if tokenize(q):
+        ids = matching(q)
+        if ids is None:
+            for t in tokenize(q):
+                qs = qs.filter(search_document__icontains=t)
+        else:
+            qs = qs.filter(pk__in=ids)
+    cells = list(qs.order_by().values_list("category_id", "brand_id").annotate(n=Count("id")))
+    cache.set(_cells_key(q), cells, FACETS_TTL)
+    return cells
+
+
+def cells(q=None):
+    """[(category_id, brand_id, count)] for the products matching `q`."""
+    found = cache.get(_cells_key(q))
+    hit_counter.record("facets", found is not None)
+    return found if found is not None else build_cells(q)
+
+
+def summarise(names, cells, cat=None, brand=None):
+    """Category counts within the selected brand and brand counts within the
+    selected category. Each list: [{"name", "count", "selected"}], only
+    non-empty entries plus the current selection."""
+    cat_id, brand_id = names["categories"].get(cat), names["brands"].get(brand)
+    by_cat, by_brand = {}, {}
+    for c, b, n in cells:
+        if not brand or b == brand_id:
+            by_cat[c] = by_cat.get(c, 0) + n
+        if b is not None and (not cat or c == cat_id):
+            by_brand[b] = by_brand.get(b, 0) + n
+
+    def entries(ids_by_name, counts, current):
+        return [{"name": name, "count": counts.get(pk, 0), "selected": name == current}
+                for name, pk in sorted(ids_by_name.items(), key=lambda kv: kv[0].lower())
+                if counts.get(pk) or name == current]
+
+    return {"categories": entries(names["categories"], by_cat, cat),
+            "brands": entries(names["brands"], by_brand, brand)}
+
+
+def with_links(request, found):
+    """Give each entry a `url` that toggles it, keeping the other filters."""
+    current = {k: v for k, v in request.GET.items() if k in ("cat", "brand", "q") and v}
+    for kind, param in (("categories", "cat"), ("brands", "brand")):
+        for f in found[kind]:
+            params = {k: v for k, v in current.items() if k != param}
+            if not f["selected"]:
+                params[param] = f["name"]
+            f["url"] = "?" + urlencode(params)
+    return found
+
+
+def facets(cat=None, brand=None, q=None):
+    return summarise(names(), cells(q), cat, brand)
+
+
+async def afacets(cat=None, brand=None, q=None):
+    # warm facets are two cache reads; only a miss needs the (sync) ORM
+    found_names, found_cells = cache.get(_names_key()), cache.get(_cells_key(q))
+    if found_names is None or found_cells is None:
+        return await sync_to_async(facets)(cat, brand, q)
+    hit_counter.record("names", True)
+    hit_counter.record("facets", True)
+    return summarise(found_names, found_cells, cat, brand)
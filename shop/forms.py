@@ -5,6 +5,7 @@ class CheckoutForm(forms.Form):
     address   = forms.CharField(label="Address", widget=forms.TextInput(attrs={"class":"form-control"}))
     phone     = forms.CharField(label="Phone number", widget=forms.TextInput(attrs={"class":"form-control"}))
     email     = forms.EmailField(label="Email (optional)", required=False, widget=forms.EmailInput(attrs={"class":"form-control"}))
+    idempotency_key = forms.CharField(max_length=64, widget=forms.HiddenInput)
 
     # Add bootstrap form-control for all fields that don't define it explicitly
     def __init__(self, *args, **kwargs):
@@ -0,0 +1,81 @@
+from pathlib import Path, PurePosixPath
+
+# Resized derivatives of product images.
+# For products/foo.jpg we write products/foo.300w.webp, products/foo.300w.jpg,
+# ... next to the original. The widths that exist are recorded on
+# Product.image_variants so templates never have to stat the disk.
+# Pillow is imported lazily: most processes (and every gunicorn worker at boot)
+# never touch it.
+
+WIDTHS = (300, 600, 1200)
+FORMATS = ("webp", "jpg")
+WEBP_QUALITY = 80
+JPEG_QUALITY = 82
+
+
+def derivative_name(name, width, fmt):
+    p = PurePosixPath(name)
+    return str(p.with_name(f"{p.stem}.{width}w.{fmt}"))
+
+
+def derivative_names(name, widths=WIDTHS):
+    return [derivative_name(name, w, fmt) for w in widths for fmt in FORMATS]
+
+
+def generate_derivatives(path, widths=WIDTHS, force=False):
+    """Write resized WebP + JPEG copies of the image at `path`.
+
+    Returns the widths available afterwards. Never upscales: widths wider
+    than the original are skipped. Pure filesystem work, safe to run in a
+    process pool."""
+    from PIL import Image, ImageOps
+
+    path = Path(path)
+    made = []
+    with Image.open(path) as im:
+        im = ImageOps.exif_transpose(im)
+        for w in sorted(widths):
+            if w > im.width:
+                break
+            targets = {fmt: path.with_name(f"{path.stem}.{w}w.{fmt}") for fmt in FORMATS}
+            if force or not all(t.exists() for t in targets.values()):
+                h = max(1, round(im.height * w / im.width))
+                small = im.resize((w, h), Image.LANCZOS)
+                webp = small if small.mode in ("RGB", "RGBA") else small.convert("RGBA")
+                webp.save(targets["webp"], "WEBP", quality=WEBP_QUALITY, method=4)
+                jpeg = _flatten(small)
+                jpeg.save(targets["jpg"], "JPEG", quality=JPEG_QUALITY, optimize=True, progressive=True)
+            made.append(w)
+    return made
+
+
+def _flatten(im):
+    from PIL import Image
+    if im.mode in ("RGBA", "LA", "P"):
+        im = im.convert("RGBA")
+        bg = Image.new("RGB", im.size, (255, 255, 255))
+        bg.paste(im, mask=im.getchannel("A"))
+        return bg
+    return im.convert("RGB")
+
+
+def build_for_product(product, force=False):
+    """Generate derivatives for product.image and record them. Returns the widths."""
+    if not product.image:
+        return []
+    widths = generate_derivatives(product.image.path, force=force)
+    if widths != product.image_variants:
+        type(product).objects.filter(pk=product.pk).update(image_variants=widths)
+        product.image_variants = widths
+        from .cards import refresh_cards
+        refresh_cards([product.pk])  # the card's srcsets
+    return widths
+
+
+def delete_derivatives(name, storage=None):
+    if not name:
+        return
+    if storage is None:
+        from django.core.files.storage import default_storage as storage
+    for d in derivative_names(name):
+        storage.delete(d)
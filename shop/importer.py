@@ -0,0 +1,257 @@
+import csv
+import time
+import django
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from django.core.exceptions import ValidationError
+from django.core.validators import URLValidator
+from django.db import transaction
+from django.db.models import Q
+
+from .caching import bump_on_commit
+from .bulk import delete_products
+from .cards import card_for, refresh_cards, save_cards
+from .models import Brand, Category, Product, product_hash
+from .search import document_for
+
+# Streaming CSV importer used by `manage.py import_products`.
+# Rows are read in chunks, validated (optionally in a process pool), and each
+# chunk is upserted on Product.name with one bulk INSERT .. ON CONFLICT inside
+# its own transaction, so a 100k-row feed is a few hundred statements instead
+# of several round-trips per row.
+# In incremental mode each row's product_hash() is compared with the stored
+# one and only new/changed rows are written, so a nightly full feed costs one
+# narrow scan plus writes proportional to the diff.
+# Written rows get their grid cards (shop/cards.py) rebuilt in the same
+# transaction.
+
+COLUMNS = ("name", "brand", "category", "price", "image_url")
+UPSERT_FIELDS = ["brand", "category", "price", "image_url", "search_document", "content_hash"]
+DELETE_BATCH = 500
+DEFAULT_BRAND = "Unbranded"
+
+_url = URLValidator()
+
+
+def parse_row(row):
+    """Clean one CSV row into a tuple, raising ValueError on bad data."""
+    name = (row.get("name") or "").strip()
+    brand = (row.get("brand") or "").strip() or DEFAULT_BRAND
+    category = (row.get("category") or "").strip()
+    image_url = (row.get("image_url") or "").strip()
+    if not name:
+        raise ValueError("missing name")
+    if len(name) > 200:
+        raise ValueError("name longer than 200 characters")
+    if len(brand) > 120:
+        raise ValueError("brand longer than 120 characters")
+    if not category:
+        raise ValueError("missing category")
+    if len(category) > 200:
+        raise ValueError("category longer than 200 characters")
+    try:
+        price = Decimal(str(row.get("price") or "").strip()).quantize(Decimal("0.01"))
+    except InvalidOperation:
+        raise ValueError(f"bad price {row.get('price')!r}")
+    if price < 0 or price >= Decimal("1e8"):
+        raise ValueError(f"price out of range {price}")
+    return name, brand, category, price, image_url
+
+
+def check_url(image_url):
+    # the slowest check by far, so delta runs only apply it to changed rows
+    if image_url:
+        try:
+            _url(image_url)
+        except ValidationError:
+            raise ValueError(f"bad image_url {image_url!r}")
+
+
+def parse_chunk(chunk, check_urls=True):
+    """[(line, row)] -> ([(line, parsed, hash)], [(line, error)], [name of each bad row]).
+    Runs in worker processes."""
+    good, bad, bad_names = [], [], []
+    for line, row in chunk:
+        try:
+            parsed = parse_row(row)
+            if check_urls:
+                check_url(parsed[4])
+            good.append((line, parsed, product_hash(*parsed)))
+        except ValueError as e:
+            bad.append((line, str(e)))
+            bad_names.append((row.get("name") or "").strip())
+    return good, bad, bad_names
+
+
+def read_chunks(f, size):
+    reader = csv.DictReader(f)
+    missing = [c for c in ("name", "category", "price") if c not in (reader.fieldnames or [])]
+    if missing:
+        raise ValueError(f"CSV is missing columns: {', '.join(missing)}")
+    rows = ((reader.line_num, row) for row in reader)
+    while True:
+        chunk = list(islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def parsed_chunks(chunks, workers, check_urls=True):
+    if workers <= 1:
+        for chunk in chunks:
+            yield parse_chunk(chunk, check_urls)
+        return
+    # bounded window of in-flight chunks keeps memory flat on huge feeds
+    with ProcessPoolExecutor(max_workers=workers, initializer=django.setup) as pool:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.submit(parse_chunk, chunk, check_urls))
+            if len(pending) >= workers * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+class ImportStats:
+    def __init__(self):
+        self.rows = self.written = 0
+        self.inserted = self.updated = self.unchanged = self.deleted = 0
+        self.errors = []
+        # set when --prune didn't run because a rejected row had no usable name
+        self.prune_skipped = False
+        self.started = time.perf_counter()
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    @property
+    def rows_per_sec(self):
+        return self.rows / self.elapsed if self.elapsed else 0.0
+
+
+class ProductImporter:
+    def __init__(self, batch_size=1000, workers=1, dry_run=False, incremental=False, prune=False):
+        self.batch_size = batch_size
+        self.workers = workers
+        self.dry_run = dry_run
+        self.prune = prune
+        self.brands = dict(Brand.objects.values_list("name", "id"))
+        self.categories = dict(Category.objects.values_list("name", "id"))
+        # name -> (id, content_hash); only loaded for delta runs
+        self.existing = None
+        self.seen = set()
+        if incremental or prune:
+            self.existing = {
+                name: (pk, h) for name, pk, h in
+                Product.objects.values_list("name", "id", "content_hash").iterator(chunk_size=5000)
+            }
+
+    def brand_ids(self, names):
+        new = [n for n in names if n not in self.brands]
+        if new and not self.dry_run:
+            Brand.objects.bulk_create([Brand(name=n) for n in new], ignore_conflicts=True)
+            self.brands.update(Brand.objects.filter(name__in=new).values_list("name", "id"))
+        return self.brands
+
+    def category_ids(self, names):
+        new = [n for n in names if n not in self.categories]
+        if new and not self.dry_run:
+            Category.objects.bulk_create([Category(name=n) for n in new], ignore_conflicts=True)
+            self.categories.update(Category.objects.filter(name__in=new).values_list("name", "id"))
+        return self.categories
+
+    def diff(self, by_name, stats):
+        """Drop unchanged rows from `by_name`, counting inserts/updates."""
+        changed = {}
+        for name, (line, parsed, h) in by_name.items():
+            old = self.existing.get(name)
+            self.seen.add(name)
+            if old is not None and old[1] == h:
+                stats.unchanged += 1
+                continue
+            try:
+                check_url(parsed[4])
+            except ValueError as e:
+                stats.errors.append((line, str(e)))
+                continue
+            if old is None:
+                stats.inserted += 1
+            else:
+                stats.updated += 1
+            self.existing[name] = (old[0] if old else None, h)
+            changed[name] = (line, parsed, h)
+        return changed
+
+    def write(self, parsed, stats):
+        # last row wins when a chunk repeats a name (ON CONFLICT can't touch a row twice)
+        by_name = {p[0]: (line, p, h) for line, p, h in parsed}
+        if self.existing is not None:
+            by_name = self.diff(by_name, stats)
+        if not by_name:
+            return 0
+        brands = self.brand_ids({p[1] for _, p, _ in by_name.values()})
+        categories = self.category_ids({p[2] for _, p, _ in by_name.values()})
+        objs = [
+            # named brand/category instances so card_for() needs no lookups
+            Product(name=name, brand=Brand(id=brands[brand], name=brand) if brand in brands else None,
+                    category=Category(id=categories.get(cat), name=cat), price=price, image_url=url,
+                    search_document=document_for(name, brand, cat), content_hash=h)
+            for _, (name, brand, cat, price, url), h in by_name.values()
+        ]
+        if not self.dry_run:
+            with transaction.atomic():
+                Product.objects.bulk_create(
+                    objs, update_conflicts=True, unique_fields=["name"], update_fields=UPSERT_FIELDS,
+                )
+                self.write_cards(objs, by_name)
+        return len(objs)
+
+    def write_cards(self, objs, names):
+        """Grid cards for the rows just upserted. The feed row has everything
+        a card shows except a local image, so only products that have an
+        upload or a mirrored copy are read back."""
+        ids = [o.pk for o in objs]
+        if None in ids:  # a backend that can't return ids from an upsert
+            refresh_cards(Product.objects.filter(name__in=names).values_list("id", flat=True))
+            return
+        local = set(Product.objects.filter(Q(image__gt="") | Q(mirrored_image__gt=""), id__in=ids)
+                    .values_list("id", flat=True))
+        save_cards([card_for(o) for o in objs if o.pk not in local])
+        refresh_cards(local)
+
+    def run(self, f, progress=None):
+        stats = ImportStats()
+        chunks = read_chunks(f, self.batch_size)
+        unnamed = False
+        for good, bad, bad_names in parsed_chunks(chunks, self.workers, check_urls=self.existing is None):
+            stats.rows += len(good) + len(bad)
+            stats.errors.extend(bad)
+            # a row that failed validation is still listed: prune must keep its product
+            self.seen.update(n for n in bad_names if n)
+            unnamed = unnamed or not all(bad_names)
+            if good:
+                stats.written += self.write(good, stats)
+            if progress:
+                progress(stats)
+        if self.prune and self.seen:
+            if unnamed:
+                stats.prune_skipped = True  # can't tell which product that row was
+            else:
+                self.retire(stats)
+        if (stats.written or stats.deleted) and not self.dry_run:
+            bump_on_commit()  # bulk writes skip the model signals
+        return stats
+
+    def retire(self, stats):
+        """Delete products that the feed no longer lists, through the same path
+        as the delete endpoints (cards, image files and derivatives go too)."""
+        gone = [pk for name, (pk, _) in self.existing.items() if pk is not None and name not in self.seen]
+        stats.deleted = len(gone)
+        if self.dry_run:
+            return
+        for i in range(0, len(gone), DELETE_BATCH):
+            delete_products(Product.objects.filter(id__in=gone[i:i + DELETE_BATCH]))
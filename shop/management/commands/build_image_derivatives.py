@@ -0,0 +1,45 @@
+from concurrent.futures import ProcessPoolExecutor
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from shop.caching import bump_on_commit
+from shop.cards import refresh_cards
+from shop.images import generate_derivatives
+from shop.models import Product
+
+
+def _build(job):
+    pk, path, force = job
+    try:
+        return pk, generate_derivatives(path, force=force), None
+    except Exception as e:  # unreadable/corrupt upload: report and carry on
+        return pk, None, str(e)
+
+
+class Command(BaseCommand):
+    help = "Generate resized WebP/JPEG derivatives for uploaded product images."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=4, help="Processes to resize with.")
+        parser.add_argument("--force", action="store_true", help="Regenerate existing derivatives too.")
+
+    def handle(self, *args, **opts):
+        qs = Product.objects.exclude(image="").exclude(image__isnull=True)
+        if not opts["force"]:
+            qs = qs.filter(image_variants=[])
+        jobs = [(pk, default_storage.path(name), opts["force"]) for pk, name in qs.values_list("id", "image")]
+        done, failed = [], 0
+        with ProcessPoolExecutor(max_workers=max(1, opts["workers"])) as pool:
+            for pk, widths, err in pool.map(_build, jobs, chunksize=8):
+                if err:
+                    failed += 1
+                    self.stderr.write(f"product {pk}: {err}")
+                else:
+                    done.append(Product(pk=pk, image_variants=widths))
+        with transaction.atomic():
+            Product.objects.bulk_update(done, ["image_variants"], batch_size=500)
+            # the grid reads ProductCard.image_html, so the cards pick up the srcsets here
+            refresh_cards([p.pk for p in done])
+            if done:
+                bump_on_commit()
+        self.stdout.write(self.style.SUCCESS(f"Built derivatives for {len(done)} products ({failed} failed)."))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from shop.caching import bump_on_commit
+from shop.recommend import MIN_COUNT, TOP_K, build_recommendations
+
+
+class Command(BaseCommand):
+    help = "Precompute similar and frequently-bought-together products for every product."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--top", type=int, default=TOP_K, help="Products kept per list.")
+        parser.add_argument("--min-count", type=int, default=MIN_COUNT,
+                            help="Orders two products must share to count as bought together.")
+
+    def handle(self, *args, **opts):
+        n, timings = build_recommendations(max(1, opts["top"]), opts["min_count"])
+        bump_on_commit()  # API responses are cached per catalog version
+        steps = ", ".join(f"{name} {seconds:.2f}s" for name, seconds in timings.items())
+        self.stdout.write(self.style.SUCCESS(f"Wrote recommendations for {n} products ({steps})."))
@@ -0,0 +1,25 @@
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from shop.cleanup import orphans
+
+
+class Command(BaseCommand):
+    help = "Delete files under MEDIA_ROOT/products that no product or pending upload references."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--min-age", type=int, default=3600,
+                            help="Leave files younger than this many seconds alone.")
+        parser.add_argument("--dry-run", action="store_true", help="List the orphans without deleting them.")
+
+    def handle(self, *args, **opts):
+        found = size = 0
+        for name in orphans(settings.MEDIA_ROOT, opts["min_age"]):
+            found += 1
+            size += default_storage.size(name)
+            if opts["dry_run"]:
+                self.stdout.write(name)
+            else:
+                default_storage.delete(name)
+        verb = "Would delete" if opts["dry_run"] else "Deleted"
+        self.stdout.write(self.style.SUCCESS(f"{verb} {found} orphaned files ({size / 1024 / 1024:.1f} MB)."))
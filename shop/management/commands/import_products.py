@@ -1,34 +1,46 @@
-from django.core.management.base import BaseCommand
-from shop.models import Brand, Product
-import csv, decimal, pathlib
+from django.core.management.base import BaseCommand, CommandError
+from shop.importer import ProductImporter
+import pathlib
 
 class Command(BaseCommand):
     help = "Import products from a CSV with columns: name,brand,category,price,image_url"
 
     def add_arguments(self, parser):
         parser.add_argument("csv_path", type=str)
+        parser.add_argument("--batch-size", type=int, default=1000, help="Rows per upsert/transaction.")
+        parser.add_argument("--workers", type=int, default=1, help="Processes used to parse/validate rows.")
+        parser.add_argument("--dry-run", action="store_true", help="Validate only; write nothing.")
+        parser.add_argument("--incremental", action="store_true",
+                            help="Only write rows whose content hash changed.")
+        parser.add_argument("--prune", action="store_true",
+                            help="Delete products missing from the feed (implies --incremental).")
+        parser.add_argument("--max-errors", type=int, default=50, help="How many row errors to print.")
 
     def handle(self, *args, **opts):
         path = pathlib.Path(opts["csv_path"])
-        count = 0
-        with path.open(newline="", encoding="utf-8") as f:
-            for row in csv.DictReader(f):
-                brand, _ = Brand.objects.get_or_create(name=row["brand"].strip())
-                price = decimal.Decimal(str(row["price"]).strip())
-                obj, created = Product.objects.get_or_create(
-                    name=row["name"].strip(),
-                    defaults={
-                        "brand": brand,
-                        "category": row["category"].strip(),
-                        "price": price,
-                        "image_url": row.get("image_url","").strip(),
-                    },
-                )
-                if not created:
-                    obj.brand = brand
-                    obj.category = row["category"].strip()
-                    obj.price = price
-                    obj.image_url = row.get("image_url","").strip()
-                    obj.save()
-                count += 1
-        self.stdout.write(self.style.SUCCESS(f"Imported/updated {count} products."))
+        importer = ProductImporter(batch_size=max(1, opts["batch_size"]), workers=opts["workers"], dry_run=opts["dry_run"],
+                                   incremental=opts["incremental"] or opts["prune"], prune=opts["prune"])
+        progress = lambda s: self.stdout.write(f"  {s.rows} rows, {s.rows_per_sec:,.0f} rows/s", ending="\r")
+        try:
+            with path.open(newline="", encoding="utf-8") as f:
+                stats = importer.run(f, progress=progress if opts["verbosity"] > 1 else None)
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e))
+
+        for line, err in stats.errors[:opts["max_errors"]]:
+            self.stderr.write(f"line {line}: {err}")
+        if len(stats.errors) > opts["max_errors"]:
+            self.stderr.write(f"... and {len(stats.errors) - opts['max_errors']} more errors")
+        if stats.prune_skipped:
+            self.stderr.write("Not pruning: a rejected row has no name, so its product can't be told apart "
+                              "from ones the feed dropped. Fix the feed and re-run.")
+        if opts["incremental"] or opts["prune"]:
+            self.stdout.write(
+                f"inserted={stats.inserted} updated={stats.updated} unchanged={stats.unchanged} "
+                f"deleted={stats.deleted} rejected={len(stats.errors)}" + (" (dry run)" if opts["dry_run"] else "")
+            )
+        verb = "Validated" if opts["dry_run"] else "Imported/updated"
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {stats.written} products from {stats.rows} rows in {stats.elapsed:.2f}s "
+            f"({stats.rows_per_sec:,.0f} rows/s, {len(stats.errors)} rejected)."
+        ))
@@ -1,5 +1,6 @@
 from django.core.management.base import BaseCommand
-from shop.models import Brand, Product
+from shop.models import Brand, Category, Product
+from shop.synthetic import generate_catalog
 import random
 
 ITEMS = [
@@ -43,18 +44,32 @@ ITEMS = [
 ]
 
 class Command(BaseCommand):
-    help = "Load bike parts by category with different brands (uses placeholder images)."
+    help = ("Load bike parts by category with different brands (uses placeholder images). "
+            "With --products, also generate a synthetic catalog of that size for load tests.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--products", type=int, default=0, help="Synthetic products to add.")
+        parser.add_argument("--brands", type=int, default=20, help="Synthetic brands to spread them over.")
+        parser.add_argument("--images", type=int, default=0,
+                            help="Distinct generated images (with derivatives) shared by the synthetic products.")
+        parser.add_argument("--seed", type=int, default=1)
 
     def handle(self, *args, **opts):
         rng = random.Random(42)
         for _, brand, _, _, _ in ITEMS:
             Brand.objects.get_or_create(name=brand)
+        for _, _, cat, _, _ in ITEMS:
+            Category.objects.get_or_create(name=cat)
         created = 0
         for name, brand, cat, img, price in ITEMS:
             b = Brand.objects.get(name=brand)
+            c = Category.objects.get(name=cat)
             Product.objects.get_or_create(
                 name=name,
-                defaults=dict(brand=b, category=cat, price=round(price or rng.uniform(9, 499), 2), image_url=img),
+                defaults=dict(brand=b, category=c, price=round(price or rng.uniform(9, 499), 2), image_url=img),
             )
             created += 1
         self.stdout.write(self.style.SUCCESS(f"Loaded/kept {created} products across {len(set(b for _,b,_,_,_ in ITEMS))} brands."))
+        if opts["products"]:
+            n = generate_catalog(opts["products"], brands=opts["brands"], images=opts["images"], seed=opts["seed"])
+            self.stdout.write(self.style.SUCCESS(f"Generated {n} synthetic products across {opts['brands']} brands."))
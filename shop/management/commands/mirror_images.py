@@ -0,0 +1,41 @@
+from concurrent.futures import ThreadPoolExecutor
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.db.models import Q
+from shop.caching import bump_on_commit
+from shop.mirror import is_due, mirror_product
+from shop.models import Product
+
+
+def _mirror(p, force):
+    try:
+        return p.pk, mirror_product(p, force=force)
+    finally:
+        close_old_connections()
+
+
+class Command(BaseCommand):
+    help = "Download remote product image_url assets into MEDIA_ROOT and build their derivatives."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=8, help="Concurrent downloads.")
+        parser.add_argument("--force", action="store_true", help="Refetch even fresh copies.")
+        parser.add_argument("--limit", type=int, default=0, help="Stop after this many products.")
+
+    def handle(self, *args, **opts):
+        qs = Product.objects.exclude(image_url="").exclude(image_url__isnull=True).filter(Q(image="") | Q(image__isnull=True))
+        todo = [p for p in qs.iterator(chunk_size=1000) if opts["force"] or is_due(p)]
+        if opts["limit"]:
+            todo = todo[:opts["limit"]]
+        outcome = {"fetched": 0, "not_modified": 0, "error": 0}
+        with ThreadPoolExecutor(max_workers=max(1, opts["workers"])) as pool:
+            for pk, status in pool.map(lambda p: _mirror(p, opts["force"]), todo):
+                key = status.split(":")[0]
+                outcome[key] += 1
+                if key == "error" and opts["verbosity"] > 1:
+                    self.stderr.write(f"product {pk}: {status}")
+        if outcome["fetched"]:
+            bump_on_commit()
+        self.stdout.write(self.style.SUCCESS(
+            f"Mirrored {outcome['fetched']} images, {outcome['not_modified']} unchanged, {outcome['error']} failed."
+        ))
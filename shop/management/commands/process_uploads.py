@@ -0,0 +1,30 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.utils import timezone
+from shop.caching import bump_on_commit
+from shop.models import UploadJob
+from shop.uploads import process_job
+
+
+class Command(BaseCommand):
+    help = "Run queued uploader jobs, e.g. ones left behind when a worker restarted mid-batch."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--stale-after", type=int, default=600,
+                            help="Requeue jobs stuck in 'running' for this many seconds.")
+
+    def handle(self, *args, **opts):
+        cutoff = timezone.now() - timedelta(seconds=opts["stale_after"])
+        # a job queued long ago may have only just started; jobs claimed before
+        # started_at existed fall back to their creation time
+        stale = Q(started_at__lt=cutoff) | Q(started_at__isnull=True, created_at__lt=cutoff)
+        requeued = UploadJob.objects.filter(stale, status=UploadJob.RUNNING).update(status=UploadJob.QUEUED)
+        done = failed = 0
+        for pk in UploadJob.objects.filter(status=UploadJob.QUEUED).order_by("pk").values_list("pk", flat=True):
+            status = process_job(pk)
+            done += status == UploadJob.DONE
+            failed += status == UploadJob.FAILED
+        if done:
+            bump_on_commit()
+        self.stdout.write(self.style.SUCCESS(f"Processed {done} uploads, {failed} failed ({requeued} requeued)."))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+from shop.caching import bump_on_commit
+from shop.cards import rebuild_cards
+
+class Command(BaseCommand):
+    help = "Rebuild the denormalised catalog grid cards from the products."
+
+    def handle(self, *args, **opts):
+        n = rebuild_cards()
+        bump_on_commit()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {n} product cards."))
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from shop.models import Product
+from shop.search import refresh_documents, ensure_sqlite_index, rebuild_index
+
+class Command(BaseCommand):
+    help = "Recompute product search documents and rebuild the full-text index."
+
+    def handle(self, *args, **opts):
+        n = refresh_documents(Product.objects.all())
+        if not ensure_sqlite_index():
+            rebuild_index()
+        self.stdout.write(self.style.SUCCESS(f"Reindexed {n} products."))
@@ -0,0 +1,80 @@
+import json
+import os
+import subprocess
+import sys
+from collections import Counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+# Runs in a fresh interpreter under -X importtime; the phase timings come
+# back as JSON on stdout, the per-module import times on stderr.
+CHILD = """
+import json, os, time
+t = [time.perf_counter()]
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "bikeshop.settings")
+from django.conf import settings
+settings.INSTALLED_APPS
+t.append(time.perf_counter())
+import django
+django.setup(set_prefix=False)
+t.append(time.perf_counter())
+from django.core.handlers.wsgi import WSGIHandler
+WSGIHandler()
+t.append(time.perf_counter())
+from shop.startup import warm_up
+steps = warm_up()
+phases = {"settings": t[1] - t[0], "django.setup (apps, models, admin)": t[2] - t[1],
+          "WSGI handler (middleware)": t[3] - t[2]}
+phases.update((f"warm-up: {k}", v) for k, v in steps.items())
+print(json.dumps(phases))
+"""
+
+
+def parse_importtime(text):
+    """[(module, self us, cumulative us, depth)] from -X importtime output."""
+    rows = []
+    for line in text.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((name.strip(), int(self_us), int(cumulative), depth))
+    return rows
+
+
+class Command(BaseCommand):
+    help = "Profile process startup: time per phase and per imported module (python -X importtime)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--top", type=int, default=15, help="Modules and packages to list.")
+
+    def handle(self, *args, **opts):
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=os.environ.get("DJANGO_SETTINGS_MODULE", "bikeshop.settings"))
+        proc = subprocess.run([sys.executable, "-X", "importtime", "-c", CHILD], cwd=settings.BASE_DIR,
+                              env=env, capture_output=True, text=True)
+        if proc.returncode:
+            self.stderr.write(proc.stderr[-2000:])
+            raise SystemExit(proc.returncode)
+        phases = json.loads(proc.stdout.strip().splitlines()[-1])
+        rows = parse_importtime(proc.stderr)
+
+        self.stdout.write("phase                                     ms")
+        for name, seconds in phases.items():
+            self.stdout.write(f"{name:<38} {seconds * 1000:>6.1f}")
+        self.stdout.write(f"{'total':<38} {sum(phases.values()) * 1000:>6.1f}\n")
+
+        packages = Counter()
+        for name, self_us, _, _ in rows:
+            packages[name.split(".")[0]] += self_us
+        total = sum(packages.values())
+        self.stdout.write(f"{len(rows)} modules imported in {total / 1000:.1f} ms (self time, by package):")
+        for name, us in packages.most_common(opts["top"]):
+            self.stdout.write(f"  {name:<36} {us / 1000:>6.1f}")
+
+        self.stdout.write("\nslowest top-level imports (cumulative):")
+        for name, _, cumulative, _ in sorted((r for r in rows if r[3] == 0), key=lambda r: -r[2])[:opts["top"]]:
+            self.stdout.write(f"  {name:<36} {cumulative / 1000:>6.1f}")
+        heavy = sorted(name for name, *_ in rows if name.split(".")[0] in {"PIL", "numpy"})
+        if heavy:
+            self.stdout.write(self.style.WARNING(f"\nloaded at startup but only needed on demand: {', '.join(heavy[:5])}"))
@@ -0,0 +1,162 @@
+import hashlib
+import mimetypes
+import os
+import re
+import stat
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.storage import FileSystemStorage
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.cache import parse_etags
+from django.utils.encoding import filepath_to_uri
+from django.utils.http import http_date, parse_http_date_safe
+from django.views.decorators.http import require_safe
+
+# Production media serving (replaces django.views.static.serve).
+#
+# URLs built by VersionedMediaStorage embed a token derived from the file's
+# size and mtime: /media/_v/<token>/products/foo.300w.webp. Such URLs never
+# change content, so they are served with a one-year immutable Cache-Control.
+# Responses are FileResponse objects, which gunicorn turns into sendfile();
+# single byte ranges are supported and, with MEDIA_ACCEL_REDIRECT set, the
+# body is handed to a fronting nginx via X-Accel-Redirect instead.
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "public, max-age=3600"
+COMPRESSIBLE = {"image/svg+xml", "text/css", "text/plain", "application/javascript", "application/json"}
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def stat_token(st):
+    return hashlib.blake2b(f"{st.st_size}:{st.st_mtime_ns}".encode(), digest_size=6).hexdigest()
+
+
+class VersionedMediaStorage(FileSystemStorage):
+    """FileSystemStorage whose URLs change whenever the file does."""
+
+    def url(self, name):
+        try:
+            token = stat_token(os.stat(self.path(name)))
+        except (OSError, SuspiciousFileOperation):
+            return super().url(name)
+        return f"{self.base_url}_v/{token}/{filepath_to_uri(name).lstrip('/')}"
+
+
+class _RangeFile:
+    """Read-limited view of an open file. Keeps fileno() so gunicorn can
+    still sendfile() the slice (it honours the Content-Length we set)."""
+
+    def __init__(self, f, start, length):
+        f.seek(start)
+        self.f, self.remaining = f, length
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b""
+        size = self.remaining if size is None or size < 0 else min(size, self.remaining)
+        data = self.f.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.f.fileno()
+
+    def close(self):
+        self.f.close()
+
+
+def _byte_range(header, size):
+    """(start, end) inclusive for a single satisfiable range, None to ignore
+    the header, or False when it is unsatisfiable."""
+    m = _RANGE_RE.match(header.strip()) if header else None
+    if not m or not any(m.groups()):
+        return None
+    first, last = m.groups()
+    if first:
+        start, end = int(first), int(last) if last else size - 1
+    else:
+        start, end = max(0, size - int(last)), size - 1
+    if start >= size or start > end:
+        return False
+    return start, min(end, size - 1)
+
+
+def _precompressed(request, fullpath, content_type):
+    if content_type not in COMPRESSIBLE:
+        return fullpath, None
+    accept = request.headers.get("Accept-Encoding", "")
+    for encoding, ext in (("br", ".br"), ("gzip", ".gz")):
+        candidate = fullpath.with_name(fullpath.name + ext)
+        if encoding in accept and candidate.is_file():
+            return candidate, encoding
+    return fullpath, None
+
+
+@require_safe
+def serve(request, path, version=None):
+    try:
+        fullpath = Path(safe_join(settings.MEDIA_ROOT, path))
+        st = fullpath.stat()
+    except (SuspiciousFileOperation, OSError):
+        raise Http404("Not found")
+    if not stat.S_ISREG(st.st_mode):
+        raise Http404("Not found")
+
+    token = stat_token(st)
+    etag = f'"{token}"'
+    content_type = mimetypes.guess_type(fullpath.name)[0] or "application/octet-stream"
+    headers = {
+        "ETag": etag,
+        "Last-Modified": http_date(st.st_mtime),
+        "Cache-Control": IMMUTABLE if version == token else REVALIDATE,
+        "Accept-Ranges": "bytes",
+    }
+    if content_type in COMPRESSIBLE:
+        headers["Vary"] = "Accept-Encoding"
+
+    inm = request.headers.get("If-None-Match")
+    ims = parse_http_date_safe(request.headers.get("If-Modified-Since", ""))
+    if (inm and (etag in parse_etags(inm) or inm.strip() == "*")) or (not inm and ims and int(st.st_mtime) <= ims):
+        response = HttpResponseNotModified()
+        for k, v in headers.items():
+            response[k] = v
+        return response
+
+    accel = getattr(settings, "MEDIA_ACCEL_REDIRECT", "")
+    if accel:
+        # nginx serves the bytes (including ranges); we only did the lookup and headers
+        response = HttpResponse(content_type=content_type)
+        response["X-Accel-Redirect"] = accel.rstrip("/") + "/" + filepath_to_uri(path)
+        for k, v in headers.items():
+            response[k] = v
+        return response
+
+    source, encoding = _precompressed(request, fullpath, content_type)
+    size = st.st_size if source is fullpath else source.stat().st_size
+    rng = None
+    if encoding is None and request.headers.get("Range"):
+        if_range = request.headers.get("If-Range")
+        if not if_range or if_range.strip() == etag:
+            rng = _byte_range(request.headers["Range"], size)
+    if rng is False:
+        response = HttpResponse(status=416)
+        response["Content-Range"] = f"bytes */{size}"
+        return response
+
+    f = source.open("rb")
+    if rng:
+        start, end = rng
+        response = FileResponse(_RangeFile(f, start, end - start + 1), status=206, content_type=content_type)
+        response["Content-Range"] = f"bytes {start}-{end}/{size}"
+        response["Content-Length"] = str(end - start + 1)
+    else:
+        response = FileResponse(f, content_type=content_type)
+        response["Content-Length"] = str(size)
+    if encoding:
+        response["Content-Encoding"] = encoding
+    for k, v in headers.items():
+        response[k] = v
+    return response
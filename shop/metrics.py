@@ -0,0 +1,228 @@
+import logging
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.template.backends.django import DjangoTemplates, Template
+
+from .caching import hit_counter
+
+# Per-request instrumentation.
+#
+# RequestMetricsMiddleware (first in MIDDLEWARE) times every request and,
+# through a context variable, collects the SQL queries run on any connection
+# (an execute wrapper installed on each new connection, so queries issued via
+# sync_to_async threads are counted too) and the time spent rendering
+# templates (TimedDjangoTemplates, the template backend in settings). The
+# totals go out as a Server-Timing header when SERVER_TIMING is on and are
+# aggregated per view for the staff /metrics endpoint (Prometheus text
+# format). Aggregates are per process, like the catalog cache hit counter.
+#
+# QUERY_BUDGETS maps view names to the most queries a request may run. Over
+# budget is logged; with QUERY_BUDGET_STRICT (tests, CI) it raises
+# QueryBudgetExceeded, which the test client re-raises.
+
+logger = logging.getLogger(__name__)
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+UNRESOLVED = "<unresolved>"
+
+_current = ContextVar("shop_request_stats", default=None)
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class RequestStats:
+    __slots__ = ("queries", "db_time", "template_time", "depth")
+
+    def __init__(self):
+        self.queries, self.db_time, self.template_time, self.depth = 0, 0.0, 0.0, 0
+
+
+def _record_query(execute, sql, params, many, context):
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    t0 = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.queries += 1
+        stats.db_time += time.perf_counter() - t0
+
+
+def _wrap(connection):
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_query)
+
+
+@receiver(connection_created)
+def _connection_created(sender, connection, **kwargs):
+    _wrap(connection)
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        stats = _current.get()
+        if stats is None or stats.depth:
+            return super().render(context, request)  # nested renders count once
+        stats.depth += 1
+        t0 = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            stats.depth -= 1
+            stats.template_time += time.perf_counter() - t0
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """The Django template backend, with render time added to the request stats."""
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name).template, self)
+
+
+class Registry:
+    """Per-process totals per view name."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.views = {}
+        self.statuses = Counter()
+
+    def observe(self, view, status, elapsed, stats, size, session_write, over_budget):
+        with self._lock:
+            v = self.views.get(view)
+            if v is None:
+                v = self.views[view] = {"buckets": [0] * len(BUCKETS), "count": 0, "sum": 0.0, "queries": 0,
+                                        "db": 0.0, "templates": 0.0, "bytes": 0, "session_writes": 0,
+                                        "over_budget": 0}
+            for i, le in enumerate(BUCKETS):
+                if elapsed <= le:
+                    v["buckets"][i] += 1
+            v["count"] += 1
+            v["sum"] += elapsed
+            v["queries"] += stats.queries
+            v["db"] += stats.db_time
+            v["templates"] += stats.template_time
+            v["bytes"] += size
+            v["session_writes"] += session_write
+            v["over_budget"] += over_budget
+            self.statuses[(view, status)] += 1
+
+    def render(self):
+        """Prometheus text exposition format."""
+        with self._lock:
+            views = {k: {**v, "buckets": list(v["buckets"])} for k, v in self.views.items()}
+            statuses = dict(self.statuses)
+        out = [
+            "# HELP shop_request_duration_seconds Wall time per request, by view.",
+            "# TYPE shop_request_duration_seconds histogram",
+        ]
+        for view, v in sorted(views.items()):
+            label = _label(view)
+            for le, n in zip(BUCKETS, v["buckets"]):
+                out.append(f'shop_request_duration_seconds_bucket{{view="{label}",le="{le}"}} {n}')
+            out.append(f'shop_request_duration_seconds_bucket{{view="{label}",le="+Inf"}} {v["count"]}')
+            out.append(f'shop_request_duration_seconds_sum{{view="{label}"}} {v["sum"]:.6f}')
+            out.append(f'shop_request_duration_seconds_count{{view="{label}"}} {v["count"]}')
+        out += ["# HELP shop_requests_total Responses by view and status.", "# TYPE shop_requests_total counter"]
+        for (view, status), n in sorted(statuses.items()):
+            out.append(f'shop_requests_total{{view="{_label(view)}",status="{status}"}} {n}')
+        for name, key, help_text in (
+            ("shop_db_queries_total", "queries", "SQL queries run."),
+            ("shop_db_query_seconds_total", "db", "Time spent in SQL queries."),
+            ("shop_template_seconds_total", "templates", "Time spent rendering templates."),
+            ("shop_response_bytes_total", "bytes", "Response body bytes."),
+            ("shop_session_writes_total", "session_writes", "Requests that saved the session."),
+            ("shop_query_budget_exceeded_total", "over_budget", "Requests over their QUERY_BUDGETS entry."),
+        ):
+            out += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+            for view, v in sorted(views.items()):
+                value = v[key]
+                out.append(f'{name}{{view="{_label(view)}"}} {value:.6f}' if isinstance(value, float)
+                           else f'{name}{{view="{_label(view)}"}} {value}')
+        for name, counts in (("shop_cache_hits_total", hit_counter.hits), ("shop_cache_misses_total", hit_counter.misses)):
+            out += [f"# HELP {name} Catalog cache lookups (shop/caching.py).", f"# TYPE {name} counter"]
+            for cache_name, n in sorted(counts.items()):
+                out.append(f'{name}{{cache="{_label(cache_name)}"}} {n}')
+        return "\n".join(out) + "\n"
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+registry = Registry()
+
+
+def _response_size(response):
+    if response.streaming:
+        return int(response.get("Content-Length") or 0)
+    return len(response.content)
+
+
+class RequestMetricsMiddleware:
+    """Goes first in MIDDLEWARE so the session save and every other layer are included."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        for connection in connections.all(initialized_only=True):
+            _wrap(connection)  # opened before this module was imported
+        stats, t0 = RequestStats(), time.perf_counter()
+        token = _current.set(stats)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, stats, time.perf_counter() - t0)
+
+    async def __acall__(self, request):
+        stats, t0 = RequestStats(), time.perf_counter()
+        token = _current.set(stats)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, stats, time.perf_counter() - t0)
+
+    def finish(self, request, response, stats, elapsed):
+        match = getattr(request, "resolver_match", None)
+        view = match.view_name if match else UNRESOLVED
+        session = getattr(request, "session", None)
+        session_write = bool(session is not None and session.modified)
+        budget = getattr(settings, "QUERY_BUDGETS", {}).get(view)
+        over = budget is not None and stats.queries > budget
+        registry.observe(view, response.status_code, elapsed, stats, _response_size(response), session_write, over)
+        if getattr(settings, "SERVER_TIMING", False):
+            timing = [f"app;dur={elapsed * 1000:.1f}", f'db;dur={stats.db_time * 1000:.1f};desc="{stats.queries} queries"',
+                      f"tpl;dur={stats.template_time * 1000:.1f}"]
+            if session_write:
+                timing.append('session;desc="write"')
+            response["Server-Timing"] = ", ".join(timing)
+        if over:
+            message = f"{view} ran {stats.queries} queries (budget {budget})"
+            if getattr(settings, "QUERY_BUDGET_STRICT", False):
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+        return response
@@ -0,0 +1,98 @@
+# Generated by Django 5.2.6 on 2025-10-20 09:12
+
+from django.db import migrations, models, transaction, DatabaseError
+
+
+SQLITE_FORWARD = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS shop_product_fts USING fts5("
+    "search_document, content='shop_product', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+    "CREATE TRIGGER IF NOT EXISTS shop_product_fts_ai AFTER INSERT ON shop_product BEGIN "
+    "INSERT INTO shop_product_fts(rowid, search_document) VALUES (new.id, new.search_document); END",
+    "CREATE TRIGGER IF NOT EXISTS shop_product_fts_ad AFTER DELETE ON shop_product BEGIN "
+    "INSERT INTO shop_product_fts(shop_product_fts, rowid, search_document) VALUES ('delete', old.id, old.search_document); END",
+    "CREATE TRIGGER IF NOT EXISTS shop_product_fts_au AFTER UPDATE OF search_document ON shop_product BEGIN "
+    "INSERT INTO shop_product_fts(shop_product_fts, rowid, search_document) VALUES ('delete', old.id, old.search_document); "
+    "INSERT INTO shop_product_fts(rowid, search_document) VALUES (new.id, new.search_document); END",
+    "INSERT INTO shop_product_fts(shop_product_fts) VALUES ('rebuild')",
+]
+SQLITE_BACKWARD = [
+    "DROP TRIGGER IF EXISTS shop_product_fts_ai",
+    "DROP TRIGGER IF EXISTS shop_product_fts_ad",
+    "DROP TRIGGER IF EXISTS shop_product_fts_au",
+    "DROP TABLE IF EXISTS shop_product_fts",
+]
+POSTGRES_FORWARD = [
+    "CREATE INDEX IF NOT EXISTS shop_product_search_tsv ON shop_product "
+    "USING GIN (to_tsvector('simple', search_document))",
+]
+POSTGRES_TRGM = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS shop_product_search_trgm ON shop_product "
+    "USING GIN (search_document gin_trgm_ops)",
+]
+POSTGRES_BACKWARD = [
+    "DROP INDEX IF EXISTS shop_product_search_trgm",
+    "DROP INDEX IF EXISTS shop_product_search_tsv",
+]
+
+
+def fill_documents(apps, schema_editor):
+    Product = apps.get_model("shop", "Product")
+    batch = []
+    for p in Product.objects.select_related("brand").iterator(chunk_size=2000):
+        p.search_document = " ".join(
+            s.strip() for s in (p.name, p.brand.name if p.brand_id else "", p.category) if s and s.strip()
+        )
+        batch.append(p)
+        if len(batch) >= 2000:
+            Product.objects.bulk_update(batch, ["search_document"])
+            batch = []
+    if batch:
+        Product.objects.bulk_update(batch, ["search_document"])
+
+
+def _run(schema_editor, statements):
+    for sql in statements:
+        schema_editor.execute(sql)
+
+
+def create_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "sqlite":
+        try:
+            _run(schema_editor, SQLITE_FORWARD)
+        except DatabaseError:
+            pass  # SQLite built without FTS5: shop.search falls back to icontains
+    elif vendor == "postgresql":
+        _run(schema_editor, POSTGRES_FORWARD)
+        try:
+            with transaction.atomic(using=schema_editor.connection.alias):
+                _run(schema_editor, POSTGRES_TRGM)
+        except DatabaseError:
+            pass  # no privilege to create pg_trgm: typo-tolerant fallback disabled
+
+
+def drop_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "sqlite":
+        _run(schema_editor, SQLITE_BACKWARD)
+    elif vendor == "postgresql":
+        _run(schema_editor, POSTGRES_BACKWARD)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0002_remove_brand_logo_url_product_image_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='search_document',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.RunPython(fill_documents, migrations.RunPython.noop),
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:19
+
+from django.db import migrations, models
+
+
+def dedupe_names(apps, schema_editor):
+    # keep the oldest product under each name, suffix the rest with their id
+    Product = apps.get_model("shop", "Product")
+    dupes = (Product.objects.values("name").annotate(n=models.Count("id"))
+             .filter(n__gt=1).values_list("name", flat=True))
+    for name in list(dupes):
+        for p in Product.objects.filter(name=name).order_by("id")[1:]:
+            suffix = f" (#{p.id})"
+            new = name[:200 - len(suffix)] + suffix
+            Product.objects.filter(pk=p.pk).update(
+                name=new, search_document=p.search_document.replace(name, new, 1),
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0004_product_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(dedupe_names, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='product',
+            constraint=models.UniqueConstraint(fields=('name',), name='shop_product_name_uniq'),
+        ),
+    ]
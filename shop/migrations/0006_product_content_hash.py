@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:20
+
+import hashlib
+from decimal import Decimal
+from django.db import migrations, models
+
+
+def fill_hashes(apps, schema_editor):
+    # same fingerprint as shop.models.product_hash at the time of writing
+    Product = apps.get_model("shop", "Product")
+    batch = []
+    for p in Product.objects.select_related("brand").iterator(chunk_size=2000):
+        price = Decimal(str(p.price)).quantize(Decimal("0.01"))
+        raw = "\x1f".join((p.name, p.brand.name if p.brand_id else "", p.category, str(price), p.image_url or ""))
+        p.content_hash = hashlib.blake2b(raw.encode(), digest_size=16).hexdigest()
+        batch.append(p)
+        if len(batch) >= 2000:
+            Product.objects.bulk_update(batch, ["content_hash"])
+            batch = []
+    if batch:
+        Product.objects.bulk_update(batch, ["content_hash"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0005_product_name_unique'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='content_hash',
+            field=models.CharField(blank=True, default='', editable=False, max_length=32),
+        ),
+        migrations.RunPython(fill_hashes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,80 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+# the sidebar list that used to be hardcoded in shop/views.py
+SEED = [
+    "Ball Bearings & Plain Bearings", "Brakes", "Cables & Housings", "Cockpit", "Drivetrain", "Forks", "Frames",
+    "Hubs & Freewheels", "Inner Tubes", "Pedals", "Power Meters", "Quick Releases & Thru Axles",
+    "Rear Shock Absorbers", "Rims", "Saddles", "Seat Clamps", "Seatposts", "Shifting Components",
+    "Spokes & Nipples", "Tires", "Wheels",
+]
+UNCATEGORIZED = "Uncategorized"
+
+
+def categories_from_strings(apps, schema_editor):
+    Category = apps.get_model("shop", "Category")
+    Product = apps.get_model("shop", "Product")
+    names = {(n or "").strip() or UNCATEGORIZED for n in Product.objects.values_list("category", flat=True).distinct()}
+    Category.objects.bulk_create([Category(name=n) for n in sorted(names | set(SEED))], ignore_conflicts=True)
+    ids = dict(Category.objects.values_list("name", "id"))
+    # one UPDATE per distinct string
+    for raw in Product.objects.values_list("category", flat=True).distinct():
+        Product.objects.filter(category=raw).update(category_ref=ids[(raw or "").strip() or UNCATEGORIZED])
+
+
+def strings_from_categories(apps, schema_editor):
+    Product = apps.get_model("shop", "Product")
+    for pk, name in apps.get_model("shop", "Category").objects.values_list("id", "name"):
+        Product.objects.filter(category_ref=pk).update(category=name)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0010_upload_jobs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Category',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=200, unique=True)),
+            ],
+            options={'verbose_name_plural': 'categories'},
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='category_ref',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, to='shop.category'),
+        ),
+        migrations.RunPython(categories_from_strings, strings_from_categories),
+        migrations.RemoveIndex(
+            model_name='product',
+            name='shop_prod_cat_id_idx',
+        ),
+        # a default so that unapplying the RemoveField can re-add the column
+        migrations.AlterField(
+            model_name='product',
+            name='category',
+            field=models.CharField(default='', max_length=200),
+        ),
+        migrations.RemoveField(
+            model_name='product',
+            name='category',
+        ),
+        migrations.RenameField(
+            model_name='product',
+            old_name='category_ref',
+            new_name='category',
+        ),
+        migrations.AlterField(
+            model_name='product',
+            name='category',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='shop.category'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['category', 'id'], name='shop_prod_cat_id_idx'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0011_category'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductCard',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('category_id', models.BigIntegerField()),
+                ('brand_id', models.BigIntegerField(blank=True, null=True)),
+                ('name', models.CharField(max_length=200)),
+                ('brand_name', models.CharField(blank=True, max_length=120)),
+                ('category_name', models.CharField(max_length=200)),
+                ('price', models.CharField(max_length=16)),
+                ('image_html', models.TextField(blank=True)),
+                ('mirrorable', models.BooleanField(default=False)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['category_id', 'id'], name='shop_card_cat_id_idx'), models.Index(fields=['brand_id', 'id'], name='shop_card_brand_id_idx')],
+            },
+        ),
+    ]
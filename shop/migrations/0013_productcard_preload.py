@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:12
+
+from django.db import migrations, models
+
+
+def clear_cards(apps, schema_editor):
+    # the post_migrate handler finds the table out of step and rebuilds every card
+    apps.get_model("shop", "ProductCard").objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0012_productcard'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='productcard',
+            name='preload',
+            field=models.TextField(blank=True, default=''),
+        ),
+        migrations.RunPython(clear_cards, migrations.RunPython.noop),
+    ]
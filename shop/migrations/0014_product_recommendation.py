@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0013_productcard_preload'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductRecommendation',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('similar', models.JSONField(default=list)),
+                ('bought_with', models.JSONField(default=list)),
+            ],
+        ),
+    ]
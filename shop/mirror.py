@@ -0,0 +1,275 @@
+import hashlib
+import http.client
+import ipaddress
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from urllib.error import HTTPError, URLError
+from urllib.parse import urlsplit
+from urllib.request import HTTPHandler, HTTPRedirectHandler, HTTPSHandler, ProxyHandler, Request, build_opener
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections
+from django.utils import timezone
+
+from .caching import bump_catalog_version
+from .images import generate_derivatives, delete_derivatives
+
+# Opt-in local mirror for remote Product.image_url assets (IMAGE_MIRROR=True).
+# A copy is downloaded into MEDIA_ROOT/products/mirror/<sha1(url)>.<ext>, run
+# through the derivative pipeline, and preferred by {% product_img %}. Copies
+# older than IMAGE_MIRROR_MAX_AGE keep being served while a background thread
+# revalidates them (If-None-Match / If-Modified-Since), i.e.
+# stale-while-revalidate.
+# Every connection, including each redirect hop, resolves the host once,
+# refuses private addresses and connects to the address it checked, so DNS
+# rebinding can't swap in an internal IP between the check and the connect.
+
+MIRROR_DIR = "products/mirror"
+CONTENT_TYPES = {"image/jpeg": "jpg", "image/png": "png", "image/webp": "webp", "image/gif": "gif"}
+USER_AGENT = "BikeParts-image-mirror/1.0"
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def mirror_stem(url):
+    return f"{MIRROR_DIR}/{hashlib.sha1(url.encode()).hexdigest()[:20]}"
+
+
+def current_mirror(p):
+    """p.mirrored_image if it was fetched from the product's current image_url."""
+    if p.mirrored_image and p.image_url and p.mirrored_image.name.startswith(mirror_stem(p.image_url) + "."):
+        return p.mirrored_image
+    return None
+
+
+def is_due(p):
+    if not p.image_url or p.image:
+        return False
+    if p.mirrored_at is None:
+        return True
+    if p.mirrored_image and current_mirror(p) is None:
+        return True  # image_url changed since the last fetch
+    if p.mirror_error:
+        max_age = _setting("IMAGE_MIRROR_RETRY_AFTER", 3600)
+    else:
+        max_age = _setting("IMAGE_MIRROR_MAX_AGE", 7 * 24 * 3600)
+    return timezone.now() - p.mirrored_at > timedelta(seconds=max_age)
+
+
+class MirrorError(Exception):
+    pass
+
+
+class Fetched:
+    def __init__(self, status, body=b"", content_type="", etag="", last_modified=""):
+        self.status, self.body, self.content_type = status, body, content_type
+        self.etag, self.last_modified = etag, last_modified
+
+
+def _resolve(host, port):
+    """The address to connect to for host:port, refusing private ones."""
+    try:
+        infos = socket.getaddrinfo(host, port, proto=socket.IPPROTO_TCP)
+    except OSError as e:
+        raise MirrorError(f"dns: {e}")
+    if not _setting("IMAGE_MIRROR_ALLOW_PRIVATE", False):
+        for info in infos:
+            ip = ipaddress.ip_address(info[4][0])
+            if ip.is_private or ip.is_loopback or ip.is_link_local or ip.is_reserved:
+                raise MirrorError(f"refusing private address {ip}")
+    return infos[0][4][0]
+
+
+def _check_host(url):
+    parts = urlsplit(url)
+    if parts.scheme not in ("http", "https") or not parts.hostname:
+        raise MirrorError(f"unsupported url {url!r}")
+    return _resolve(parts.hostname, parts.port or (443 if parts.scheme == "https" else 80))
+
+
+class _PinnedConnection:
+    """Connects to the address _resolve() approved rather than resolving again."""
+
+    def connect(self):
+        ip = _resolve(self.host, self.port)
+        self._create_connection = lambda address, *args: socket.create_connection((ip, address[1]), *args)
+        super().connect()  # TLS still verifies the certificate against self.host
+
+
+class _HTTPConnection(_PinnedConnection, http.client.HTTPConnection):
+    pass
+
+
+class _HTTPSConnection(_PinnedConnection, http.client.HTTPSConnection):
+    pass
+
+
+class _HTTPHandler(HTTPHandler):
+    def http_open(self, req):
+        return self.do_open(_HTTPConnection, req)
+
+
+class _HTTPSHandler(HTTPSHandler):
+    def https_open(self, req):
+        return self.do_open(_HTTPSConnection, req, context=self._context)
+
+
+class _RedirectHandler(HTTPRedirectHandler):
+    max_redirections = 5
+
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        _check_host(newurl)
+        return super().redirect_request(req, fp, code, msg, headers, newurl)
+
+
+# no proxies: the address check has to see the image host, not the proxy
+_opener = build_opener(ProxyHandler({}), _HTTPHandler, _HTTPSHandler, _RedirectHandler)
+
+
+def fetch(url, etag="", last_modified=""):
+    """GET an image with retries, size and content-type limits."""
+    _check_host(url)
+    max_bytes = _setting("IMAGE_MIRROR_MAX_BYTES", 5 * 1024 * 1024)
+    retries = _setting("IMAGE_MIRROR_RETRIES", 2)
+    headers = {"User-Agent": USER_AGENT, "Accept": ", ".join(CONTENT_TYPES)}
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+    last_error = None
+    for attempt in range(retries + 1):
+        if attempt:
+            time.sleep(0.5 * 2 ** (attempt - 1))
+        try:
+            with _opener.open(Request(url, headers=headers), timeout=_setting("IMAGE_MIRROR_TIMEOUT", 10)) as resp:
+                ctype = resp.headers.get_content_type()
+                if ctype not in CONTENT_TYPES:
+                    raise MirrorError(f"unexpected content type {ctype}")
+                length = resp.headers.get("Content-Length")
+                if length and length.isdigit() and int(length) > max_bytes:
+                    raise MirrorError(f"too large ({length} bytes)")
+                body = resp.read(max_bytes + 1)
+                if len(body) > max_bytes:
+                    raise MirrorError(f"too large (> {max_bytes} bytes)")
+                return Fetched(200, body, ctype, resp.headers.get("ETag", ""), resp.headers.get("Last-Modified", ""))
+        except HTTPError as e:
+            if e.code == 304:
+                return Fetched(304)
+            if e.code < 500 and e.code != 429:
+                raise MirrorError(f"HTTP {e.code}")  # permanent, don't retry
+            last_error = f"HTTP {e.code}"
+        except (URLError, OSError, http.client.HTTPException) as e:
+            last_error = str(getattr(e, "reason", e))
+    raise MirrorError(f"gave up after {retries + 1} attempts: {last_error}")
+
+
+def _verify(body):
+    from io import BytesIO
+    from PIL import Image
+    try:
+        with Image.open(BytesIO(body)) as im:
+            im.verify()
+    except Exception:
+        raise MirrorError("not a decodable image")
+
+
+def mirror_product(p, force=False):
+    """Fetch or revalidate p.image_url. Returns "fetched", "not_modified" or "error: ..."."""
+    Product = type(p)
+    url = p.image_url
+    current = current_mirror(p)
+    now = timezone.now()
+    revalidate = current is not None and not force
+    try:
+        got = fetch(url, p.mirror_etag if revalidate else "", p.mirror_last_modified if revalidate else "")
+        if got.status == 304:
+            Product.objects.filter(pk=p.pk).update(mirrored_at=now, mirror_error="")
+            return "not_modified"
+        _verify(got.body)
+        name = f"{mirror_stem(url)}.{CONTENT_TYPES[got.content_type]}"
+        old = p.mirrored_image.name if p.mirrored_image else ""
+        if old:
+            delete_derivatives(old)
+            default_storage.delete(old)
+        if default_storage.exists(name):
+            default_storage.delete(name)
+        name = default_storage.save(name, ContentFile(got.body))
+        try:
+            variants = generate_derivatives(default_storage.path(name), force=True)
+        except Exception:
+            variants = []
+        Product.objects.filter(pk=p.pk).update(
+            mirrored_image=name, mirror_variants=variants, mirror_etag=got.etag[:200],
+            mirror_last_modified=got.last_modified[:64], mirrored_at=now, mirror_error="",
+        )
+        from .cards import refresh_cards
+        refresh_cards([p.pk])
+        return "fetched"
+    except MirrorError as e:
+        Product.objects.filter(pk=p.pk).update(mirrored_at=now, mirror_error=str(e)[:200])
+        return f"error: {e}"
+
+
+class BackgroundMirror:
+    """Process-wide bounded thread pool; duplicate requests for a product in flight are dropped."""
+
+    BUMP_EVERY = 25        # images
+    BUMP_INTERVAL = 5.0    # seconds
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pool = None
+        self._inflight = set()
+        self._since_bump = 0
+        self._last_bump = 0.0
+
+    def enqueue(self, ids):
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=_setting("IMAGE_MIRROR_WORKERS", 4),
+                                                thread_name_prefix="image-mirror")
+            for pk in ids:
+                if pk not in self._inflight:
+                    self._inflight.add(pk)
+                    self._pool.submit(self._run, pk)
+
+    def _run(self, pk):
+        from .models import Product
+        changed = False
+        try:
+            close_old_connections()
+            p = Product.objects.filter(pk=pk).first()
+            if p is not None and is_due(p):
+                changed = mirror_product(p) == "fetched"
+        except Exception:
+            pass  # never let a bad URL kill the worker thread
+        finally:
+            close_old_connections()
+            with self._lock:
+                self._inflight.discard(pk)
+                self._since_bump += changed
+                # coalesce invalidations: one bump per batch rather than per image
+                now = time.monotonic()
+                bump = self._since_bump and (not self._inflight or self._since_bump >= self.BUMP_EVERY
+                                             or now - self._last_bump >= self.BUMP_INTERVAL)
+                if bump:
+                    self._since_bump, self._last_bump = 0, now
+            if bump:
+                bump_catalog_version()
+
+
+background = BackgroundMirror()
+
+
+def schedule(ids):
+    """Queue a mirror check for products `ids` (no-op unless IMAGE_MIRROR);
+    the worker skips the ones that aren't due."""
+    if ids and _setting("IMAGE_MIRROR", False):
+        background.enqueue(ids)
@@ -1,4 +1,15 @@
+import hashlib
+from decimal import Decimal
+from django.conf import settings
 from django.db import models
+from .search import document_for
+
+
+def product_hash(name, brand_name, category, price, image_url):
+    """Fingerprint of the feed columns; lets the importer skip unchanged rows."""
+    price = Decimal(str(price if price is not None else 0)).quantize(Decimal("0.01"))
+    raw = "\x1f".join((name or "", brand_name or "", category or "", str(price), image_url or ""))
+    return hashlib.blake2b(raw.encode(), digest_size=16).hexdigest()
 
 class Brand(models.Model):
     name = models.CharField(max_length=120, unique=True)
@@ -7,16 +18,150 @@ class Brand(models.Model):
         return self.name
 
 
+class Category(models.Model):
+    name = models.CharField(max_length=200, unique=True)
+
+    class Meta:
+        verbose_name_plural = "categories"
+
+    def __str__(self):
+        return self.name
+
+
 class Product(models.Model):
     name = models.CharField(max_length=200)
     brand = models.ForeignKey(Brand, on_delete=models.SET_NULL, null=True, blank=True)
-    category = models.CharField(max_length=200)
+    category = models.ForeignKey(Category, on_delete=models.PROTECT)
     price = models.DecimalField(max_digits=10, decimal_places=2)
 
     # Preferred local upload
     image = models.ImageField(upload_to="products/", null=True, blank=True)
     # Optional remote URL (fallback)
     image_url = models.URLField(blank=True, null=True)
+    # widths of the resized copies of `image` (see shop/images.py)
+    image_variants = models.JSONField(default=list, blank=True, editable=False)
+
+    # Local copy of image_url kept by shop/mirror.py
+    mirrored_image = models.ImageField(upload_to="products/mirror/", null=True, blank=True, editable=False)
+    mirror_variants = models.JSONField(default=list, blank=True, editable=False)
+    mirror_etag = models.CharField(max_length=200, blank=True, default="", editable=False)
+    mirror_last_modified = models.CharField(max_length=64, blank=True, default="", editable=False)
+    mirrored_at = models.DateTimeField(null=True, blank=True, editable=False)
+    mirror_error = models.CharField(max_length=200, blank=True, default="", editable=False)
+
+    # name + brand + category, indexed for full-text search (see shop/search.py)
+    search_document = models.TextField(blank=True, default="", editable=False)
+    # product_hash() of the feed columns, for delta imports
+    content_hash = models.CharField(max_length=32, blank=True, default="", editable=False)
+
+    class Meta:
+        # the catalog grid pages by `-id` within a category/brand (shop/pagination.py)
+        indexes = [
+            models.Index(fields=["category", "id"], name="shop_prod_cat_id_idx"),
+            models.Index(fields=["brand", "id"], name="shop_prod_brand_id_idx"),
+        ]
+        # upsert key for the CSV importer (shop/importer.py)
+        constraints = [
+            models.UniqueConstraint(fields=["name"], name="shop_product_name_uniq"),
+        ]
+
+    def __str__(self):
+        return self.name
+
+    def save(self, *args, **kwargs):
+        brand_name = self.brand.name if self.brand_id else ""
+        category_name = self.category.name if self.category_id else ""
+        self.search_document = document_for(self.name, brand_name, category_name)
+        self.content_hash = product_hash(self.name, brand_name, category_name, self.price, self.image_url)
+        if kwargs.get("update_fields") is not None:
+            kwargs["update_fields"] = {*kwargs["update_fields"], "search_document", "content_hash"}
+        super().save(*args, **kwargs)
+
+
+class ProductCard(models.Model):
+    """What one catalog grid card shows, kept in step with Product by shop/cards.py."""
+    # the product's id, which is also the grid's sort key (newest first)
+    id = models.BigIntegerField(primary_key=True)
+    category_id = models.BigIntegerField()
+    brand_id = models.BigIntegerField(null=True, blank=True)
+    name = models.CharField(max_length=200)
+    brand_name = models.CharField(max_length=120, blank=True)
+    category_name = models.CharField(max_length=200)
+    price = models.CharField(max_length=16)  # formatted, e.g. "89.00"
+    # {% product_img %} output: <picture> with srcsets, or the plain/remote <img>
+    image_html = models.TextField(blank=True)
+    # Link header entry preloading that image, for cards in the first row
+    preload = models.TextField(blank=True, default="")
+    # image_url with no upload: the card view asks shop/mirror.py to fetch it
+    mirrorable = models.BooleanField(default=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["category_id", "id"], name="shop_card_cat_id_idx"),
+            models.Index(fields=["brand_id", "id"], name="shop_card_brand_id_idx"),
+        ]
 
     def __str__(self):
         return self.name
+
+
+class ProductRecommendation(models.Model):
+    """Precomputed related products for one product, written by shop/recommend.py."""
+    # the product's id
+    id = models.BigIntegerField(primary_key=True)
+    # product ids, best first: same category near in price (brand match ranks higher)
+    similar = models.JSONField(default=list)
+    # product ids, most often in the same order first
+    bought_with = models.JSONField(default=list)
+
+    def __str__(self):
+        return f"Recommendations for #{self.pk}"
+
+
+class Order(models.Model):
+    # one per checkout form render; a repeated POST finds the existing order (shop/orders.py)
+    idempotency_key = models.CharField(max_length=64, unique=True)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True)
+    full_name = models.CharField(max_length=200, blank=True)
+    address = models.CharField(max_length=300)
+    phone = models.CharField(max_length=40)
+    email = models.EmailField(blank=True)
+    total = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal("0.00"))
+    item_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"Order #{self.pk}"
+
+
+class OrderLine(models.Model):
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name="lines")
+    product = models.ForeignKey(Product, on_delete=models.SET_NULL, null=True, blank=True)
+    # name and price as charged, so later catalog edits don't rewrite history
+    name = models.CharField(max_length=200)
+    price = models.DecimalField(max_digits=10, decimal_places=2)
+    qty = models.PositiveIntegerField()
+
+    @property
+    def subtotal(self):
+        return self.price * self.qty
+
+
+class UploadJob(models.Model):
+    """One image from the batch uploader, processed off-request (shop/uploads.py)."""
+    QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+    STATUSES = [(s, s) for s in (QUEUED, RUNNING, DONE, FAILED)]
+
+    status = models.CharField(max_length=10, choices=STATUSES, default=QUEUED, db_index=True)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True)
+    name = models.CharField(max_length=200)
+    brand_name = models.CharField(max_length=120, blank=True)
+    category = models.CharField(max_length=200)
+    price = models.DecimalField(max_digits=10, decimal_places=2, default=Decimal("0.00"))
+    # written straight to its final place; the Product reuses the same file
+    file = models.ImageField(upload_to="products/")
+    product = models.ForeignKey(Product, on_delete=models.SET_NULL, null=True, blank=True)
+    error = models.CharField(max_length=200, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)  # when a worker claimed it
+    finished_at = models.DateTimeField(null=True, blank=True)
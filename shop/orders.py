@@ -0,0 +1,52 @@
+import secrets
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+
+from .cart import _get
+from .models import Order, OrderLine, Product
+
+# Checkout. The form carries an idempotency key minted when it was rendered,
+# so a double-click or a retried POST returns the order the first request
+# created instead of charging twice. Everything is written in one transaction;
+# the Order row goes first so SQLite takes its write lock up front (a read
+# followed by a write in one transaction can fail with "database is locked"
+# under concurrency), and on Postgres the product rows are locked FOR UPDATE
+# so the price snapshot can't interleave with a price edit.
+
+
+def new_key():
+    return secrets.token_urlsafe(24)
+
+
+def place_order(store, key, data, user=None):
+    """Create an Order from the cart in `store`. Returns (order, created);
+    order is None when the cart holds nothing orderable."""
+    existing = Order.objects.filter(idempotency_key=key).first()
+    if existing is not None:
+        return existing, False
+    cart = {int(pid): qty for pid, qty in _get(store).items() if qty > 0}
+    if not cart:
+        return None, False
+    try:
+        with transaction.atomic():
+            order = Order.objects.create(idempotency_key=key, user=user if user and user.is_authenticated else None,
+                                         **data)
+            rows = (Product.objects.select_for_update(of=("self",)).filter(id__in=cart)
+                    .order_by("id").values_list("id", "name", "price"))
+            lines = [OrderLine(order=order, product_id=pid, name=name, price=price, qty=cart[pid])
+                     for pid, name, price in rows]
+            if not lines:
+                transaction.set_rollback(True)
+                return None, False
+            OrderLine.objects.bulk_create(lines)
+            order.total = sum((l.subtotal for l in lines), Decimal("0.00"))
+            order.item_count = sum(l.qty for l in lines)
+            order.save(update_fields=["total", "item_count"])
+    except IntegrityError:
+        # a concurrent POST with the same key won the race
+        order = Order.objects.filter(idempotency_key=key).first()
+        if order is None:
+            raise
+        return order, False
+    return order, True
@@ -0,0 +1,144 @@
+from django.core import signing
+from django.core.exceptions import EmptyResultSet
+from django.core.paginator import Paginator
+from django.db import DatabaseError, connections
+from django.utils.functional import cached_property
+from django.utils.http import urlencode
+
+from .caching import cached_count
+
+
+def encode_cursor(pk):
+    return signing.b64_encode(str(pk).encode()).decode()
+
+
+def decode_cursor(token):
+    if not token:
+        return None
+    try:
+        return int(signing.b64_decode(token.encode()))
+    except (ValueError, TypeError):
+        return None
+
+
+def row_id(row):
+    """Primary key of a model instance or a .values() dict."""
+    return row["id"] if isinstance(row, dict) else row.id
+
+
+class KeysetPage:
+    """One page of a `-id` ordered queryset, addressed by opaque cursors.
+
+    Replaces OFFSET/COUNT paging for the product grid: each page is a single
+    `id < cursor ORDER BY id DESC LIMIT n+1` range scan. `qs` may be a
+    .values() queryset as long as it selects "id"."""
+
+    def __init__(self, qs, per_page, after=None, before=None, count_key=None):
+        base = qs
+        after, before = decode_cursor(after), decode_cursor(before)
+        rows, has_prev, has_next = None, after is not None, False
+        if before is not None:
+            rows = list(qs.filter(id__gt=before).order_by("id")[:per_page + 1])
+            has_prev = len(rows) > per_page
+            rows = rows[:per_page][::-1]
+            has_next = True
+            if not has_prev:
+                rows = None  # walked back to the start: show the regular first page
+        if rows is None:
+            if after is not None:
+                qs = qs.filter(id__lt=after)
+            rows = list(qs.order_by("-id")[:per_page + 1])
+            has_next = len(rows) > per_page
+            rows = rows[:per_page]
+            has_prev = after is not None
+        self.object_list = rows
+        self.next_cursor = encode_cursor(row_id(rows[-1])) if has_next and rows else None
+        self.previous_cursor = encode_cursor(row_id(rows[0])) if has_prev and rows else None
+        self._count_qs, self._count_key = base, count_key
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    @cached_property
+    def count(self):
+        return cached_count(self._count_qs, *self._count_key) if self._count_key else None
+
+
+class CachedCountPaginator(Paginator):
+    """Paginator whose total comes from the catalog count cache."""
+
+    def __init__(self, object_list, per_page, count_key, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.count_key = count_key
+
+    @cached_property
+    def count(self):
+        if isinstance(self.object_list, (list, tuple)):
+            return len(self.object_list)
+        return cached_count(self.object_list, *self.count_key)
+
+
+# above this many rows an unfiltered admin changelist shows the planner's estimate
+ESTIMATE_ABOVE = 100_000
+
+
+def estimated_rows(model, using="default"):
+    """The database's own row estimate for `model`'s table (None where there isn't one)."""
+    conn = connections[using]
+    table = model._meta.db_table
+    try:
+        with conn.cursor() as cur:
+            if conn.vendor == "postgresql":
+                cur.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass", [table])
+            elif conn.vendor == "sqlite":
+                # written by ANALYZE (or PRAGMA optimize); the first number is the row count
+                cur.execute("SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1", [table])
+            else:
+                return None
+            row = cur.fetchone()
+    except DatabaseError:
+        return None
+    if not row or row[0] is None:
+        return None
+    n = int(str(row[0]).split()[0])
+    return n if n >= 0 else None  # -1: never analyzed
+
+
+class EstimatedCountPaginator(Paginator):
+    """Admin changelist paginator. A large unfiltered table is counted from the
+    planner's estimate; anything else is counted once per catalog version."""
+
+    @cached_property
+    def count(self):
+        qs = self.object_list
+        if not qs.query.has_filters():
+            estimate = estimated_rows(qs.model, qs.db)
+            if estimate is not None and estimate > ESTIMATE_ABOVE:
+                return estimate
+        try:
+            sql, params = qs.query.sql_with_params()
+        except EmptyResultSet:
+            return 0
+        return cached_count(qs, "admin", sql, params)
+
+
+def page_links(request, page, keep=("cat", "brand", "q")):
+    """(previous_url, next_url) for either page type, keeping the `keep` filters."""
+    keep = {k: v for k, v in request.GET.items() if k in keep and v}
+    link = lambda **extra: "?" + urlencode({**keep, **extra})
+    if isinstance(page, KeysetPage):
+        prev = link(before=page.previous_cursor) if page.has_previous() else None
+        nxt = link(after=page.next_cursor) if page.has_next() else None
+    else:
+        prev = link(page=page.previous_page_number()) if page.has_previous() else None
+        nxt = link(page=page.next_page_number()) if page.has_next() else None
+    return prev, nxt
@@ -0,0 +1,174 @@
+import time
+from itertools import zip_longest
+
+from django.db import transaction
+from django.db.models import FloatField, Value
+from django.db.models.functions import Cast, Coalesce
+
+from .models import OrderLine, Product, ProductRecommendation
+
+# "Similar items" and "frequently bought together", precomputed offline.
+#
+# `manage.py build_recommendations` loads the whole catalog as a few NumPy
+# columns and scores every product at once:
+#
+#   similar      products of the same category, ranked by price distance
+#                (log scale) with a bonus for the same brand. Candidates are
+#                the WINDOW neighbours on either side in (category, price)
+#                order, so the work is O(n * WINDOW) however large a category
+#                gets, instead of comparing every pair.
+#   bought_with  products that appear in the same orders, by how many orders
+#                they share (at least MIN_COUNT). Baskets over MAX_BASKET lines
+#                are skipped: they pair everything with everything.
+#
+# The result is one ProductRecommendation row per product holding two short
+# lists of ids; pages read it with one primary-key lookup and render the ids
+# through the catalog cards (shop/catalog.py), which skip products deleted
+# since the last build. NumPy is imported lazily: only the build needs it.
+
+TOP_K = 8
+WINDOW = 32
+BRAND_BONUS = 0.5  # a brand match outweighs a ~65% price difference
+MIN_COUNT = 2
+MAX_BASKET = 50
+CHUNK = 20000  # products scored per step, bounds memory at CHUNK x 2*WINDOW
+BATCH = 2000
+
+
+def load_catalog():
+    """Columns of the catalog: ids (sorted), category ids, brand ids (-1 for none), prices."""
+    import numpy as np
+    rows = list(Product.objects.order_by("id")
+                .values_list("id", "category_id", Coalesce("brand_id", Value(-1)), Cast("price", FloatField())))
+    ids, category, brand, price = zip(*rows) if rows else ((), (), (), ())
+    return (np.array(ids, dtype=np.int64), np.array(category, dtype=np.int64), np.array(brand, dtype=np.int64),
+            np.array(price, dtype=np.float64))
+
+
+def similar(category, brand, price, k=TOP_K, window=WINDOW):
+    """(n, k) row indexes of each product's most similar products, best first; -1 pads."""
+    import numpy as np
+    n = len(category)
+    out = np.full((n, k), -1, dtype=np.int64)
+    if n < 2:
+        return out
+    logp = np.log1p(np.maximum(price, 0))
+    order = np.lexsort((logp, category))
+    cat, brd, lp = category[order], brand[order], logp[order]
+    offsets = np.concatenate((np.arange(-window, 0), np.arange(1, window + 1)))
+    k = min(k, len(offsets))
+    for start in range(0, n, CHUNK):
+        rows = np.arange(start, min(n, start + CHUNK))
+        cand = np.clip(rows[:, None] + offsets, 0, n - 1)
+        valid = (rows[:, None] + offsets >= 0) & (rows[:, None] + offsets < n) & (cat[cand] == cat[rows, None])
+        score = BRAND_BONUS * ((brd[cand] == brd[rows, None]) & (brd[rows, None] >= 0)) - np.abs(lp[cand] - lp[rows, None])
+        score = np.where(valid, score, -np.inf)
+        top = np.argpartition(-score, k - 1, axis=1)[:, :k]
+        top = np.take_along_axis(top, np.argsort(-np.take_along_axis(score, top, 1), axis=1, kind="stable"), 1)
+        found = np.isfinite(np.take_along_axis(score, top, 1))
+        out[order[rows], :k] = np.where(found, order[np.take_along_axis(cand, top, 1)], -1)
+    return out
+
+
+def bought_together(ids, orders, products, k=TOP_K, min_count=MIN_COUNT):
+    """(n, k) row indexes of the products most often ordered with each product; -1 pads.
+    `orders` and `products` are the order and product id of every order line."""
+    import numpy as np
+    n = len(ids)
+    out = np.full((n, k), -1, dtype=np.int64)
+    pos = np.searchsorted(ids, products)
+    known = (pos < n) & (ids[np.minimum(pos, n - 1)] == products)
+    # one line per (order, product), sorted by order
+    lines = np.unique(np.stack((orders[known], pos[known]), axis=1), axis=0)
+    if not len(lines):
+        return out
+    _, size = np.unique(lines[:, 0], return_counts=True)
+    per_line = np.repeat(size, size)
+    lines = lines[(per_line >= 2) & (per_line <= MAX_BASKET)]
+    if not len(lines):
+        return out
+    _, start, size = np.unique(lines[:, 0], return_index=True, return_counts=True)
+    # every ordered pair of lines within a basket
+    group_start, group_size = np.repeat(start, size), np.repeat(size, size)
+    left = np.repeat(np.arange(len(lines)), group_size)
+    right = group_start[left] + np.arange(len(left)) - np.repeat(np.cumsum(group_size) - group_size, group_size)
+    pair = left != right
+    a, b = lines[left[pair], 1], lines[right[pair], 1]
+    keys, count = np.unique(a * n + b, return_counts=True)
+    often = count >= min_count
+    a, b, count = keys[often] // n, keys[often] % n, count[often]
+    if not len(a):
+        return out
+    # best first within each product, then keep the first k
+    rank_order = np.lexsort((b, -count, a))
+    a, b = a[rank_order], b[rank_order]
+    _, first, per_a = np.unique(a, return_index=True, return_counts=True)
+    rank = np.arange(len(a)) - np.repeat(first, per_a)
+    top = rank < k
+    out[a[top], rank[top]] = b[top]
+    return out
+
+
+def order_lines():
+    """Order ids and product ids of every order line that still has its product."""
+    import numpy as np
+    rows = OrderLine.objects.filter(product__isnull=False).values_list("order_id", "product_id")
+    pairs = np.array(list(rows), dtype=np.int64).reshape(-1, 2)
+    return pairs[:, 0], pairs[:, 1]
+
+
+def save_recommendations(ids, similar_rows, bought_rows):
+    """Replace every ProductRecommendation. Returns the number of rows written."""
+    import numpy as np
+    written = 0
+    with transaction.atomic():
+        ProductRecommendation.objects.all().delete()
+        for start in range(0, len(ids), BATCH):
+            end = start + BATCH
+            # ids are positive, so 0 marks an empty slot
+            sim = np.where(similar_rows[start:end] >= 0, ids[similar_rows[start:end]], 0).tolist()
+            bought = np.where(bought_rows[start:end] >= 0, ids[bought_rows[start:end]], 0).tolist()
+            batch = [
+                ProductRecommendation(id=pid, similar=[x for x in s if x], bought_with=[x for x in b if x])
+                for pid, s, b in zip(ids[start:end].tolist(), sim, bought) if s[0] or b[0]
+            ]
+            ProductRecommendation.objects.bulk_create(batch)
+            written += len(batch)
+    return written
+
+
+def build_recommendations(k=TOP_K, min_count=MIN_COUNT):
+    """Recompute every product's recommendations. Returns the row count and seconds per step."""
+    marks = [("start", time.perf_counter())]
+    ids, category, brand, price = load_catalog()
+    orders, products = order_lines()
+    marks.append(("load", time.perf_counter()))
+    similar_rows = similar(category, brand, price, k)
+    marks.append(("similar", time.perf_counter()))
+    bought_rows = bought_together(ids, orders, products, k, min_count)
+    marks.append(("bought together", time.perf_counter()))
+    n = save_recommendations(ids, similar_rows, bought_rows)
+    marks.append(("write", time.perf_counter()))
+    return n, {name: t - marks[i][1] for i, (name, t) in enumerate(marks[1:])}
+
+
+def recommended_for(product_ids, k=4):
+    """Up to `k` product ids to suggest alongside `product_ids` (e.g. a cart), not
+    including them: bought together first, then similar, taking each product's
+    best in turn. One primary-key lookup."""
+    product_ids = list(product_ids)
+    if not product_ids:
+        return []
+    rows = {pid: (bought, sim) for pid, bought, sim in
+            ProductRecommendation.objects.filter(id__in=product_ids).values_list("id", "bought_with", "similar")}
+    found = [rows[pid] for pid in product_ids if pid in rows]
+    seen, out = set(product_ids), []
+    for lists in ([b for b, _ in found], [s for _, s in found]):
+        for column in zip_longest(*lists):
+            for pid in column:
+                if pid is not None and pid not in seen:
+                    seen.add(pid)
+                    out.append(pid)
+                    if len(out) == k:
+                        return out
+    return out
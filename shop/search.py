@@ -0,0 +1,204 @@
+import re
+from django.db import connection, DatabaseError
+from django.db.models import Value
+from django.db.models.expressions import RawSQL
+
+# Full-text catalog search.
+# Every Product carries a denormalised `search_document` (name + brand + category).
+# SQLite indexes it with an FTS5 external-content table kept in sync by triggers,
+# Postgres with GIN indexes over to_tsvector() and pg_trgm (see migration 0003).
+# Anything else falls back to icontains over the document.
+# Results are never truncated: a category/brand filter is applied inside the
+# index query, the count covers every match, and each page is ranked over the
+# whole match set with LIMIT/OFFSET.
+
+FTS_TABLE = "shop_product_fts"
+MAX_TERMS = 8
+
+SQLITE_INDEX_DDL = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    "search_document, content='shop_product', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON shop_product BEGIN "
+    f"INSERT INTO {FTS_TABLE}(rowid, search_document) VALUES (new.id, new.search_document); END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON shop_product BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, search_document) VALUES ('delete', old.id, old.search_document); END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF search_document ON shop_product BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, search_document) VALUES ('delete', old.id, old.search_document); "
+    f"INSERT INTO {FTS_TABLE}(rowid, search_document) VALUES (new.id, new.search_document); END",
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+]
+
+_TOKEN_RE = re.compile(r"[^\W_]+")
+_fts_ready = {}
+_trgm_ready = {}
+
+
+def document_for(name, brand_name, category):
+    return " ".join(s.strip() for s in (name or "", brand_name or "", category or "") if s and s.strip())
+
+
+def tokenize(q):
+    return _TOKEN_RE.findall((q or "").lower())[:MAX_TERMS]
+
+
+def _sqlite_fts_ready():
+    # cached per database alias; the table only exists once migrations ran
+    alias = connection.alias
+    if alias not in _fts_ready:
+        with connection.cursor() as cur:
+            cur.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name=%s", [FTS_TABLE])
+            _fts_ready[alias] = cur.fetchone() is not None
+    return _fts_ready[alias]
+
+
+def _postgres_trgm_ready():
+    alias = connection.alias
+    if alias not in _trgm_ready:
+        with connection.cursor() as cur:
+            cur.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+            _trgm_ready[alias] = cur.fetchone() is not None
+    return _trgm_ready[alias]
+
+
+def _index():
+    """"sqlite" or "postgresql" when a full-text index is available, else None."""
+    if connection.vendor == "sqlite" and _sqlite_fts_ready():
+        return "sqlite"
+    if connection.vendor == "postgresql":
+        return "postgresql"
+    return None
+
+
+def _postgres_match(terms):
+    """(condition on shop_product p, params, rank ORDER BY, params). Falls back to
+    trigram similarity when nothing matches exactly, to tolerate typos (needs pg_trgm)."""
+    tsquery = " & ".join(f"{t}:*" for t in terms)
+    exact = "to_tsvector('simple', p.search_document) @@ to_tsquery('simple', %s)"
+    with connection.cursor() as cur:
+        cur.execute(f"SELECT 1 FROM shop_product p WHERE {exact} LIMIT 1", [tsquery])
+        found = cur.fetchone() is not None
+    if found or not _postgres_trgm_ready():
+        return (exact, [tsquery],
+                "ts_rank(to_tsvector('simple', p.search_document), to_tsquery('simple', %s)) DESC", [tsquery])
+    text = " ".join(terms)
+    return "p.search_document %% %s", [text], "similarity(p.search_document, %s) DESC", [text]
+
+
+def _fts_query(terms):
+    # implicit AND of prefix terms, e.g. "shim"* "brak"*
+    return " ".join(f'"{t}"*' for t in terms)
+
+
+def matching(q):
+    """Every product id matching `q`, as a subquery for `pk__in`; None when there is no index."""
+    terms = tokenize(q)
+    index = _index()
+    if index == "sqlite":
+        return RawSQL(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [_fts_query(terms)])
+    if index == "postgresql":
+        condition, params, _, _ = _postgres_match(terms)
+        return RawSQL(f"SELECT p.id FROM shop_product p WHERE {condition}", params)
+    return None
+
+
+class SearchResults:
+    """Every hit for `terms`, best first, within a category and/or brand. Works
+    with Paginator: count() and each page are one query against the index
+    with the filters applied inside it, and a page's rows are then fetched
+    from `qs` (Product or ProductCard) with a single pk lookup."""
+
+    def __init__(self, qs, terms, category_id=None, brand_id=None):
+        self.qs, self.empty = qs, qs.query.is_empty()
+        filters = [(column, value) for column, value in (("category_id", category_id), ("brand_id", brand_id))
+                   if value is not None]
+        where = "".join(f" AND p.{column} = %s" for column, _ in filters)
+        values = [value for _, value in filters]
+        if _index() == "sqlite":
+            join = " JOIN shop_product p ON p.id = f.rowid" if filters else ""
+            self.sql = f"FROM {FTS_TABLE} f{join} WHERE f.{FTS_TABLE} MATCH %s{where}"
+            self.params = [_fts_query(terms), *values]
+            self.id, self.order, self.order_params = "f.rowid", "f.rank, f.rowid DESC", []
+        else:
+            condition, params, rank, rank_params = _postgres_match(terms)
+            self.sql, self.params = f"FROM shop_product p WHERE {condition}{where}", [*params, *values]
+            self.id, self.order, self.order_params = "p.id", f"{rank}, p.id DESC", rank_params
+
+    def count(self):
+        if self.empty:
+            return 0
+        with connection.cursor() as cur:
+            cur.execute(f"SELECT count(*) {self.sql}", self.params)
+            return cur.fetchone()[0]
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, k):
+        if not isinstance(k, slice):
+            return self[k:k + 1][0]
+        start = k.start or 0
+        stop = self.count() if k.stop is None else k.stop
+        if self.empty or stop <= start:
+            return []
+        with connection.cursor() as cur:
+            cur.execute(f"SELECT {self.id} {self.sql} ORDER BY {self.order} LIMIT %s OFFSET %s",
+                        [*self.params, *self.order_params, stop - start, start])
+            ids = [r[0] for r in cur.fetchall()]
+        rows = self.qs.filter(pk__in=ids) if ids else []
+        by_id = {(r["id"] if isinstance(r, dict) else r.pk): r for r in rows}
+        return [by_id[i] for i in ids if i in by_id]
+
+
+def search_products(qs, q, category_id=None, brand_id=None):
+    """Hits for `q` within `qs`, a queryset of Product or of a model sharing its ids
+    (ProductCard) already narrowed to `category_id`/`brand_id`."""
+    terms = tokenize(q)
+    if not terms:
+        return qs.none()
+    if _index() is None:
+        from .models import Product
+        matches = qs if qs.model is Product else Product.objects.all()
+        for t in terms:
+            matches = matches.filter(search_document__icontains=t)
+        return matches if qs.model is Product else qs.filter(pk__in=matches.values("pk"))
+    return SearchResults(qs, terms, category_id, brand_id)
+
+
+def ensure_sqlite_index():
+    """Recreate the FTS triggers if a table rebuild dropped them (SQLite
+    migrations remake shop_product on many schema changes). Returns True if
+    the index had to be rebuilt."""
+    if connection.vendor != "sqlite":
+        return False
+    with connection.cursor() as cur:
+        cur.execute(
+            "SELECT count(*) FROM sqlite_master WHERE type='trigger' AND name LIKE %s",
+            [f"{FTS_TABLE}_a_"],
+        )
+        if cur.fetchone()[0] == 3:
+            return False
+        try:
+            for sql in SQLITE_INDEX_DDL:
+                cur.execute(sql)
+        except DatabaseError:
+            return False  # no FTS5 in this SQLite build
+    _fts_ready.pop(connection.alias, None)
+    return True
+
+
+def rebuild_index():
+    if connection.vendor == "sqlite" and _sqlite_fts_ready():
+        with connection.cursor() as cur:
+            cur.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+
+def refresh_documents(qs):
+    """Recompute search_document for a Product queryset in a single UPDATE."""
+    from django.db.models import F, OuterRef, Subquery
+    from django.db.models.functions import Coalesce, Concat, Trim
+    from .models import Brand, Category
+    brand_name = Subquery(Brand.objects.filter(pk=OuterRef("brand_id")).values("name")[:1])
+    category_name = Subquery(Category.objects.filter(pk=OuterRef("category_id")).values("name")[:1])
+    doc = Trim(Concat(F("name"), Value(" "), Coalesce(brand_name, Value("")), Value(" "), Coalesce(category_name, Value(""))))
+    return qs.update(search_document=doc)
@@ -0,0 +1,77 @@
+from django.contrib.auth.signals import user_logged_in
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models.signals import post_save, pre_delete, post_delete, post_migrate
+from django.dispatch import receiver
+
+from .models import Brand, Category, Product, ProductCard
+from .search import refresh_documents, ensure_sqlite_index
+from .caching import bump_on_commit
+from .cards import card_for, save_cards, refresh_cards, ensure_cards
+from .bulk import in_bulk
+from .cart_storage import AccountCart
+
+
+# Any catalog write invalidates cached counts (shop/caching.py); bulk edits
+# (shop/bulk.py) bump once for the whole set
+@receiver([post_save, post_delete], sender=Product)
+@receiver([post_save, post_delete], sender=Brand)
+@receiver([post_save, post_delete], sender=Category)
+def catalog_changed(sender, **kwargs):
+    if not in_bulk():
+        bump_on_commit()
+
+
+# Grid cards (shop/cards.py) follow every product write
+@receiver(post_save, sender=Product)
+def product_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        save_cards([card_for(instance)])
+
+@receiver(post_delete, sender=Product)
+def product_deleted(sender, instance, **kwargs):
+    if not in_bulk():
+        ProductCard.objects.filter(id=instance.pk).delete()
+
+
+# A brand rename or delete changes the search document and cards of all its products.
+@receiver(post_save, sender=Brand)
+def brand_saved(sender, instance, created, **kwargs):
+    if not created:
+        qs = Product.objects.filter(brand_id=instance.pk)
+        refresh_documents(qs)
+        refresh_cards(qs.values_list("id", flat=True))
+
+@receiver(pre_delete, sender=Brand)
+def brand_deleting(sender, instance, **kwargs):
+    instance._product_ids = list(Product.objects.filter(brand_id=instance.pk).values_list("id", flat=True))
+
+@receiver(post_delete, sender=Brand)
+def brand_deleted(sender, instance, **kwargs):
+    ids = getattr(instance, "_product_ids", None)
+    if ids:
+        refresh_documents(Product.objects.filter(id__in=ids))
+        refresh_cards(ids)
+
+# Same for a category rename (categories with products can't be deleted)
+@receiver(post_save, sender=Category)
+def category_saved(sender, instance, created, **kwargs):
+    if not created:
+        qs = Product.objects.filter(category_id=instance.pk)
+        refresh_documents(qs)
+        refresh_cards(qs.values_list("id", flat=True))
+
+# SQLite table rebuilds during later migrations drop the FTS triggers; the
+# migration that adds the card table (or a restored dump) leaves it empty
+@receiver(post_migrate)
+def search_index_after_migrate(sender, app_config=None, using=DEFAULT_DB_ALIAS, **kwargs):
+    if app_config is not None and app_config.label == "shop" and using == DEFAULT_DB_ALIAS:
+        ensure_sqlite_index()
+        ensure_cards()
+
+
+# An anonymous cookie cart becomes the account's session cart at login
+@receiver(user_logged_in)
+def move_cart(sender, request, user, **kwargs):
+    cart = getattr(request, "cart", None)
+    if isinstance(cart, AccountCart):
+        cart.signed_in()
@@ -0,0 +1,69 @@
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth.forms import AuthenticationForm, UserCreationForm
+from django.db import connections
+from django.template import engines
+from django.urls import resolve, reverse
+from django.utils import translation
+
+from .assets import critical_css
+from .forms import CheckoutForm
+
+# Process warm-up.
+#
+# Under `gunicorn --preload` (bikeshop/gunicorn_conf.py) the app is imported
+# once in the master and the workers are forked from it, so anything done
+# there before the fork is shared copy-on-write instead of being redone on
+# each worker's first request: the URLconf and the views it imports, the
+# project's templates compiled into the cached template loader (Django's
+# default loader setup when DEBUG is off), the form widget templates, the
+# catalog's critical CSS and the translation catalogs.
+# Nothing here touches the database; connections are closed so no worker
+# inherits a socket or SQLite handle.
+
+
+def project_templates():
+    """(engine, template name) for every template that lives in this repo."""
+    root = Path(settings.BASE_DIR)
+    for engine in engines.all():
+        for d in map(Path, engine.template_dirs):
+            if root not in d.parents:
+                continue  # admin and other third-party templates compile on first use
+            for path in sorted(d.rglob("*.html")):
+                yield engine, path.relative_to(d).as_posix()
+
+
+def warm_up():
+    """Do the first-request work now. Returns {step: seconds}."""
+    timings = {}
+
+    t0 = time.perf_counter()
+    resolve(reverse("shop:product_list"))
+    timings["urls"] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    n = 0
+    for engine, name in project_templates():
+        engine.get_template(name)
+        n += 1
+    timings[f"templates ({n})"] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    # the form renderer has its own template engine
+    for form in (CheckoutForm(), UserCreationForm(), AuthenticationForm()):
+        str(form)
+    timings["forms"] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    critical_css()
+    timings["critical css"] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    with translation.override(settings.LANGUAGE_CODE):
+        translation.gettext("Home")
+    timings["translations"] = time.perf_counter() - t0
+
+    connections.close_all()
+    return timings
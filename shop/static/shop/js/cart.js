@@ -0,0 +1,26 @@
+(function(){
+  document.querySelectorAll('form.js-qty').forEach(f=>{
+    f.addEventListener('change', e=>{
+      fetch(f.action,{method:'POST',body:new FormData(f),headers:{'X-CSRFToken':window.__csrftoken,'X-Requested-With':'XMLHttpRequest'}})
+      .then(r=>r.json()).then(d=>{
+        if(d?.ok){ document.getElementById('total').textContent=d.total; const s=document.querySelector('.sub[data-id="'+f.action.split('/').slice(-2,-1)[0]+'"]'); if(s) s.textContent='$'+d.item_subtotal; window.__updateCartBadge?.(d.count); }
+        else if(d?.message){ window.__showToast?.(d.message); }
+      });
+    });
+  });
+  document.querySelectorAll('form.js-remove').forEach(f=>{
+    f.addEventListener('submit', e=>{
+      e.preventDefault();
+      fetch(f.action,{method:'POST',body:new FormData(f),headers:{'X-CSRFToken':window.__csrftoken,'X-Requested-With':'XMLHttpRequest'}})
+      .then(r=>r.json()).then(d=>{ if(d?.ok){ f.closest('tr').remove(); document.getElementById('total').textContent=d.total; window.__updateCartBadge?.(d.count); }});
+    });
+  });
+  // suggested products: add, then reload so the line shows up in the table
+  document.querySelectorAll('form.js-add').forEach(f=>{
+    f.addEventListener('submit', e=>{
+      e.preventDefault();
+      fetch(f.action,{method:'POST',body:new FormData(f),headers:{'X-CSRFToken':window.__csrftoken,'X-Requested-With':'XMLHttpRequest'}})
+      .then(r=>r.json()).then(d=>{ if(d?.ok){ window.location.reload(); } else if(d?.message){ window.__showToast?.(d.message); }});
+    });
+  });
+})();
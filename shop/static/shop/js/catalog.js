@@ -0,0 +1,25 @@
+(function(){
+  document.querySelectorAll('.js-fade-image').forEach(img=>{
+    const markLoaded=()=>img.classList.add('loaded');
+    if(img.complete){markLoaded();}
+    else{img.addEventListener('load',markLoaded,{once:true});img.addEventListener('error',markLoaded,{once:true});}
+  });
+
+  document.querySelectorAll('form.js-add').forEach(f=>{
+    f.addEventListener('submit', e=>{
+      e.preventDefault();
+      fetch(f.action,{method:'POST',body:new FormData(f),headers:{'X-CSRFToken':window.__csrftoken,'X-Requested-With':'XMLHttpRequest'}})
+      .then(r=>r.json()).then(d=>{ if(d?.ok){ window.__updateCartBadge?.(d.count); window.__showToast?.('Added to cart'); } else if(d?.message){ window.__showToast?.(d.message); }});
+    });
+  });
+  document.querySelectorAll('[data-del-id]').forEach(btn=>{
+    btn.addEventListener('click',()=>{
+      if(!confirm('Delete this product?')) return;
+      const id = btn.getAttribute('data-del-id');
+      fetch(btn.closest('[data-delete-url]').dataset.deleteUrl.replace('0/', id+'/'),{method:'POST',headers:{'X-CSRFToken':window.__csrftoken,'X-Requested-With':'XMLHttpRequest'}})
+      .then(r=>r.json()).then(d=>{
+        if(d?.ok){ const card=document.getElementById('prod-card-'+id); if(card){ card.remove(); } window.__showToast?.('Product deleted'); }
+      });
+    });
+  });
+})();
@@ -0,0 +1,61 @@
+// CSRF + helpers
+function getCookie(name){let v=null;if(document.cookie!==''){for(const c of document.cookie.split(';')){const t=c.trim();if(t.startsWith(name+'=')){v=decodeURIComponent(t.slice(name.length+1));break;}}}return v;}
+const csrftoken=getCookie('csrftoken');
+function updateCartBadge(count){const b=document.getElementById('cart-count');if(!b)return;if(count>0){b.textContent=count;b.style.display='';b.classList.remove('badge-pulse');void b.offsetWidth;b.classList.add('badge-pulse');}else{b.style.display='none';}}
+function showToast(msg='Added to cart'){const el=document.getElementById('app-toast');el.querySelector('.toast-body').textContent=msg;new bootstrap.Toast(el,{delay:1200}).show();}
+window.__csrftoken=csrftoken; window.__updateCartBadge=updateCartBadge; window.__showToast=showToast;
+
+// reveal animation
+const io=new IntersectionObserver((es)=>{es.forEach(e=>{if(e.isIntersecting){e.target.classList.add('visible');io.unobserve(e.target);}})},{threshold:.18});
+window.addEventListener('DOMContentLoaded',()=>document.querySelectorAll('.reveal').forEach(el=>io.observe(el)));
+
+// starfield
+(function(){const c=document.getElementById('starfield');const x=c.getContext('2d',{alpha:false});let s=[],W=0,H=0;
+  function R(){W=c.width=innerWidth*devicePixelRatio;H=c.height=innerHeight*devicePixelRatio;c.style.width=innerWidth+'px';c.style.height=innerHeight+'px';
+    const n=Math.min(600,Math.floor((W/devicePixelRatio)*(H/devicePixelRatio)/2500));s=Array.from({length:n},()=>{const L=Math.random()<.1?3:(Math.random()<.5?2:1);
+    return{x:Math.random()*W,y:Math.random()*H,r:(L===3?1.7:L===2?1.2:.8)*devicePixelRatio,base:.3+Math.random()*.5,tw:.6+Math.random()*1.2,sp:(L===3?.12:L===2?.06:.02)*devicePixelRatio,ph:Math.random()*Math.PI*2};});}
+  function D(t){const g=x.createLinearGradient(0,0,0,H);g.addColorStop(0,'#050914');g.addColorStop(1,'#0b1224');x.fillStyle=g;x.fillRect(0,0,W,H);
+    x.save();for(const a of s){const A=Math.max(0,Math.min(1,a.base*(.6+.4*Math.sin(t/1000*a.tw+a.ph))));x.globalAlpha=A;x.beginPath();x.arc(a.x,a.y,a.r,0,Math.PI*2);x.fillStyle='#fff';x.fill();a.x-=a.sp;if(a.x<-4*a.r){a.x=W+4*a.r;a.y=Math.random()*H;}}x.restore();requestAnimationFrame(D);}
+  addEventListener('resize',R);R();requestAnimationFrame(D);})();
+
+(function(){
+  const prefersReducedMotion = window.matchMedia('(prefers-reduced-motion: reduce)').matches;
+  const orbs = document.querySelectorAll('.orb');
+  const particles = document.querySelectorAll('.floating-particles .particle');
+  const megaTop = document.querySelector('.mega-top');
+
+  if(!prefersReducedMotion && orbs.length){
+    const strength = 24;
+    window.addEventListener('pointermove', e => {
+      const { innerWidth: w, innerHeight: h } = window;
+      const xRatio = (e.clientX / w - 0.5) * 2;
+      const yRatio = (e.clientY / h - 0.5) * 2;
+      orbs.forEach((orb, idx) => {
+        const depth = idx + 1;
+        orb.style.setProperty('--tx', `${-xRatio * strength * depth}px`);
+        orb.style.setProperty('--ty', `${-yRatio * (strength * 0.6) * depth}px`);
+      });
+    }, { passive: true });
+  }
+
+  if(particles.length){
+    particles.forEach((p, i) => {
+      p.style.setProperty('--i', i + 1);
+      p.style.setProperty('--x', Math.random().toFixed(3));
+      p.style.setProperty('--delay', `${(-Math.random()*6).toFixed(2)}s`);
+      p.style.setProperty('--duration', `${(8 + Math.random()*6).toFixed(2)}s`);
+    });
+  }
+
+  if(megaTop && !prefersReducedMotion){
+    let rafId = 0;
+    const shimmer = () => {
+      const t = performance.now() / 6000;
+      const bgPos = `${Math.sin(t) * 40}px ${Math.cos(t * 0.8) * 40}px`;
+      megaTop.style.backgroundPosition = `${bgPos}, ${bgPos}, center`;
+      rafId = requestAnimationFrame(shimmer);
+    };
+    rafId = requestAnimationFrame(shimmer);
+    window.addEventListener('beforeunload', () => cancelAnimationFrame(rafId));
+  }
+})();
@@ -0,0 +1,42 @@
+from whitenoise.storage import CompressedManifestStaticFilesStorage
+
+from . import assets
+
+# collectstatic backend (STORAGES["staticfiles"]): the shop's own CSS and JS
+# are minified and CRITICAL_CSS is written before WhiteNoise hashes every
+# file and writes its .gz/.br copies, so /static/ serves immutable, cache-busted,
+# pre-compressed assets with no work per request.
+
+
+class PipelineStorage(CompressedManifestStaticFilesStorage):
+    manifest_strict = False
+
+    def post_process(self, paths, dry_run=False, **options):
+        if not dry_run:
+            self.build(paths)
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+
+    def build(self, paths):
+        for name in list(paths):
+            if name.startswith("shop/") and name.endswith((".css", ".js")):
+                self.rewrite(name, assets.minify(name, self.read(name)))
+                paths[name] = (self, name)  # hash the minified copy, not the source
+        with open(self.path(assets.STYLES), encoding="utf-8") as f:
+            self.rewrite(assets.CRITICAL_CSS, assets.build_critical_css(f.read()))
+        paths[assets.CRITICAL_CSS] = (self, assets.CRITICAL_CSS)
+
+    def read(self, name):
+        with open(self.path(name), encoding="utf-8") as f:
+            return f.read()
+
+    def rewrite(self, name, text):
+        with open(self.path(name), "w", encoding="utf-8") as f:
+            f.write(text)
+
+    def stored_name(self, name):
+        # before the first collectstatic (runserver, benchmarks) fall back to
+        # the source file instead of failing to hash a file that isn't there
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            return name
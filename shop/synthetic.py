@@ -0,0 +1,95 @@
+import random
+from decimal import Decimal
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import Max
+
+from .caching import bump_on_commit
+from .cards import refresh_cards
+from .images import generate_derivatives
+from .models import Brand, Category, Product, product_hash
+from .search import document_for
+
+# Synthetic catalogs for load tests and benchmarks (`load_bike_data
+# --products N`, benchmarks/). Deterministic for a given seed. Products are
+# bulk-inserted with their search document and content hash precomputed;
+# `images` distinct pictures (with derivatives) are generated once and shared
+# round-robin, so a 100k catalog costs a few MB of media, not gigabytes.
+
+WORDS = [
+    "carbon", "alloy", "disc", "rim", "tubeless", "road", "gravel", "trail", "enduro", "aero",
+    "boost", "ceramic", "titanium", "wireless", "hydraulic", "sealed", "race", "pro", "comp", "elite",
+]
+SYLLABLES = ["ra", "ko", "vel", "tri", "mon", "zan", "shi", "dur", "pex", "lo", "ga", "ri", "nor", "ste"]
+IMAGE_DIR = "products/synthetic"
+BATCH = 5000
+
+
+def brand_names(n, rng):
+    names = []
+    for i in range(n):
+        name = "".join(rng.sample(SYLLABLES, rng.randint(2, 3))).title()
+        names.append(f"{name} {i}" if name in names else name)
+    return names
+
+
+def make_images(n, rng, size=(1200, 800)):
+    """Write `n` generated JPEGs plus their derivatives; [(storage name, widths)]."""
+    from PIL import Image, ImageDraw
+    out = []
+    for i in range(n):
+        name = f"{IMAGE_DIR}/synthetic-{i:04d}.jpg"
+        if not default_storage.exists(name):
+            im = Image.new("RGB", size, tuple(rng.randint(40, 215) for _ in range(3)))
+            draw = ImageDraw.Draw(im)
+            for _ in range(12):
+                x, y = rng.randint(0, size[0]), rng.randint(0, size[1])
+                r = rng.randint(30, 250)
+                draw.ellipse((x - r, y - r, x + r, y + r), fill=tuple(rng.randint(0, 255) for _ in range(3)))
+            buf = BytesIO()
+            im.save(buf, "JPEG", quality=85)
+            name = default_storage.save(name, ContentFile(buf.getvalue()))
+        out.append((name, generate_derivatives(default_storage.path(name))))
+    return out
+
+
+def generate_catalog(products, brands=20, images=0, seed=1, prefix="Synthetic"):
+    """Add `products` products across `brands` brands and the existing categories.
+    Returns the number of products created."""
+    rng = random.Random(seed)
+    brand_objs = []
+    for name in brand_names(brands, rng):
+        brand_objs.append(Brand.objects.get_or_create(name=name)[0])
+    categories = list(Category.objects.all()) or [Category.objects.get_or_create(name="Parts")[0]]
+    pictures = make_images(images, rng) if images else []
+    start = Product.objects.filter(name__startswith=f"{prefix} ").count()
+    batch, created = [], 0
+    for i in range(start, start + products):
+        b, c = rng.choice(brand_objs), rng.choice(categories)
+        name = f"{prefix} {' '.join(rng.sample(WORDS, 3)).title()} {c.name} {i}"[:200]
+        price = Decimal(rng.randint(500, 150000)) / 100
+        p = Product(name=name, brand=b, category=c, price=price,
+                    search_document=document_for(name, b.name, c.name),
+                    content_hash=product_hash(name, b.name, c.name, price, None))
+        if pictures:
+            p.image, p.image_variants = pictures[i % len(pictures)]
+        batch.append(p)
+        if len(batch) == BATCH:
+            created += _flush(batch)
+            batch = []
+    if batch:
+        created += _flush(batch)
+    return created
+
+
+def _flush(batch):
+    with transaction.atomic():
+        last = Product.objects.aggregate(last=Max("id"))["last"] or 0
+        Product.objects.bulk_create(batch, ignore_conflicts=True)
+        # bulk_create skips the model signals
+        refresh_cards(Product.objects.filter(id__gt=last).values_list("id", flat=True))
+        bump_on_commit()
+    return len(batch)
@@ -0,0 +1,13 @@
+from django import template
+from django.conf import settings
+from django.utils.safestring import mark_safe
+
+from shop.assets import critical_css as _critical_css
+
+register = template.Library()
+
+
+@register.simple_tag
+def critical_css():
+    """The catalog's critical CSS, for inlining into a <style> element ("" when CRITICAL_CSS is off)."""
+    return mark_safe(_critical_css()) if settings.CRITICAL_CSS else ""
@@ -0,0 +1,64 @@
+from django import template
+from django.core.files.storage import default_storage
+from django.utils.html import format_html
+
+from shop.images import derivative_name
+from shop.mirror import current_mirror
+
+register = template.Library()
+
+# one grid card is ~280px wide on desktop, half the row on tablets
+GRID_SIZES = "(min-width: 992px) 280px, (min-width: 576px) 45vw, 100vw"
+
+
+def _srcset(name, widths, fmt):
+    return ", ".join(f"{default_storage.url(derivative_name(name, w, fmt))} {w}w" for w in widths)
+
+
+def image_source(p):
+    """(storage name, widths) of the best local image, or (None, None).
+    An upload wins over a mirrored copy of image_url."""
+    if p.image:
+        return p.image.name, p.image_variants
+    mirror = current_mirror(p)
+    if mirror:
+        return mirror.name, p.mirror_variants
+    return None, None
+
+
+@register.simple_tag
+def product_img(p, sizes=GRID_SIZES, css_class="img-fluid", style="max-height:100%;object-fit:contain;"):
+    """<picture> for a product: WebP/JPEG srcsets when derivatives exist,
+    otherwise the local original or the remote image_url."""
+    name, widths = image_source(p)
+    if name and widths:
+        return format_html(
+            '<picture><source type="image/webp" srcset="{}" sizes="{}">'
+            '<img src="{}" srcset="{}" sizes="{}" alt="{}" class="{}" style="{}" loading="lazy" decoding="async"></picture>',
+            _srcset(name, widths, "webp"), sizes,
+            default_storage.url(derivative_name(name, widths[0], "jpg")), _srcset(name, widths, "jpg"), sizes,
+            p.name, css_class, style,
+        )
+    src = default_storage.url(name) if name else p.image_url
+    if not src:
+        return format_html('<div class="text-muted">No image</div>')
+    return format_html('<img src="{}" alt="{}" class="{}" style="{}" loading="lazy" decoding="async">',
+                       src, p.name, css_class, style)
+
+
+def eager(html):
+    """product_img() markup fetched straight away at high priority: for the
+    cards whose image the page preloads, which are above the fold."""
+    return html.replace('loading="lazy"', 'loading="eager" fetchpriority="high"', 1)
+
+
+def product_preload(p):
+    """Link header entry preloading the grid image of `p`: the WebP srcset when
+    there are derivatives, else the local original ("" for remote images)."""
+    name, widths = image_source(p)
+    if not name:
+        return ""
+    if widths:
+        return (f'<{default_storage.url(derivative_name(name, widths[0], "webp"))}>; rel=preload; as=image; '
+                f'type="image/webp"; imagesrcset="{_srcset(name, widths, "webp")}"; imagesizes="{GRID_SIZES}"')
+    return f"<{default_storage.url(name)}>; rel=preload; as=image"
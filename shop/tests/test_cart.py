@@ -0,0 +1,35 @@
+from django.contrib.auth.models import User
+from django.test import TestCase
+
+from shop.cart import MAX_LINES
+from shop.cart_storage import CART_KEY, COOKIE_NAME
+from shop.models import Category, Product
+
+XHR = {"HTTP_X_REQUESTED_WITH": "XMLHttpRequest"}
+
+
+class CartTests(TestCase):
+    def setUp(self):
+        category, _ = Category.objects.get_or_create(name="Brakes")
+        Product.objects.bulk_create([Product(name=f"Pad {i}", category=category, price=1)
+                                     for i in range(MAX_LINES + 1)])
+        self.ids = list(Product.objects.order_by("id").values_list("id", flat=True))
+
+    def test_full_cart_refuses_a_new_line(self):
+        for pid in self.ids[:MAX_LINES]:
+            self.client.post(f"/cart/add/{pid}/", {"qty": 1}, **XHR)
+        response = self.client.post(f"/cart/add/{self.ids[-1]}/", {"qty": 1}, **XHR)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()["error"], "cart_full")
+        # more of a product already in the cart is still fine
+        self.assertEqual(self.client.post(f"/cart/add/{self.ids[0]}/", {"qty": 1}, **XHR).status_code, 200)
+
+    def test_login_moves_cookie_cart_to_session(self):
+        User.objects.create_user("rider", password="pw")
+        self.client.post(f"/cart/add/{self.ids[0]}/", {"qty": 2}, **XHR)
+        self.assertTrue(self.client.cookies[COOKIE_NAME].value)
+        self.client.post("/login/", {"username": "rider", "password": "pw"})
+        self.assertEqual(self.client.session[CART_KEY], {str(self.ids[0]): 2})
+        self.assertFalse(self.client.cookies[COOKIE_NAME].value)
+        self.client.post(f"/cart/add/{self.ids[1]}/", {"qty": 1}, **XHR)
+        self.assertEqual(self.client.session[CART_KEY], {str(self.ids[0]): 2, str(self.ids[1]): 1})
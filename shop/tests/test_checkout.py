@@ -0,0 +1,34 @@
+from django.test import TestCase
+
+from shop.models import Category, Order, Product
+
+
+class CheckoutTests(TestCase):
+    def setUp(self):
+        category, _ = Category.objects.get_or_create(name="Brakes")
+        self.product = Product.objects.create(name="Disc pad", category=category, price="12.50")
+        self.form = {"idempotency_key": "k" * 32, "full_name": "A", "address": "1 Road",
+                     "phone": "123", "email": "a@example.com"}
+
+    def add_to_cart(self, client):
+        client.post(f"/cart/add/{self.product.pk}/", {"qty": 2}, HTTP_X_REQUESTED_WITH="XMLHttpRequest")
+
+    def test_double_submit_places_one_order(self):
+        self.add_to_cart(self.client)
+        first = self.client.post("/checkout/", self.form)
+        self.add_to_cart(self.client)  # a second tab refilled the cart
+        second = self.client.post("/checkout/", self.form)
+        self.assertEqual(first.status_code, 302)
+        self.assertEqual(second.status_code, 302)
+        self.assertEqual(Order.objects.count(), 1)
+        order = Order.objects.get()
+        self.assertEqual((order.item_count, str(order.total)), (2, "25.00"))
+
+    def test_success_page_shows_only_own_order(self):
+        self.add_to_cart(self.client)
+        self.client.post("/checkout/", self.form)
+        order = Order.objects.get()
+        self.assertContains(self.client.get("/success/"), f"Order #{order.pk}")
+        other = self.client_class()
+        response = other.get(f"/success/?order={order.idempotency_key}")
+        self.assertNotContains(response, "1 Road")
@@ -0,0 +1,30 @@
+import io
+import shutil
+import tempfile
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from PIL import Image
+
+from shop.models import Category, Product, ProductCard
+
+
+class BuildImageDerivativesTests(TestCase):
+    def setUp(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media, ignore_errors=True)
+        self.enterContext(override_settings(MEDIA_ROOT=media))
+        buf = io.BytesIO()
+        Image.new("RGB", (1600, 1200), "red").save(buf, "JPEG")
+        name = default_storage.save("products/x.jpg", ContentFile(buf.getvalue()))
+        category, _ = Category.objects.get_or_create(name="Brakes")
+        self.product = Product.objects.create(name="Disc", category=category, price=1, image=name)
+
+    def test_backfill_refreshes_the_card(self):
+        self.assertNotIn("srcset", ProductCard.objects.get(pk=self.product.pk).image_html)
+        call_command("build_image_derivatives", workers=1, stdout=io.StringIO())
+        self.product.refresh_from_db()
+        self.assertTrue(self.product.image_variants)
+        self.assertIn("srcset", ProductCard.objects.get(pk=self.product.pk).image_html)
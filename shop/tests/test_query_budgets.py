@@ -0,0 +1,71 @@
+import re
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TransactionTestCase, override_settings
+
+from shop.cards import rebuild_cards
+from shop.metrics import QueryBudgetExceeded
+from shop.models import Brand, Category, Product
+from shop.recommend import build_recommendations
+
+XHR = {"HTTP_X_REQUESTED_WITH": "XMLHttpRequest"}
+
+
+# The journeys of benchmarks/budgets.py on cold caches, failing on the first
+# view over settings.QUERY_BUDGETS. TransactionTestCase, so the counts have no
+# test savepoints in them.
+@override_settings(QUERY_BUDGET_STRICT=True)
+class QueryBudgetTests(TransactionTestCase):
+    def setUp(self):
+        brands = [Brand.objects.create(name=n) for n in ("Shimano", "SRAM", "Hope")]
+        cats = [Category.objects.get_or_create(name=n)[0] for n in ("Brakes", "Tires", "Wheels")]
+        Product.objects.bulk_create(
+            Product(name=f"Budget part {i}", brand=brands[i % 3], category=cats[i % 3], price="19.99",
+                    search_document=f"Budget part {i} {brands[i % 3].name} {cats[i % 3].name}")
+            for i in range(60))
+        rebuild_cards()
+        build_recommendations()
+        self.ids = list(Product.objects.order_by("-id").values_list("id", flat=True)[:15])
+        User.objects.create_user("staff", password="pw", is_staff=True)
+
+    def hit(self, method, url, **kw):
+        cache.clear()
+        response = getattr(self.client, method)(url, **kw)
+        self.assertLess(response.status_code, 400, url)
+        return response
+
+    def shop(self):
+        for url in ("/", "/?cat=Brakes", "/?brand=SRAM", "/?q=budget+part", "/?cat=Tires&brand=Hope"):
+            page = self.hit("get", url)
+        after = re.search(r'href="(\?[^"]*after=[^"]+)"', self.hit("get", "/").content.decode())
+        self.hit("get", "/" + after.group(1).replace("&amp;", "&"))
+        for pid in self.ids[:5]:
+            self.hit("post", f"/cart/add/{pid}/", data={"qty": 1}, **XHR)
+        self.hit("post", f"/cart/update/{self.ids[0]}/", data={"qty": 3}, **XHR)
+        self.hit("post", f"/cart/remove/{self.ids[1]}/", **XHR)
+        self.hit("get", "/cart/")
+        page = self.hit("get", "/checkout/")
+        key = re.search(r'name="idempotency_key" value="([^"]+)"', page.content.decode()).group(1)
+        self.hit("post", "/checkout/", data={"idempotency_key": key, "full_name": "A", "address": "1 Road",
+                                             "phone": "123", "email": "a@example.com"})
+        self.hit("get", "/success/")
+        for url in ("/api/products/", "/api/products/?q=budget", f"/api/products/{self.ids[0]}/",
+                    f"/api/products/{self.ids[0]}/related/", "/api/categories/", "/api/brands/?cat=Brakes"):
+            self.hit("get", url)
+
+    def test_anonymous_journey(self):
+        self.shop()
+
+    def test_staff_journey(self):
+        self.client.post("/login/", {"username": "staff", "password": "pw"})
+        self.shop()
+        self.hit("get", "/uploader/")
+        self.hit("get", "/uploader/api/jobs/?ids=1,2")
+        self.hit("post", f"/products/{self.ids[4]}/delete/", **XHR)
+        self.hit("post", "/products/delete/", data={"ids": ",".join(map(str, self.ids[5:15]))})
+
+    @override_settings(QUERY_BUDGETS={"shop:product_list": 0})
+    def test_over_budget_raises(self):
+        with self.assertRaises(QueryBudgetExceeded):
+            self.client.get("/")
@@ -0,0 +1,149 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, transaction
+from django.utils import timezone
+
+from .caching import bump_catalog_version
+from .images import build_for_product
+from .models import Brand, Category, Product, UploadJob
+
+# Batch uploads for the drag-and-drop uploader. The request only streams each
+# file to MEDIA_ROOT/products/ and inserts an UploadJob row; validation,
+# product creation and resizing happen on a small per-process thread pool.
+# Job state lives in the database, so the page can poll any gunicorn worker,
+# and `manage.py process_uploads` finishes jobs a restart left behind.
+
+ALLOWED_FORMATS = {"JPEG", "PNG", "WEBP"}
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def parse_price(raw):
+    try:
+        price = Decimal((raw or "0").strip()).quantize(Decimal("0.01"))
+    except InvalidOperation:
+        return Decimal("0.00")
+    return price if Decimal(0) <= price < Decimal("1e8") else Decimal("0.00")
+
+
+class JobError(Exception):
+    pass
+
+
+def _check_image(path):
+    from PIL import Image
+    try:
+        with Image.open(path) as im:
+            fmt = im.format
+            im.verify()
+    except Exception:
+        raise JobError("not a readable image")
+    if fmt not in ALLOWED_FORMATS:
+        raise JobError(f"unsupported format {fmt}")
+
+
+def process_job(pk):
+    """Claim and run one queued job. Returns the final status, or None if
+    another thread/process had already claimed it."""
+    claimed = UploadJob.objects.filter(pk=pk, status=UploadJob.QUEUED).update(
+        status=UploadJob.RUNNING, started_at=timezone.now())
+    if not claimed:
+        return None
+    job = UploadJob.objects.get(pk=pk)
+    try:
+        _check_image(job.file.path)
+        brand = Brand.objects.get_or_create(name=job.brand_name or "Unbranded")[0]
+        category = Category.objects.get_or_create(name=job.category)[0]
+        try:
+            # autocommit on purpose: SQLite's deferred transactions can fail outright with
+            # "database is locked" when two of these threads write at once
+            p = Product.objects.create(name=job.name, brand=brand, category=category,
+                                       price=job.price, image=job.file.name, image_url="")
+        except IntegrityError:
+            raise JobError(f"A product named {job.name!r} already exists")
+        try:
+            build_for_product(p)
+        except Exception:
+            pass  # the original still displays; build_image_derivatives can retry
+        job.status, job.product = UploadJob.DONE, p
+    except JobError as e:
+        job.file.delete(save=False)
+        job.status, job.error = UploadJob.FAILED, str(e)[:200]
+    except Exception as e:
+        job.status, job.error = UploadJob.FAILED, f"server: {e}"[:200]
+    job.finished_at = timezone.now()
+    job.save(update_fields=["status", "product", "error", "finished_at"])
+    return job.status
+
+
+class UploadQueue:
+    """Per-process worker pool; catalog invalidations are coalesced per batch."""
+
+    BUMP_INTERVAL = 5.0  # seconds
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pool = None
+        self._pending = 0
+        self._since_bump = 0
+        self._last_bump = 0.0
+
+    def enqueue(self, ids):
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=_setting("UPLOAD_WORKERS", 2),
+                                                thread_name_prefix="upload")
+            for pk in ids:
+                self._pending += 1
+                self._pool.submit(self._run, pk)
+
+    def _run(self, pk):
+        created = False
+        try:
+            close_old_connections()
+            created = process_job(pk) == UploadJob.DONE
+        except Exception:
+            pass  # a broken job must not kill the worker thread
+        finally:
+            close_old_connections()
+            with self._lock:
+                self._pending -= 1
+                self._since_bump += created
+                now = time.monotonic()
+                bump = self._since_bump and (not self._pending or now - self._last_bump >= self.BUMP_INTERVAL)
+                if bump:
+                    self._since_bump, self._last_bump = 0, now
+            if bump:
+                bump_catalog_version()
+
+
+queue = UploadQueue()
+
+
+def submit(user, entries):
+    """entries: [(file, name, brand, category, price_raw)] -> [UploadJob].
+    Jobs start once the surrounding transaction commits."""
+    jobs = [
+        UploadJob.objects.create(user=user, file=f, name=name, brand_name=brand,
+                                 category=category, price=parse_price(price))
+        for f, name, brand, category, price in entries
+    ]
+    ids = [j.pk for j in jobs]
+    transaction.on_commit(lambda: queue.enqueue(ids))
+    return jobs
+
+
+async def asubmit(user, entries):
+    jobs = [
+        await UploadJob.objects.acreate(user=user, file=f, name=name, brand_name=brand,
+                                        category=category, price=parse_price(price))
+        for f, name, brand, category, price in entries
+    ]
+    queue.enqueue([j.pk for j in jobs])  # autocommit: the rows are already visible
+    return jobs
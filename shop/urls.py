@@ -1,16 +1,20 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import api, views, async_views
+
+# async twins of the hot endpoints when served over ASGI (see bikeshop/asgi.py)
+hot = async_views if settings.ASYNC_VIEWS else views
 
 app_name = "shop"
 
 urlpatterns = [
-    path("", views.product_list, name="product_list"),
+    path("", hot.product_list, name="product_list"),
 
     # Cart
     path("cart/", views.view_cart, name="view_cart"),
-    path("cart/add/<int:product_id>/", views.add_item, name="add_item"),
-    path("cart/remove/<int:product_id>/", views.remove_item, name="remove_item"),
-    path("cart/update/<int:product_id>/", views.update_qty, name="update_qty"),
+    path("cart/add/<int:product_id>/", hot.add_item, name="add_item"),
+    path("cart/remove/<int:product_id>/", hot.remove_item, name="remove_item"),
+    path("cart/update/<int:product_id>/", hot.update_qty, name="update_qty"),
 
     # Checkout
     path("checkout/", views.checkout_view, name="checkout"),
@@ -23,9 +27,24 @@ urlpatterns = [
 
     # Drag & Drop Uploader
     path("uploader/", views.uploader_view, name="uploader"),
-    path("uploader/api/create/", views.uploader_api_create, name="uploader_api_create"),
-    path("uploader/api/delete/<int:pk>/", views.uploader_api_delete, name="uploader_api_delete"),
+    path("uploader/api/create/", hot.uploader_api_create, name="uploader_api_create"),
+    path("uploader/api/batch/", hot.uploader_api_batch, name="uploader_api_batch"),
+    path("uploader/api/jobs/", hot.uploader_api_jobs, name="uploader_api_jobs"),
+    path("uploader/api/delete/<int:pk>/", hot.uploader_api_delete, name="uploader_api_delete"),
+
+    # Read-only JSON catalog API
+    path("api/products/", api.product_list, name="api_products"),
+    path("api/products/<int:pk>/", api.product_detail, name="api_product"),
+    path("api/products/<int:pk>/related/", api.product_related, name="api_product_related"),
+    path("api/products.ndjson", api.product_export, name="api_export"),
+    path("api/categories/", api.categories, name="api_categories"),
+    path("api/brands/", api.brands, name="api_brands"),
 
     # Staff delete from catalog
     path("products/<int:pk>/delete/", views.product_delete, name="product_delete"),
+    path("products/delete/", views.product_bulk_delete, name="product_bulk_delete"),
+
+    # Catalog cache hit ratio and request metrics (staff)
+    path("cache/stats/", views.cache_stats, name="cache_stats"),
+    path("metrics", views.metrics, name="metrics"),
 ]
@@ -1,83 +1,131 @@
+import json
 from decimal import Decimal
 from django.shortcuts import render, redirect
 from django.contrib.auth import login, logout
 from django.contrib.auth.forms import UserCreationForm, AuthenticationForm
 from django.contrib.auth.decorators import login_required, user_passes_test
-from django.views.decorators.http import require_POST, require_http_methods
-from django.core.paginator import Paginator
-from django.http import JsonResponse
+from django.views.decorators.http import require_GET, require_POST, require_http_methods, condition
+from django.views.decorators.csrf import ensure_csrf_cookie
+from django.utils.cache import patch_cache_control
+from django.http import HttpResponse, JsonResponse
+from django.conf import settings
+from django.utils.crypto import constant_time_compare
+from django.db import IntegrityError
 from django.urls import reverse
 
-from .models import Product, Brand
-from .cart import add_to_cart, remove_from_cart, set_quantity, cart_items, cart_total_qty
+from .models import Product, Brand, Category, Order, UploadJob
+from .cart import add_to_cart, remove_from_cart, set_quantity, clear_cart, cart_items, cart_total_qty, CartSummary, CartFull, MAX_LINES
 from .forms import CheckoutForm
+from .orders import place_order, new_key
+from .uploads import submit as submit_uploads
+from .catalog import grid_page, render_cards, catalog_etag, catalog_last_modified, link_header
+from .caching import bump_on_commit, hit_counter
+from .metrics import registry
+from .facets import facets, names, with_links
+from .images import build_for_product
+from .bulk import delete_products
+from .recommend import recommended_for
 
-# Sidebar categories
-CATEGORIES = [
-    "Ball Bearings & Plain Bearings","Brakes","Cables & Housings","Cockpit","Drivetrain","Forks","Frames",
-    "Hubs & Freewheels","Inner Tubes","Pedals","Power Meters","Quick Releases & Thru Axles",
-    "Rear Shock Absorbers","Rims","Saddles","Seat Clamps","Seatposts","Shifting Components",
-    "Spokes & Nipples","Tires","Wheels",
-]
+def sidebar(request):
+    g = request.GET
+    return with_links(request, facets(g.get("cat"), g.get("brand"), g.get("q")))
 
+@condition(etag_func=catalog_etag, last_modified_func=catalog_last_modified)
 def product_list(request):
-    qs = Product.objects.all().select_related("brand").order_by("-id")
-    cat = request.GET.get("cat")
-    if cat: qs = qs.filter(category=cat)
-    q = request.GET.get("q")
-    if q: qs = qs.filter(name__icontains=q)
-    page = Paginator(qs, 12).get_page(request.GET.get("page"))
-    return render(request, "shop/product_list.html", {"products": page, "categories": CATEGORIES})
+    grid, products = grid_page(request)
+    response = render(request, "shop/product_list.html", {
+        "cards": render_cards(request, grid["ids"], products, eager=grid.get("eager", ())), "facets": sidebar(request),
+        "prev_url": grid["prev_url"], "next_url": grid["next_url"], "page_label": grid["label"],
+    })
+    response["Link"] = link_header(grid)
+    patch_cache_control(response, private=True, no_cache=True)  # always revalidate via ETag
+    return response
+
+@user_passes_test(lambda u: u.is_staff)
+def cache_stats(request):
+    return JsonResponse({"ratio": round(hit_counter.ratio(), 4), "caches": hit_counter.snapshot()})
+
+def metrics(request):
+    token = settings.METRICS_TOKEN
+    bearer = request.headers.get("Authorization", "").removeprefix("Bearer ")
+    if not (request.user.is_staff or (token and constant_time_compare(bearer, token))):
+        return HttpResponse(status=403)
+    return HttpResponse(registry.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+def cart_full(request):
+    message = f"Your cart is full ({MAX_LINES} different products)."
+    if request.headers.get("X-Requested-With") == "XMLHttpRequest":
+        return JsonResponse({"ok": False, "error": "cart_full", "message": message}, status=400)
+    return HttpResponse(message, status=400, content_type="text/plain")
 
 @require_POST
 def add_item(request, product_id):
     qty = int(request.POST.get("qty", 1))
-    add_to_cart(request.session, product_id, qty)
+    try:
+        add_to_cart(request.cart, product_id, qty)
+    except CartFull:
+        return cart_full(request)
     if request.headers.get("X-Requested-With") == "XMLHttpRequest":
-        return JsonResponse({"ok": True, "count": cart_total_qty(request.session)})
+        return JsonResponse({"ok": True, "count": cart_total_qty(request.cart)})
     return redirect("shop:view_cart")
 
+# cards under the cart: bought together with its items, then similar (shop/recommend.py)
+CART_SUGGESTIONS = 4
+
 def view_cart(request):
-    items, total = cart_items(request.session)
-    return render(request, "shop/cart.html", {"items": items, "total": total})
+    items, total = cart_items(request.cart)
+    # plain cards, no staff buttons; ids deleted since the last rebuild have no card and drop out
+    ids = recommended_for([it["product"].id for it in items], CART_SUGGESTIONS)
+    suggested = render_cards(request, ids, controls=False)
+    return render(request, "shop/cart.html", {"items": items, "total": total, "suggested": suggested})
 
 @require_POST
 def update_qty(request, product_id):
     qty = int(request.POST.get("qty", 1))
-    set_quantity(request.session, product_id, qty)
-    if request.headers.get("X-Requested-With") == "XMLHttpRequest":
-        items, total = cart_items(request.session)
-        sub = "0.00"
-        for it in items:
-            if it["product"].id == product_id: sub = f"{it['subtotal']:.2f}"; break
-        return JsonResponse({"ok": True, "total": f"{total:.2f}", "item_subtotal": sub, "count": cart_total_qty(request.session)})
+    try:
+        if request.headers.get("X-Requested-With") == "XMLHttpRequest":
+            cart = CartSummary(request.cart)
+            cart.set(product_id, qty)
+            return JsonResponse({"ok": True, "total": f"{cart.total:.2f}", "item_subtotal": f"{cart.subtotal(product_id):.2f}", "count": cart.count})
+        set_quantity(request.cart, product_id, qty)
+    except CartFull:
+        return cart_full(request)
     return redirect("shop:view_cart")
 
 @require_POST
 def remove_item(request, product_id):
-    remove_from_cart(request.session, product_id)
     if request.headers.get("X-Requested-With") == "XMLHttpRequest":
-        items, total = cart_items(request.session)
-        return JsonResponse({"ok": True, "total": f"{total:.2f}", "count": cart_total_qty(request.session)})
+        cart = CartSummary(request.cart)
+        cart.remove(product_id)
+        return JsonResponse({"ok": True, "total": f"{cart.total:.2f}", "count": cart.count})
+    remove_from_cart(request.cart, product_id)
     return redirect("shop:view_cart")
 
 # ---- Checkout ----
+LAST_ORDER_KEY = "last_order"
+
 def checkout_view(request):
-    items, total = cart_items(request.session)
-    if not items: return redirect("shop:product_list")
     if request.method == "POST":
         form = CheckoutForm(request.POST)
         if form.is_valid():
-            request.session["last_order"] = {"total": f"{total:.2f}", **form.cleaned_data}
-            request.session["cart_v1"] = {}
-            request.session.modified = True
+            data = dict(form.cleaned_data)
+            key = data.pop("idempotency_key")
+            order, created = place_order(request.cart, key, data, request.user)
+            if order is None: return redirect("shop:product_list")
+            clear_cart(request.cart)
+            # the success page only shows the order this visitor placed
+            request.session[LAST_ORDER_KEY] = order.pk
             return redirect("shop:success")
     else:
-        form = CheckoutForm()
+        form = CheckoutForm(initial={"idempotency_key": new_key()})
+    items, total = cart_items(request.cart)
+    if not items: return redirect("shop:product_list")
     return render(request, "shop/checkout.html", {"form": form, "items": items, "total": total})
 
 def success_view(request):
-    return render(request, "shop/success.html", {"order": request.session.get("last_order")})
+    pk = request.session.get(LAST_ORDER_KEY)
+    order = Order.objects.filter(pk=pk).first() if pk else None
+    return render(request, "shop/success.html", {"order": order})
 
 # ---- Auth ----
 def signup_view(request):
@@ -99,12 +147,13 @@ def login_view(request):
     return render(request, "shop/login.html", {"form": form})
 
 def logout_view(request):
-    logout(request); return redirect("shop:product_list")
+    logout(request); clear_cart(request.cart); return redirect("shop:product_list")
 
 # ---- Uploader ----
 @login_required
+@ensure_csrf_cookie
 def uploader_view(request):
-    return render(request, "shop/uploader.html", {"categories": CATEGORIES})
+    return render(request, "shop/uploader.html", {"categories": sorted(names()["categories"], key=str.lower)})
 
 @require_POST
 def uploader_api_create(request):
@@ -121,40 +170,103 @@ def uploader_api_create(request):
     if not img:  return JsonResponse({"ok": False, "error": "validation", "message": "Missing image"}, status=400)
 
     brand = Brand.objects.get_or_create(name=bname or "Unbranded")[0]
+    category = Category.objects.get_or_create(name=cat)[0]
     try: price = Decimal(price_raw)
     except Exception: price = Decimal("0.00")
 
     try:
-        p = Product.objects.create(name=name, brand=brand, category=cat, price=price, image=img, image_url="")
+        p = Product.objects.create(name=name, brand=brand, category=category, price=price, image=img, image_url="")
+    except IntegrityError:
+        return JsonResponse({"ok": False, "error": "validation", "message": f"A product named {name!r} already exists"}, status=409)
     except Exception as e:
         return JsonResponse({"ok": False, "error": "server", "message": str(e)}, status=500)
+    try:
+        build_for_product(p)
+    except Exception:
+        pass  # the original still displays; build_image_derivatives can retry
+    bump_on_commit()
 
     return JsonResponse({"ok": True, "id": p.id, "name": p.name})
 
+def batch_entries(request):
+    """Parallel lists of image/name/brand/category/price -> (entries, errors); entries is None without files."""
+    P = request.POST
+    files, names, brands, cats, prices = (request.FILES.getlist("image"), P.getlist("name"), P.getlist("brand"),
+                                          P.getlist("category"), P.getlist("price"))
+    if not files:
+        return None, []
+    entries, errors = [], []
+    for i, f in enumerate(files):
+        field = lambda values, default="": (values[i] if i < len(values) else default).strip()
+        name, cat = field(names) or "New Product", field(cats)
+        if not cat:
+            errors.append({"index": i, "message": "Missing category"})
+            continue
+        entries.append((f, name, field(brands), cat, field(prices, "0")))
+    return entries, errors
+
+def job_ids(request):
+    return [int(i) for i in request.GET.get("ids", "").split(",") if i.isdigit()][:200]
+
+@require_POST
+def uploader_api_batch(request):
+    """Several products per request; responds 202 with job ids to poll while
+    the files are processed in the background."""
+    if not request.user.is_authenticated:
+        return JsonResponse({"ok": False, "error": "auth", "login_url": reverse("shop:login")}, status=401)
+    entries, errors = batch_entries(request)
+    if entries is None:
+        return JsonResponse({"ok": False, "error": "validation", "message": "Missing image"}, status=400)
+    jobs = submit_uploads(request.user, entries)
+    return JsonResponse({"ok": True, "jobs": [{"id": j.pk, "name": j.name} for j in jobs], "errors": errors}, status=202)
+
+@require_GET
+def uploader_api_jobs(request):
+    if not request.user.is_authenticated:
+        return JsonResponse({"ok": False, "error": "auth"}, status=401)
+    jobs = UploadJob.objects.filter(pk__in=job_ids(request), user=request.user).values("id", "status", "product_id", "error")
+    return JsonResponse({"ok": True, "jobs": list(jobs)})
+
 @require_http_methods(["POST"])
 def uploader_api_delete(request, pk):
     if not request.user.is_authenticated:
         return JsonResponse({"ok": False, "error": "auth"}, status=401)
-    try:
-        p = Product.objects.get(pk=pk)
-    except Product.DoesNotExist:
+    if not delete_products(Product.objects.filter(pk=pk)):
         return JsonResponse({"ok": False, "error": "not_found"}, status=404)
-    if getattr(p, "image", None):
-        p.image.delete(save=False)
-    p.delete()
     return JsonResponse({"ok": True})
 
 # Staff delete from catalog grid
 @require_http_methods(["POST"])
 @user_passes_test(lambda u: u.is_staff)
 def product_delete(request, pk):
-    try:
-        p = Product.objects.get(pk=pk)
-    except Product.DoesNotExist:
+    if not delete_products(Product.objects.filter(pk=pk)):
         return JsonResponse({"ok": False, "error": "not_found"}, status=404)
-    if getattr(p, "image", None):
-        p.image.delete(save=False)
-    p.delete()
     if request.headers.get("X-Requested-With") == "XMLHttpRequest":
         return JsonResponse({"ok": True})
     return redirect("shop:product_list")
+
+# ids as a JSON body ({"ids": [...]}) or form fields (ids=1&ids=2 or ids=1,2)
+def _posted_ids(request):
+    if request.content_type == "application/json":
+        try:
+            raw = json.loads(request.body or b"{}").get("ids", [])
+        except (ValueError, AttributeError):
+            return None
+    else:
+        raw = [part for value in request.POST.getlist("ids") for part in value.split(",")]
+    try:
+        return list(dict.fromkeys(int(i) for i in raw))
+    except (TypeError, ValueError):
+        return None
+
+@require_http_methods(["POST"])
+@user_passes_test(lambda u: u.is_staff)
+def product_bulk_delete(request):
+    ids = _posted_ids(request)
+    if not ids or len(ids) > settings.BULK_DELETE_MAX:
+        return JsonResponse({"ok": False, "error": "validation",
+                             "message": f"Send between 1 and {settings.BULK_DELETE_MAX} product ids"}, status=400)
+    found = list(Product.objects.filter(pk__in=ids).values_list("pk", flat=True))
+    deleted = delete_products(Product.objects.filter(pk__in=found))
+    missing = sorted(set(ids) - set(found))
+    return JsonResponse({"ok": True, "deleted": deleted, "not_found": missing})